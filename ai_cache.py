@@ -0,0 +1,130 @@
+"""
+Content-addressed cache for AI category/summary results.
+
+The key is a SHA-256 of (provider, model, normalized caption, hashtags),
+so reposts, failed scrapes and the "Instagram content saved" placeholder
+are tagged once per provider/model instead of on every save. An in-process
+LRU sits in front of the `ai_cache` table in saves.db; entries expire
+after a TTL and the table is trimmed to `max_entries`.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import db
+
+
+def content_key(provider, model, caption, hashtags):
+    """Stable hash of what the LLM actually sees"""
+    caption = ' '.join((caption or '').lower().split())
+    tags = ','.join(sorted({h.lower() for h in (hashtags or [])}))
+    raw = '\x1f'.join((provider, model, caption, tags))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AICache:
+    """Two-tier (memory LRU + SQLite) cache of (category, summary) results"""
+
+    def __init__(self, db_path='saves.db', ttl=30 * 86400, memory_entries=4096, max_entries=100000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._pool = db.get_pool(db_path)
+        self.init_table()
+
+    def init_table(self):
+        with self._pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ai_cache (
+                    key TEXT PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_ai_cache_accessed ON ai_cache (accessed_at)')
+            self._disk_entries = conn.execute('SELECT COUNT(*) FROM ai_cache').fetchone()[0]
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        """(category, summary) for a content key, or None"""
+        now = time.time()
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None and value[2] > now:
+                self._memory.move_to_end(key)
+                self._counters['hits'] += 1
+                self._counters['memory_hits'] += 1
+                return value[0], value[1]
+
+        with self._pool.connection() as conn:
+            row = conn.execute('SELECT category, summary, expires_at FROM ai_cache WHERE key = ? AND expires_at > ?',
+                               (key, now)).fetchone()
+            if row is not None:
+                conn.execute('UPDATE ai_cache SET accessed_at = ? WHERE key = ?', (now, key))
+
+        with self._lock:
+            if row is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['hits'] += 1
+            self._counters['disk_hits'] += 1
+        self._remember(key, row)
+        return row[0], row[1]
+
+    def put(self, key, category, summary):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._pool.connection() as conn:
+            cur = conn.execute('INSERT OR IGNORE INTO ai_cache (key, category, summary, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                               (key, category, summary, expires_at, now))
+            if cur.rowcount == 0:
+                conn.execute('UPDATE ai_cache SET category = ?, summary = ?, expires_at = ?, accessed_at = ? WHERE key = ?',
+                             (category, summary, expires_at, now, key))
+            conn.commit()
+            with self._lock:
+                self._disk_entries += cur.rowcount
+                self._counters['stores'] += 1
+                over = self._disk_entries > self.max_entries
+            if over:
+                self._evict(conn, now)
+        self._remember(key, (category, summary, expires_at))
+
+    def _evict(self, conn, now):
+        # Expired rows first, then least recently used down to 90% of max_entries
+        expired = conn.execute('DELETE FROM ai_cache WHERE expires_at <= ?', (now,)).rowcount
+        remaining = conn.execute('SELECT COUNT(*) FROM ai_cache').fetchone()[0]
+        excess = remaining - int(self.max_entries * 0.9)
+        lru = 0
+        if excess > 0:
+            lru = conn.execute('''
+                DELETE FROM ai_cache WHERE key IN (
+                    SELECT key FROM ai_cache ORDER BY accessed_at LIMIT ?
+                )
+            ''', (excess,)).rowcount
+        conn.commit()
+        with self._lock:
+            self._disk_entries = remaining - lru
+            self._counters['evictions'] += expired + lru
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_entries'] = self._disk_entries
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
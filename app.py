@@ -1,15 +1,42 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, g, request, jsonify, render_template, stream_with_context, url_for
+import click
 from flask_cors import CORS
 from twilio.twiml.messaging_response import MessagingResponse
 import os
+import time
+import base64
 from dotenv import load_dotenv
+import httpx
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import openai
-import sqlite3
 import re
+import threading
 from datetime import datetime
 import json
+import ai_cache
+import batcher
+import canonical
+import classifier
+import db
+import export
+import fetch_cache
+import hedging
+import importer
+import jobqueue
+import local_model
+import logs
+import metrics
+import page_stream
+import parsers
+import provider_health
+import sampler
+import save_stats
+import schema
+import search
+import tagging
+import tags
 
 load_dotenv()
 
@@ -44,206 +71,237 @@ if os.getenv('GEMINI_API_KEY'):
 if os.getenv('AI_PROVIDER'):
     AI_PROVIDER = os.getenv('AI_PROVIDER')
 
+# Ingest mode: "sync" processes the link inside the webhook request,
+# "async" acks Twilio immediately and replies from a background worker
+INGEST_MODE = os.getenv('INGEST_MODE', 'sync')
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', '4'))
+INGEST_MAX_ATTEMPTS = int(os.getenv('INGEST_MAX_ATTEMPTS', '5'))
+INGEST_VISIBILITY_TIMEOUT = float(os.getenv('INGEST_VISIBILITY_TIMEOUT', '120'))
+INGEST_JOB_RETENTION = float(os.getenv('INGEST_JOB_RETENTION', str(7 * 86400)))
+# Links of one message processed at the same time
+LINK_CONCURRENCY = int(os.getenv('LINK_CONCURRENCY', '10'))
+# Requests in flight to one host (a site or an AI provider); more wait for a free connection
+HOST_CONCURRENCY = int(os.getenv('HOST_CONCURRENCY', '16'))
+
+# Bulk imports: worker threads, and requests per second per site / AI provider
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '8'))
+IMPORT_HOST_RPS = float(os.getenv('IMPORT_HOST_RPS', '2'))
+IMPORT_PROVIDER_RPS = float(os.getenv('IMPORT_PROVIDER_RPS', '5'))
+IMPORT_DIR = os.getenv('IMPORT_DIR', 'imports')
+
+# Provider endpoints (overridable so benchmarks can point at local stubs)
+HUGGINGFACE_API_BASE = os.getenv('HUGGINGFACE_API_BASE', 'https://api-inference.huggingface.co')
+GEMINI_API_BASE = os.getenv('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL') or None
+TWILIO_API_BASE = os.getenv('TWILIO_API_BASE', '')
+
+# Public URL Twilio posts the webhook to (e.g. the ngrok URL + /webhook).
+# When set, POSTs without a valid X-Twilio-Signature are rejected.
+TWILIO_WEBHOOK_URL = os.getenv('TWILIO_WEBHOOK_URL', '')
+
+# Models used by each provider
+HUGGINGFACE_MODEL = 'gpt2'
+GEMINI_API_VERSIONS = ["v1", "v1beta"]
+GEMINI_MODELS = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
+OPENAI_MODEL = 'gpt-3.5-turbo'
+
+# Provider health: breakers skip a failing provider instantly until the
+# cooldown passes; the working Gemini model is rediscovered periodically
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv('PROVIDER_FAILURE_THRESHOLD', '3'))
+PROVIDER_COOLDOWN = float(os.getenv('PROVIDER_COOLDOWN', '30'))
+GEMINI_MODEL_REFRESH = float(os.getenv('GEMINI_MODEL_REFRESH', '3600'))
+
+# Hedged tagging: if the primary provider hasn't answered within the hedge
+# delay (its recent p95 latency unless AI_HEDGE_DELAY is set), race a backup
+AI_HEDGING = os.getenv('AI_HEDGING', 'false').lower() in ('1', 'true', 'yes')
+AI_HEDGE_PROVIDERS = [p.strip() for p in os.getenv('AI_HEDGE_PROVIDERS', 'gemini,openai,huggingface').split(',') if p.strip()]
+AI_HEDGE_DELAY = os.getenv('AI_HEDGE_DELAY', '')
+AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', '95'))
+
+# Micro-batching: bursts of saves share one OpenAI/Gemini call of up to
+# AI_BATCH_SIZE items, collected for at most AI_BATCH_WAIT_MS
+AI_BATCHING = os.getenv('AI_BATCHING', 'false').lower() in ('1', 'true', 'yes')
+AI_BATCH_SIZE = int(os.getenv('AI_BATCH_SIZE', '16'))
+AI_BATCH_WAIT_MS = float(os.getenv('AI_BATCH_WAIT_MS', '50'))
+
+# AI result cache: repeats of the same caption/hashtags cost no quota
+AI_CACHE_TTL = float(os.getenv('AI_CACHE_TTL', str(30 * 86400)))
+AI_CACHE_MEMORY_ENTRIES = int(os.getenv('AI_CACHE_MEMORY_ENTRIES', '4096'))
+AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '100000'))
+
+# Local model (AI_PROVIDER=local): trained from saves.db with
+# `flask --app app train-local-model`; low-confidence items go to
+# LOCAL_MODEL_ESCALATE (an LLM provider) when it is set
+LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH', 'local_model')
+LOCAL_MODEL_MIN_CONFIDENCE = float(os.getenv('LOCAL_MODEL_MIN_CONFIDENCE', '0.6'))
+LOCAL_MODEL_ESCALATE = os.getenv('LOCAL_MODEL_ESCALATE', '')
+
+# Page-fetch cache: fresh entries skip the network, stale ones are revalidated
+FETCH_CACHE_TTL = float(os.getenv('FETCH_CACHE_TTL', '86400'))
+FETCH_CACHE_MEMORY_ENTRIES = int(os.getenv('FETCH_CACHE_MEMORY_ENTRIES', '1024'))
+FETCH_CACHE_MAX_BYTES = int(os.getenv('FETCH_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Most bytes read from one page; reading also stops once the parser has its tags
+FETCH_MAX_BYTES = int(os.getenv('FETCH_MAX_BYTES', str(2 * 1024 * 1024)))
+# HTML parser backend: html.parser (default), lxml or selectolax
+HTML_PARSER = os.getenv('HTML_PARSER', parsers.DEFAULT_BACKEND)
+
+# Structured JSON logs on stdout: debug, info (default), warning or error
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'info')
+
+# saves.db connection pool (WAL mode), shared by every module
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', str(16 * 1024)))
+# Group commit: saves arriving together share one transaction (and fsync)
+DB_WRITE_BATCH = int(os.getenv('DB_WRITE_BATCH', '256'))
+DB_WRITE_WAIT_MS = float(os.getenv('DB_WRITE_WAIT_MS', '0'))
+
+try:
+    logs.set_level(LOG_LEVEL)
+except ValueError as e:
+    logs.error('bad_setting', setting='LOG_LEVEL', error=e)
+
 app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests
 
 # Allow ngrok and localhost
 app.config['SERVER_NAME'] = None
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    """Latency and status of every request, per route rule, for /metrics"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - start, route=route, method=request.method)
+        metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
 openai.api_key = OPENAI_API_KEY
 
 # Database setup
+db_pool = db.get_pool('saves.db', size=DB_POOL_SIZE, mmap_size=DB_MMAP_SIZE, cache_size_kb=DB_CACHE_SIZE_KB)
+db_writer = db.GroupCommitWriter('saves.db', max_batch=DB_WRITE_BATCH, max_wait=DB_WRITE_WAIT_MS / 1000)
+
 def init_db():
-    conn = sqlite3.connect('saves.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS saves (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            url TEXT NOT NULL,
-            platform TEXT,
-            caption TEXT,
-            hashtags TEXT,
-            category TEXT,
-            summary TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with db_pool.connection() as conn:
+        return schema.create_tables(conn)
 
-init_db()
+# Full-text search index (saves_fts); False if SQLite lacks FTS5
+FTS_ENABLED = init_db()
 
-def extract_instagram_content(url):
-    """Extract caption and hashtags from Instagram URL"""
+# Shared HTTP session: keeps keep-alive connections per host instead of a
+# new TCP+TLS handshake for every page and provider call. Each host's pool
+# blocks at HOST_CONCURRENCY connections, which caps requests in flight
+# per host (a streamed page holds its connection until it is closed).
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+http_session = requests.Session()
+http_session.mount('http://', HTTPAdapter(pool_connections=32, pool_maxsize=HOST_CONCURRENCY, pool_block=True))
+http_session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=HOST_CONCURRENCY, pool_block=True))
+
+canonicalizer = canonical.Canonicalizer(http_session, db_path='saves.db')
+
+try:
+    parsers.set_backend(HTML_PARSER)
+except (ImportError, ValueError) as e:
+    logs.error('html_parser_unavailable', requested=HTML_PARSER, error=e, using=parsers.DEFAULT_BACKEND)
+
+page_cache = fetch_cache.FetchCache(
+    db_path='saves.db',
+    ttl=FETCH_CACHE_TTL,
+    memory_entries=FETCH_CACHE_MEMORY_ENTRIES,
+    max_bytes=FETCH_CACHE_MAX_BYTES
+)
+
+def fetch_page(url, headers=None):
+    """GET a page with browser headers (plus any extra, e.g. conditional, headers).
+
+    The body is streamed, not downloaded: read it with
+    page_stream.read_html() or close the response. Inside a bulk import
+    the request first waits for the host's rate limit.
+    """
+    importer.throttle_fetch(url)
+    return http_session.get(url, headers={**BROWSER_HEADERS, **(headers or {})}, timeout=10, stream=True)
+
+def extract_platform_content(url, platform):
+    """Fetch and parse a page, going through the page-fetch cache"""
+    entry, fresh = page_cache.lookup(url)
+    if fresh:
+        return dict(entry['content'])
+    
+    # Stale entry: revalidate with a conditional GET
+    headers = {}
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    
     try:
-        # Instagram doesn't allow direct scraping, so we'll use a workaround
-        # For demo purposes, we'll extract what we can from the URL structure
-        # In production, you'd need Instagram Basic Display API or similar
-        
-        # Try to get page content (may be blocked, but worth trying)
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        caption = ""
-        hashtags = []
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Try to find meta tags with description
-            meta_desc = soup.find('meta', property='og:description')
-            if meta_desc:
-                caption = meta_desc.get('content', '')
-            
-            # Extract hashtags from caption
-            hashtag_pattern = r'#(\w+)'
-            hashtags = re.findall(hashtag_pattern, caption)
-        
-        # If we couldn't extract, return defaults
-        if not caption:
-            caption = "Instagram content saved"
+        with metrics.STAGE_SECONDS.time(stage='fetch'):
+            response = fetch_page(url, headers)
+            if response.status_code == 200:
+                html = page_stream.read_html(response, platform, max_bytes=FETCH_MAX_BYTES)
+            else:
+                response.close()
+                html = None
+        if response.status_code == 304 and entry is not None:
+            page_cache.refresh(url, entry)
+            return dict(entry['content'])
         
-        return {
-            'caption': caption,
-            'hashtags': hashtags,
-            'platform': 'instagram'
-        }
+        with metrics.STAGE_SECONDS.time(stage='parse'):
+            content = parsers.parse_content(platform, html)
+        if html is not None:
+            page_cache.put(url, content,
+                           etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'))
+        return content
     except Exception as e:
-        print(f"Error extracting Instagram content: {e}")
-        return {
-            'caption': "Instagram content saved",
-            'hashtags': [],
-            'platform': 'instagram'
-        }
+        logs.warning('extract_failed', url=url, platform=platform, error=e, stale_copy=entry is not None)
+        # A stale copy beats the placeholder
+        if entry is not None:
+            return dict(entry['content'])
+        return parsers.default_content(platform)
+
+def extract_instagram_content(url):
+    """Extract caption and hashtags from Instagram URL"""
+    # Instagram doesn't allow direct scraping, so we'll use a workaround
+    # For demo purposes, we'll extract what we can from the page meta tags
+    # In production, you'd need Instagram Basic Display API or similar
+    return extract_platform_content(url, 'instagram')
 
 def extract_twitter_content(url):
     """Extract content from Twitter/X URL"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        caption = ""
-        hashtags = []
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Try to find meta tags
-            meta_desc = soup.find('meta', property='og:description')
-            if meta_desc:
-                caption = meta_desc.get('content', '')
-            
-            # Extract hashtags
-            hashtag_pattern = r'#(\w+)'
-            hashtags = re.findall(hashtag_pattern, caption)
-        
-        if not caption:
-            caption = "Twitter content saved"
-        
-        return {
-            'caption': caption,
-            'hashtags': hashtags,
-            'platform': 'twitter'
-        }
-    except Exception as e:
-        print(f"Error extracting Twitter content: {e}")
-        return {
-            'caption': "Twitter content saved",
-            'hashtags': [],
-            'platform': 'twitter'
-        }
+    return extract_platform_content(url, 'twitter')
 
 def extract_article_content(url):
     """Extract title and main text from article/blog"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Get title
-            title = ""
-            if soup.title:
-                title = soup.title.string
-            else:
-                og_title = soup.find('meta', property='og:title')
-                if og_title:
-                    title = og_title.get('content', '')
-            
-            # Get main content (try article tag, or main, or just p tags)
-            content = ""
-            article = soup.find('article')
-            if article:
-                content = article.get_text(strip=True, separator=' ')
-            else:
-                main = soup.find('main')
-                if main:
-                    content = main.get_text(strip=True, separator=' ')
-                else:
-                    # Get all paragraphs
-                    paragraphs = soup.find_all('p')
-                    content = ' '.join([p.get_text(strip=True) for p in paragraphs[:10]])
-            
-            # Limit content length
-            if len(content) > 1000:
-                content = content[:1000] + "..."
-            
-            caption = f"{title}\n\n{content}" if title else content
-            
-            return {
-                'caption': caption,
-                'hashtags': [],
-                'platform': 'article'
-            }
-    except Exception as e:
-        print(f"Error extracting article content: {e}")
-    
-    return {
-        'caption': "Article content saved",
-        'hashtags': [],
-        'platform': 'article'
-    }
+    return extract_platform_content(url, 'article')
 
+@metrics.timed_stage('extract')
 def extract_content(url):
     """Determine platform and extract content accordingly"""
-    if 'instagram.com' in url:
+    platform = parsers.detect_platform(url)
+    if platform == 'instagram':
         return extract_instagram_content(url)
-    elif 'twitter.com' in url or 'x.com' in url:
+    elif platform == 'twitter':
         return extract_twitter_content(url)
     else:
         return extract_article_content(url)
 
+@metrics.timed_provider('huggingface')
 def ai_tag_and_summarize_huggingface(caption, hashtags):
     """Use Hugging Face Inference API (FREE!)"""
     try:
-        hashtags_str = ', '.join(hashtags) if hashtags else 'none'
-        if not caption or len(caption.strip()) < 5:
-            caption = "Social media content"
+        prompt = tagging.build_prompt(caption, hashtags)
         
-        prompt = f"""Analyze this social media content and provide:
-1. A category (choose ONE from: Fitness, Coding, Food, Travel, Design, Fashion, Music, Photography, Business, Education, Other)
-2. A one-sentence summary
-
-Content: {caption}
-Hashtags: {hashtags_str}
-
-Respond in JSON format:
-{{
-    "category": "category_name",
-    "summary": "one sentence summary"
-}}"""
-
         # Use Hugging Face Inference API (free, no API key needed for public models)
-        api_url = "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium"
-        
-        # Try a better model for text generation
         headers = {}
         if HUGGINGFACE_API_TOKEN:
             headers["Authorization"] = f"Bearer {HUGGINGFACE_API_TOKEN}"
@@ -259,8 +317,8 @@ Respond in JSON format:
         }
         
         # Try using a text generation model
-        response = requests.post(
-            "https://api-inference.huggingface.co/models/gpt2",
+        response = http_session.post(
+            f"{HUGGINGFACE_API_BASE}/models/{HUGGINGFACE_MODEL}",
             headers=headers,
             json=payload,
             timeout=10
@@ -272,230 +330,195 @@ Respond in JSON format:
                 generated_text = result[0].get('generated_text', '')
                 # Try to extract JSON from response
                 if '{' in generated_text and '}' in generated_text:
-                    start = generated_text.find('{')
-                    end = generated_text.rfind('}') + 1
-                    json_str = generated_text[start:end]
-                    data = json.loads(json_str)
-                    category = data.get('category', 'Other')
-                    summary = data.get('summary', 'Content saved')
-                    return category, summary
+                    return tagging.parse_response(generated_text)
         
         # If Hugging Face fails, fall through to fallback
         raise Exception("Hugging Face API returned unexpected response")
     
     except Exception as e:
-        print(f"Hugging Face API error: {e}")
+        logs.warning('provider_error', provider='huggingface', error=e)
         raise  # Re-raise to trigger fallback
 
+def gemini_url(api_version, model_name):
+    return f"{GEMINI_API_BASE}/{api_version}/models/{model_name}:generateContent?key={GEMINI_API_KEY}"
+
+def discover_gemini_endpoint(payload):
+    """Try each API version/model until one answers. Returns the last response."""
+    # Try v1 API first (newer), then v1beta
+    response = None
+    for api_version in GEMINI_API_VERSIONS:
+        for model_name in GEMINI_MODELS:
+            try:
+                response = http_session.post(gemini_url(api_version, model_name), json=payload, timeout=10)
+                
+                if response.status_code == 200:
+                    logs.info('gemini_endpoint_found', api_version=api_version, model=model_name)
+                    gemini_endpoint.set((api_version, model_name))
+                    return response  # Success, use this model
+                elif response.status_code == 404:
+                    logs.info('gemini_model_not_found', api_version=api_version, model=model_name)
+                    continue  # Try next model
+                else:
+                    logs.warning('gemini_api_error', api_version=api_version, model=model_name,
+                                 status=response.status_code, body=response.text[:200])
+                    response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code == 404:
+                    continue  # Try next model
+                logs.warning('gemini_http_error', api_version=api_version, model=model_name, error=e)
+                raise
+            except Exception as e:
+                logs.warning('gemini_endpoint_error', api_version=api_version, model=model_name, error=e)
+                continue
+    return response
+
+def gemini_generate(prompt):
+    """Send a prompt to the working Gemini model. Returns the generated text."""
+    payload = {
+        "contents": [{
+            "parts": [{"text": prompt}]
+        }]
+    }
+    
+    # Go straight to the model that worked last time; only rediscover
+    # when it disappears or the refresh interval has passed
+    response = None
+    endpoint = gemini_endpoint.get()
+    if endpoint:
+        api_version, model_name = endpoint
+        response = http_session.post(gemini_url(api_version, model_name), json=payload, timeout=10)
+        if response.status_code == 404:
+            logs.info('gemini_endpoint_gone', api_version=api_version, model=model_name)
+            gemini_endpoint.invalidate()
+            response = None
+    if response is None:
+        response = discover_gemini_endpoint(payload)
+    if response is None:
+        raise Exception("No Gemini endpoint reachable")
+    
+    if response.status_code == 200:
+        result = response.json()
+        if 'candidates' in result and len(result['candidates']) > 0:
+            return result['candidates'][0]['content']['parts'][0]['text']
+        else:
+            raise Exception("No candidates in Gemini response")
+    else:
+        raise Exception(f"Gemini API error: {response.status_code} - {response.text}")
+
+@metrics.timed_provider('gemini')
 def ai_tag_and_summarize_gemini(caption, hashtags):
     """Use Google Gemini API (FREE tier available)"""
     try:
         if not GEMINI_API_KEY:
             raise ValueError("Gemini API key not configured")
         
-        hashtags_str = ', '.join(hashtags) if hashtags else 'none'
-        if not caption or len(caption.strip()) < 5:
-            caption = "Social media content"
-        
-        prompt = f"""Analyze this social media content and provide:
-1. A category (choose ONE from: Fitness, Coding, Food, Travel, Design, Fashion, Music, Photography, Business, Education, Other)
-2. A one-sentence summary
-
-Content: {caption}
-Hashtags: {hashtags_str}
-
-Respond in JSON format:
-{{
-    "category": "category_name",
-    "summary": "one sentence summary"
-}}"""
-
-        # Use Google Gemini API - try different API versions and models
-        # Try v1 API first (newer), then v1beta
-        api_versions = ["v1", "v1beta"]
-        models_to_try = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
-        
-        response = None
-        for api_version in api_versions:
-            for model_name in models_to_try:
-                try:
-                    url = f"https://generativelanguage.googleapis.com/{api_version}/models/{model_name}:generateContent?key={GEMINI_API_KEY}"
-                    payload = {
-                        "contents": [{
-                            "parts": [{"text": prompt}]
-                        }]
-                    }
-                    
-                    response = requests.post(url, json=payload, timeout=10)
-                    
-                    if response.status_code == 200:
-                        print(f"✅ Using Gemini {api_version}/{model_name}")
-                        break  # Success, use this model
-                    elif response.status_code == 404:
-                        print(f"❌ Model {model_name} not found in {api_version}, trying next...")
-                        continue  # Try next model
-                    else:
-                        print(f"❌ API error {response.status_code}: {response.text[:200]}")
-                        response.raise_for_status()
-                except requests.exceptions.HTTPError as e:
-                    if e.response.status_code == 404:
-                        continue  # Try next model
-                    print(f"❌ HTTP Error: {e}")
-                    raise
-                except Exception as e:
-                    print(f"❌ Error trying {api_version}/{model_name}: {e}")
-                    continue
-            
-            if response and response.status_code == 200:
-                break  # Found working model, exit outer loop
+        generated_text = gemini_generate(tagging.build_prompt(caption, hashtags))
         
-        if response.status_code == 200:
-            result = response.json()
-            if 'candidates' in result and len(result['candidates']) > 0:
-                generated_text = result['candidates'][0]['content']['parts'][0]['text']
-                
-                # Extract JSON
-                if '{' in generated_text and '}' in generated_text:
-                    start = generated_text.find('{')
-                    end = generated_text.rfind('}') + 1
-                    json_str = generated_text[start:end]
-                    data = json.loads(json_str)
-                    category = data.get('category', 'Other')
-                    summary = data.get('summary', 'Content saved')
-                    return category, summary
-            else:
-                raise Exception("No candidates in Gemini response")
-        else:
-            raise Exception(f"Gemini API error: {response.status_code} - {response.text}")
+        # Extract JSON
+        return tagging.parse_response(generated_text)
     
     except Exception as e:
-        print(f"Gemini API error: {e}")
+        logs.warning('provider_error', provider='gemini', error=e)
         raise  # Re-raise to trigger fallback
 
+@metrics.timed_provider('gemini', call='batch')
+def ai_tag_batch_gemini(items):
+    """Tag several (caption, hashtags) items with one Gemini call"""
+    try:
+        if not GEMINI_API_KEY:
+            raise ValueError("Gemini API key not configured")
+        generated_text = gemini_generate(tagging.build_batch_prompt(items))
+        return tagging.parse_batch_response(generated_text, len(items))
+    except Exception as e:
+        logs.warning('provider_error', provider='gemini', batch_size=len(items), error=e)
+        raise
+
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    """OpenAI client shared across requests (reuses its connection pool)"""
+    global _openai_client
+    if _openai_client is None:
+        with _openai_client_lock:
+            if _openai_client is None:
+                _openai_client = openai.OpenAI(
+                    api_key=OPENAI_API_KEY,
+                    base_url=OPENAI_BASE_URL,
+                    http_client=openai.DefaultHttpxClient(
+                        limits=httpx.Limits(max_connections=HOST_CONCURRENCY,
+                                            max_keepalive_connections=HOST_CONCURRENCY)
+                    )
+                )
+    return _openai_client
+
+def openai_complete(prompt, max_tokens):
+    """Send a prompt to the OpenAI chat model. Returns the reply text."""
+    if not OPENAI_API_KEY or OPENAI_API_KEY == 'your_openai_api_key_here':
+        raise ValueError("OpenAI API key not configured")
+    
+    response = get_openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": tagging.SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.7,
+        max_tokens=max_tokens
+    )
+    return response.choices[0].message.content.strip()
+
+@metrics.timed_provider('openai')
 def ai_tag_and_summarize_openai(caption, hashtags):
     """Use OpenAI API"""
     try:
-        if not OPENAI_API_KEY or OPENAI_API_KEY == 'your_openai_api_key_here':
-            raise ValueError("OpenAI API key not configured")
-        
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        
-        hashtags_str = ', '.join(hashtags) if hashtags else 'none'
-        if not caption or len(caption.strip()) < 5:
-            caption = "Social media content"
-        
-        prompt = f"""Analyze this social media content and provide:
-1. A category (choose ONE from: Fitness, Coding, Food, Travel, Design, Fashion, Music, Photography, Business, Education, Other)
-2. A one-sentence summary
-
-Content: {caption}
-Hashtags: {hashtags_str}
-
-Respond in JSON format:
-{{
-    "category": "category_name",
-    "summary": "one sentence summary"
-}}"""
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that categorizes and summarizes social media content. Always respond with valid JSON only, no markdown."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=150
-        )
-        
-        result = response.choices[0].message.content.strip()
+        result = openai_complete(tagging.build_prompt(caption, hashtags), max_tokens=150)
         
         # Try to parse JSON
-        if result.startswith('```'):
-            result = result.split('```')[1]
-            if result.startswith('json'):
-                result = result[4:]
-            result = result.strip()
-        
-        if '{' in result and '}' in result:
-            start = result.find('{')
-            end = result.rfind('}') + 1
-            result = result[start:end]
-        
-        data = json.loads(result)
-        category = data.get('category', 'Other')
-        summary = data.get('summary', 'Content saved')
-        
-        valid_categories = ['Fitness', 'Coding', 'Food', 'Travel', 'Design', 'Fashion', 'Music', 'Photography', 'Business', 'Education', 'Other']
-        if category not in valid_categories:
-            category = 'Other'
-        
-        return category, summary
+        return tagging.parse_response(result, validate_category=True)
     
     except openai.RateLimitError as e:
-        print(f"OpenAI API quota exceeded: {e}")
+        logs.warning('provider_rate_limited', provider='openai', error=e)
         raise
     except Exception as e:
-        print(f"OpenAI API error: {e}")
+        logs.warning('provider_error', provider='openai', error=e)
         raise
 
-def ai_tag_and_summarize(caption, hashtags):
-    """Main AI function - tries different providers based on config"""
-    # Determine which provider to use
+@metrics.timed_provider('openai', call='batch')
+def ai_tag_batch_openai(items):
+    """Tag several (caption, hashtags) items with one OpenAI call"""
     try:
-        provider = AI_PROVIDER if 'AI_PROVIDER' in globals() else 'fallback'
-    except:
-        provider = 'fallback'
-    
-    # Try the selected provider
-    if provider == 'huggingface':
-        try:
-            return ai_tag_and_summarize_huggingface(caption, hashtags)
-        except Exception as e:
-            print(f"Hugging Face failed: {e}, trying fallback...")
-    elif provider == 'gemini' and GEMINI_API_KEY:
-        try:
-            return ai_tag_and_summarize_gemini(caption, hashtags)
-        except Exception as e:
-            print(f"Gemini failed: {e}, trying fallback...")
-    elif provider == 'openai' and OPENAI_API_KEY and OPENAI_API_KEY != 'your_openai_api_key_here':
-        try:
-            return ai_tag_and_summarize_openai(caption, hashtags)
-        except Exception as e:
-            print(f"OpenAI failed: {e}, trying fallback...")
-    
-    # All AI providers failed or not configured - use ENHANCED fallback
-    
-    # Enhanced intelligent fallback categorization
-    caption_lower = (caption or "").lower()
-    hashtags_lower = [h.lower() for h in (hashtags or [])]
-    all_text = caption_lower + " " + " ".join(hashtags_lower)
-    
-    # Score-based categorization (more accurate)
-    category_scores = {
-        'Fitness': ['workout', 'fitness', 'exercise', 'gym', 'abs', 'cardio', 'yoga', 'pilates', 'running', 'training', 'muscle', 'strength', 'health', 'fit', 'diet', 'weight', 'nutrition'],
-        'Coding': ['code', 'programming', 'developer', 'python', 'javascript', 'coding', 'tutorial', 'algorithm', 'software', 'tech', 'coding', 'webdev', 'app', 'api', 'github', 'stackoverflow'],
-        'Food': ['recipe', 'food', 'cooking', 'pasta', 'meal', 'dish', 'cuisine', 'chef', 'baking', 'restaurant', 'delicious', 'tasty', 'recipe', 'cook', 'kitchen', 'dinner', 'lunch', 'breakfast'],
-        'Travel': ['travel', 'trip', 'vacation', 'destination', 'traveling', 'adventure', 'wanderlust', 'explore', 'journey', 'vacation', 'holiday', 'tourism', 'visit', 'sightseeing'],
-        'Design': ['design', 'graphic', 'ui', 'ux', 'art', 'creative', 'illustration', 'logo', 'branding', 'aesthetic', 'visual', 'typography', 'layout'],
-        'Fashion': ['fashion', 'style', 'outfit', 'clothing', 'wardrobe', 'trend', 'fashionable', 'dress', 'accessories', 'style'],
-        'Music': ['music', 'song', 'artist', 'album', 'concert', 'musician', 'beat', 'lyrics', 'spotify', 'playlist'],
-        'Photography': ['photo', 'photography', 'camera', 'shot', 'picture', 'image', 'photographer', 'lens', 'portrait', 'landscape'],
-        'Business': ['business', 'entrepreneur', 'startup', 'marketing', 'sales', 'strategy', 'finance', 'investment', 'company'],
-        'Education': ['learn', 'education', 'study', 'course', 'tutorial', 'lesson', 'student', 'school', 'university', 'knowledge']
-    }
-    
-    scores = {}
-    for category, keywords in category_scores.items():
-        score = sum(1 for keyword in keywords if keyword in all_text)
-        if score > 0:
-            scores[category] = score
-    
-    # Get category with highest score
-    if scores:
-        category = max(scores, key=scores.get)
-    else:
-        category = 'Other'
-    
+        result = openai_complete(tagging.build_batch_prompt(items), max_tokens=80 * len(items) + 50)
+        return tagging.parse_batch_response(result, len(items))
+    except Exception as e:
+        logs.warning('provider_error', provider='openai', batch_size=len(items), error=e)
+        raise
+
+provider_breakers = {
+    name: provider_health.CircuitBreaker(name, PROVIDER_FAILURE_THRESHOLD, PROVIDER_COOLDOWN)
+    for name in ('huggingface', 'gemini', 'openai')
+}
+gemini_endpoint = provider_health.WorkingEndpoint(GEMINI_MODEL_REFRESH)
+
+tag_cache = ai_cache.AICache(
+    db_path='saves.db',
+    ttl=AI_CACHE_TTL,
+    memory_entries=AI_CACHE_MEMORY_ENTRIES,
+    max_entries=AI_CACHE_MAX_ENTRIES
+)
+
+keyword_classifier = classifier.KeywordClassifier()
+
+local_classifier = local_model.ModelFile(LOCAL_MODEL_PATH, min_confidence=LOCAL_MODEL_MIN_CONFIDENCE)
+
+@metrics.timed_stage('fallback')
+def keyword_fallback(caption, hashtags):
+    """Enhanced keyword-based categorization used when no AI provider answers"""
+    category = keyword_classifier.classify(caption, hashtags)
+    return category, fallback_summary(caption, hashtags, category)
+
+def fallback_summary(caption, hashtags, category):
+    """Summary without an LLM: the caption's first sentence"""
     # Create intelligent summary from caption
     if caption and len(caption.strip()) > 10:
         # Try to create a meaningful summary
@@ -517,63 +540,642 @@ def ai_tag_and_summarize(caption, hashtags):
         else:
             summary = f"{category} content saved"
     
-    return category, summary
+    return summary
+
+PROVIDER_NAMES = {'huggingface': 'Hugging Face', 'gemini': 'Gemini', 'openai': 'OpenAI'}
+
+provider_latency = hedging.LatencyStats(percentile=AI_HEDGE_PERCENTILE)
+
+def provider_configured(provider):
+    """Does this provider have the credentials it needs?"""
+    if provider == 'huggingface':
+        return True
+    if provider == 'gemini':
+        return bool(GEMINI_API_KEY)
+    if provider == 'openai':
+        return bool(OPENAI_API_KEY) and OPENAI_API_KEY != 'your_openai_api_key_here'
+    return False
+
+def provider_model(provider):
+    """Model identity used in AI cache keys"""
+    if provider == 'huggingface':
+        return HUGGINGFACE_MODEL
+    if provider == 'gemini':
+        return '|'.join(GEMINI_MODELS)
+    return OPENAI_MODEL
 
-def save_to_db(url, platform, caption, hashtags, category, summary):
-    """Save content to database"""
-    conn = sqlite3.connect('saves.db')
-    c = conn.cursor()
+def with_breaker(provider, fn, batch=False):
+    """fn, recording each call's outcome in the provider's circuit breaker
+
+    For a batch call an unparseable reply (ValueError) isn't counted: the
+    batcher retries its items as single calls, which are.
+    """
+    breaker = provider_breakers[provider]
+    
+    def call(*args):
+        try:
+            result = fn(*args)
+        except ValueError:
+            if not batch:
+                breaker.record_failure()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return result
+    return call
+
+def call_provider(provider, caption, hashtags):
+    """Call one provider through its circuit breaker, recording its latency
+
+    A batched call is recorded in the breaker by the batcher: once per
+    batch call and once per single retry, not once per waiting caller.
+    """
+    if not provider_breakers[provider].allow():
+        raise provider_health.BreakerOpen(f"{PROVIDER_NAMES[provider]} circuit breaker is open")
+    start = time.perf_counter()
+    if provider in provider_batchers:
+        result = provider_batchers[provider].call((caption, hashtags))
+    elif provider == 'huggingface':
+        result = with_breaker(provider, ai_tag_and_summarize_huggingface)(caption, hashtags)
+    elif provider == 'gemini':
+        result = with_breaker(provider, ai_tag_and_summarize_gemini)(caption, hashtags)
+    else:
+        result = with_breaker(provider, ai_tag_and_summarize_openai)(caption, hashtags)
+    provider_latency.record(provider, time.perf_counter() - start)
+    return result
+
+provider_batchers = {
+    'gemini': batcher.MicroBatcher(
+        with_breaker('gemini', lambda items: ai_tag_batch_gemini(items), batch=True),
+        with_breaker('gemini', lambda item: ai_tag_and_summarize_gemini(*item)),
+        max_batch=AI_BATCH_SIZE, max_wait=AI_BATCH_WAIT_MS / 1000.0, name='gemini-batch'
+    ),
+    'openai': batcher.MicroBatcher(
+        with_breaker('openai', lambda items: ai_tag_batch_openai(items), batch=True),
+        with_breaker('openai', lambda item: ai_tag_and_summarize_openai(*item)),
+        max_batch=AI_BATCH_SIZE, max_wait=AI_BATCH_WAIT_MS / 1000.0, name='openai-batch'
+    ),
+} if AI_BATCHING else {}
+
+def hedge_delay(provider):
+    if AI_HEDGE_DELAY:
+        return float(AI_HEDGE_DELAY)
+    return provider_latency.hedge_delay(provider)
+
+def hedge_providers(primary):
+    """The primary followed by the configured backup providers it is raced against"""
+    return [primary] + [p for p in AI_HEDGE_PROVIDERS
+                        if p != primary and p in PROVIDER_NAMES and provider_configured(p)]
+
+def hedged_tag(primary, caption, hashtags):
+    """Race the primary against backup providers. Returns (winner, (category, summary))."""
+    candidates = hedge_providers(primary)
+    calls = [(p, lambda p=p: call_provider(p, caption, hashtags)) for p in candidates]
+    winner, (category, summary) = hedging.hedged_call(
+        calls,
+        hedge_delay,
+        validate=lambda result: result and result[0] in tagging.VALID_CATEGORIES
+    )
+    if winner != primary:
+        logs.info('hedge_won', provider=winner, primary=primary)
+    return winner, (category, summary)
+
+@metrics.timed_stage('tag')
+def ai_tag_and_summarize(caption, hashtags, allow_fallback=True):
+    """Main AI function - tries different providers based on config
+
+    Returns (category, summary, tagged_by): the LLM provider whose answer
+    it is (also when it came from the cache), 'local' or 'fallback'.
+
+    With allow_fallback=False a provider error is re-raised instead of
+    falling back to keywords, so the job queue can retry the provider.
+    With AI_HEDGING on, backup providers race the primary's slow tail.
+    With AI_PROVIDER=local the local model answers; low-confidence items
+    go to LOCAL_MODEL_ESCALATE, or to the keyword fallback if it isn't set.
+    """
+    # Determine which provider to use
+    try:
+        provider = AI_PROVIDER if 'AI_PROVIDER' in globals() else 'fallback'
+    except:
+        provider = 'fallback'
+    
+    if provider == 'local':
+        prediction = local_classifier.classify(caption, hashtags)
+        if prediction is not None and prediction[2]:
+            category = prediction[0]
+            metrics.TAGS.inc(provider='local', source='local')
+            return category, fallback_summary(caption, hashtags, category), 'local'
+        provider = LOCAL_MODEL_ESCALATE
+    
+    if provider in PROVIDER_NAMES and provider_configured(provider):
+        # Same content, same provider/model: reuse the earlier answer. A
+        # hedged answer is cached under the backup that won the race.
+        for candidate in hedge_providers(provider) if AI_HEDGING else [provider]:
+            cached = tag_cache.get(ai_cache.content_key(candidate, provider_model(candidate), caption, hashtags))
+            if cached:
+                metrics.TAGS.inc(provider=provider, source='cache')
+                return cached + (candidate,)
+        # Bulk imports pace remote provider calls (no-op otherwise)
+        importer.throttle_provider(provider)
+        try:
+            if AI_HEDGING:
+                winner, (category, summary) = hedged_tag(provider, caption, hashtags)
+            else:
+                winner, (category, summary) = provider, call_provider(provider, caption, hashtags)
+        except Exception as e:
+            logs.warning('provider_failed', provider=provider, error=e, fallback=allow_fallback)
+            if not allow_fallback:
+                raise
+        else:
+            # Cached as the answer of the provider that gave it
+            tag_cache.put(ai_cache.content_key(winner, provider_model(winner), caption, hashtags), category, summary)
+            metrics.TAGS.inc(provider=provider, source='provider')
+            return category, summary, winner
+    
+    # All AI providers failed or not configured - use ENHANCED fallback
+    metrics.TAGS.inc(provider=provider or 'none', source='fallback')
+    return keyword_fallback(caption, hashtags) + ('fallback',)
+
+def insert_save(conn, url, platform, caption, hashtags, category, summary, canonical_url, tagged_by=None):
     hashtags_str = ', '.join(hashtags) if hashtags else ''
-    c.execute('''
-        INSERT INTO saves (url, platform, caption, hashtags, category, summary)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (url, platform, caption, hashtags_str, category, summary))
-    conn.commit()
-    conn.close()
+    cur = conn.execute('''
+        INSERT OR IGNORE INTO saves (url, platform, caption, hashtags, category, summary, canonical_url, tagged_by)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (url, platform, caption, hashtags_str, category, summary, canonical_url, tagged_by))
+    if not cur.rowcount:
+        return None
+    tags.add_save_tags(conn, cur.lastrowid, hashtags)
+    return cur.lastrowid
+
+def insert_saves(conn, rows):
+    """insert_save() for each row (its arguments after conn). Returns the ids (None for duplicates)."""
+    return [insert_save(conn, *row) for row in rows]
+
+@metrics.timed_stage('save')
+def save_to_db(url, platform, caption, hashtags, category, summary, canonical_url=None, tagged_by=None):
+    """Save content to database. A link whose canonical_url is already saved is ignored.
+
+    tagged_by records what chose the category (see ai_tag_and_summarize()).
+
+    Goes through the group-commit writer and returns once the row is on
+    disk: the new save's id, or None if it was a duplicate.
+    """
+    return db_writer.write(insert_save, url, platform, caption, hashtags, category, summary, canonical_url, tagged_by)
+
+def find_saved(canonical_url):
+    """(category, summary) of an existing save for a canonical URL, or None"""
+    with db_pool.connection() as conn:
+        return conn.execute('SELECT category, summary FROM saves WHERE canonical_url = ?', (canonical_url,)).fetchone()
 
 @app.route('/')
 def index():
     """Dashboard homepage"""
     return render_template('dashboard.html')
 
+SAVE_FIELDS = ('id', 'url', 'platform', 'caption', 'hashtags', 'category', 'summary', 'created_at', 'canonical_url')
+SAVES_PAGE_LIMIT = 50
+SAVES_MAX_LIMIT = 500
+
+def encode_cursor(created_at, save_id):
+    """Opaque cursor: the (created_at, id) of the last save on a page"""
+    raw = json.dumps([created_at, save_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """(created_at, id) from encode_cursor(); raises ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, save_id = json.loads(raw)
+        return str(created_at), int(save_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def parse_fields(value):
+    """Columns from a fields=a,b,c parameter (all by default); raises ValueError on unknown names"""
+    fields = list(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in SAVE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields or list(SAVE_FIELDS)
+
 @app.route('/api/saves', methods=['GET'])
 def get_saves():
-    """Get all saves, optionally filtered by search query"""
-    search = request.args.get('search', '').lower()
-    
-    conn = sqlite3.connect('saves.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    if search:
-        c.execute('''
-            SELECT * FROM saves 
-            WHERE LOWER(caption) LIKE ? OR LOWER(category) LIKE ? OR LOWER(hashtags) LIKE ?
-            ORDER BY created_at DESC
-        ''', (f'%{search}%', f'%{search}%', f'%{search}%'))
-    else:
-        c.execute('SELECT * FROM saves ORDER BY created_at DESC')
+    """Get saves, newest first, one page at a time
+
+    ?limit= (default 50, max 500) caps the page, ?cursor= takes the
+    X-Next-Cursor header of the previous page, ?fields=id,url,... returns
+    only those columns and ?category= / ?platform= filter. ?tag=fitness
+    (repeatable; all must match) is an exact tag match through the
+    save_tags index, so #fit doesn't match #fitness. Pages are keyset
+    range scans over the (created_at, id) indexes.
+
+    Searches go through the FTS5 index: best matches first (one page, no
+    cursor), each with an HTML `snippet` of the caption with the matched
+    terms in <mark>.
+    """
+    query = request.args.get('search', '').lower()
+    limit = max(1, min(request.args.get('limit', SAVES_PAGE_LIMIT, type=int), SAVES_MAX_LIMIT))
+    try:
+        fields = parse_fields(request.args.get('fields', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    filters = {name: request.args[name] for name in ('category', 'platform') if request.args.get(name)}
+    tag_names = list(dict.fromkeys(tags.normalize(tag) for tag in request.args.getlist('tag') if tags.normalize(tag)))
+    
+    if query and FTS_ENABLED:
+        with db_pool.connection() as conn:
+            saves = search.search(conn, query, limit=limit, columns=fields, filters=filters, tag_names=tag_names)
+        return jsonify(saves)
+    
+    where = [f'{name} = ?' for name in filters] + [tags.filter_sql()] * len(tag_names)
+    params = list(filters.values()) + tag_names
+    if query:
+        where.append('(LOWER(caption) LIKE ? OR LOWER(category) LIKE ? OR LOWER(hashtags) LIKE ?)')
+        params += [f'%{query}%'] * 3
+    if request.args.get('cursor'):
+        try:
+            params += decode_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        where.append('(created_at, id) < (?, ?)')
     
-    rows = c.fetchall()
-    saves = [dict(row) for row in rows]
-    conn.close()
+    # The cursor needs created_at and id even when they weren't asked for
+    selected = fields + [f for f in ('created_at', 'id') if f not in fields]
+    sql = f"SELECT {', '.join(selected)} FROM saves"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+    with db_pool.connection() as conn:
+        rows = conn.execute(sql, params + [limit + 1]).fetchall()
     
-    return jsonify(saves)
+    saves = [dict(zip(fields, row)) for row in rows[:limit]]
+    response = jsonify(saves)
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[selected.index('created_at')], last[selected.index('id')])
+        next_args = dict(request.args.items(), cursor=next_cursor)
+        response.headers['X-Next-Cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("get_saves", **next_args)}>; rel="next"'
+    return response
+
+@app.route('/api/export', methods=['GET'])
+def export_saves():
+    """Stream the whole library as NDJSON (default) or CSV
+
+    ?format=ndjson|csv, ?since=<created_at> for incremental backups,
+    ?fields=... as for /api/saves, ?gzip=1 for a .gz download compressed
+    on the fly. Memory use doesn't grow with the table.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in export.FORMATS:
+        return jsonify({'error': f"Unknown format: {fmt}"}), 400
+    try:
+        fields = parse_fields(request.args.get('fields', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    
+    filename = f"saves-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}" + ('.gz' if compress else '')
+    body = export.stream('saves.db', fields, format=fmt, since=request.args.get('since'), compress=compress)
+    return Response(
+        stream_with_context(body),
+        mimetype='application/gzip' if compress else export.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/tags', methods=['GET'])
+def get_tags():
+    """Tag facets: [{"tag", "count"}], most used first
+
+    ?limit= (default 50, max 500), ?prefix= for tags starting with it.
+    Counts are maintained on write, so this reads only the rows returned.
+    """
+    limit = max(1, min(request.args.get('limit', SAVES_PAGE_LIMIT, type=int), SAVES_MAX_LIMIT))
+    with db_pool.connection() as conn:
+        return jsonify(tags.top_tags(conn, limit=limit, prefix=request.args.get('prefix')))
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Library totals: {"total", "categories", "platforms", "daily"}
+
+    ?days= (default 30, max 366) sets the length of the daily histogram.
+    Read from the save_stats counters, not by scanning saves.
+    """
+    days = request.args.get('days', 30, type=int)
+    with db_pool.connection() as conn:
+        return jsonify(save_stats.summary(conn, days=days))
+
+random_sampler = sampler.RandomSampler('saves.db')
+
+RANDOM_MAX_N = 50
 
 @app.route('/api/random', methods=['GET'])
 def get_random():
-    """Get a random save for inspiration"""
-    conn = sqlite3.connect('saves.db')
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM saves ORDER BY RANDOM() LIMIT 1')
-    row = c.fetchone()
-    conn.close()
-    
-    if row:
-        return jsonify(dict(row))
+    """Get a random save for inspiration
+
+    ?category= / ?platform= filter, ?n= returns a list of up to n distinct
+    saves, ?recency=N makes half the picks come from the newest N saves.
+    """
+    n = request.args.get('n', type=int)
+    if 'n' in request.args and (n is None or n < 1):
+        return jsonify({'error': 'n must be a positive integer'}), 400
+    recency = request.args.get('recency', type=float)
+    saves = random_sampler.sample(
+        n=min(n or 1, RANDOM_MAX_N),
+        category=request.args.get('category'),
+        platform=request.args.get('platform'),
+        recency=recency if recency and recency > 0 else None
+    )
+    
+    if n is not None:
+        return jsonify(saves)
+    if saves:
+        return jsonify(saves[0])
     return jsonify({'error': 'No saves found'}), 404
 
+def analyze_link(url, allow_fallback=True, on_stage=None):
+    """Extract and tag a link without saving it. Returns (category, summary, row).
+
+    row holds save_to_db()'s arguments, or is None when the link is
+    already saved (by canonical URL) and was answered from the existing
+    row without fetching or tagging. on_stage is called with
+    jobqueue.FETCHING / jobqueue.TAGGING as the pipeline advances. With
+    allow_fallback=False, AI errors propagate.
+    """
+    if on_stage:
+        on_stage(jobqueue.FETCHING)
+    # Strip tracking params, unify hosts, follow short links
+    with metrics.STAGE_SECONDS.time(stage='canonicalize'):
+        canonical_url = canonicalizer.resolve(url)
+    existing = find_saved(canonical_url)
+    if existing:
+        return existing[0], existing[1], None
+    
+    # Extract content
+    content_data = extract_content(canonical_url)
+    caption = content_data['caption']
+    hashtags = content_data['hashtags']
+    platform = content_data['platform']
+    
+    if on_stage:
+        on_stage(jobqueue.TAGGING)
+    # AI processing
+    try:
+        category, summary, tagged_by = ai_tag_and_summarize(caption, hashtags, allow_fallback=allow_fallback)
+    except Exception as e:
+        logs.error('tagging_failed', url=url, error=e)
+        if not allow_fallback:
+            raise
+        # Use fallback
+        category = 'Other'
+        tagged_by = 'fallback'
+        summary = caption[:100] + "..." if len(caption) > 100 else (caption or "Content saved")
+    
+    # Ensure we have valid values
+    if not category:
+        category = 'Other'
+        tagged_by = 'fallback'
+    if not summary or summary == "Could not summarize":
+        summary = caption[:100] + "..." if caption and len(caption) > 10 else "Content saved successfully"
+    
+    return category, summary, (url, platform, caption, hashtags, category, summary, canonical_url, tagged_by)
+
+def ingest_link(url, allow_fallback=True, on_stage=None):
+    """Extract, tag and save a link. Returns (category, summary); see analyze_link()."""
+    category, summary, row = analyze_link(url, allow_fallback=allow_fallback, on_stage=on_stage)
+    if row is not None:
+        save_to_db(*row)
+    return category, summary
+
+def failed_row(url):
+    """save_to_db() arguments for a link whose processing failed: saved bare"""
+    return (url, 'unknown', url, [], 'Other', 'Link saved', None)
+
+def ingest_links(urls, allow_fallback=True):
+    """ingest_link() for every link of a message. Returns [(category, summary, error)] in order.
+
+    Links are extracted and tagged concurrently, up to LINK_CONCURRENCY at
+    a time, so a message takes about as long as its slowest link; then all
+    the new saves are written in one transaction. A link that fails is
+    saved bare (its error is returned), unless allow_fallback=False: then
+    the first error is raised and nothing is saved.
+    """
+    def analyze(url):
+        try:
+            return analyze_link(url, allow_fallback=allow_fallback), None
+        except Exception as e:
+            if not allow_fallback:
+                raise
+            logs.error('link_failed', url=url, error=e)
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(urls), LINK_CONCURRENCY)),
+                            thread_name_prefix='links') as pool:
+        outcomes = list(pool.map(analyze, urls))
+
+    rows = []
+    results = []
+    for url, (analyzed, error) in zip(urls, outcomes):
+        if error is not None:
+            rows.append(failed_row(url))
+            results.append(('Other', 'Link saved', error))
+            continue
+        category, summary, row = analyzed
+        if row is not None:
+            rows.append(row)
+        results.append((category, summary, None))
+    if rows:
+        with metrics.STAGE_SECONDS.time(stage='save'):
+            db_writer.write(insert_saves, rows)
+    return results
+
+def saved_reply(category, summary, host_url):
+    """Reply text for a successfully saved link"""
+    return f"✅ Got it! Saved to your '{category}' bucket.\n\n📝 {summary}\n\nView at: {host_url}"
+
+REPLY_MAX_LINES = 10
+
+def links_reply(results, host_url):
+    """One reply for the links of a message: a line per link (results from ingest_links())"""
+    lines = [f"✅ Got it! Saved {len(results)} links:", ""]
+    for number, (category, summary, error) in enumerate(results[:REPLY_MAX_LINES], 1):
+        if error is not None:
+            lines.append(f"{number}. 🔗 Link saved (processing had issues: {str(error)[:50]})")
+        else:
+            short = summary if len(summary) <= 80 else summary[:77] + "..."
+            lines.append(f"{number}. '{category}' - {short}")
+    if len(results) > REPLY_MAX_LINES:
+        lines.append(f"...and {len(results) - REPLY_MAX_LINES} more")
+    lines += ["", f"View at: {host_url}"]
+    return "\n".join(lines)
+
+def error_reply(error):
+    return f"❌ Oops! Something went wrong. Error: {str(error)[:100]}"
+
+def save_failed_link(url, error):
+    """Still save the link when processing fails. Returns the reply text."""
+    try:
+        save_to_db(*failed_row(url))
+        return f"✅ Link saved! (Processing had issues: {str(error)[:50]})"
+    except:
+        return error_reply(error)
+
+def process_link(url, host_url):
+    """Extract, tag and save a link. Returns the reply message for the user."""
+    try:
+        category, summary = ingest_link(url)
+        return saved_reply(category, summary, host_url)
+    except Exception as e:
+        logs.error('link_failed', url=url, error=e, exc_info=True)
+        return save_failed_link(url, e)
+
+def process_links(urls, host_url):
+    """process_link() for all the links of a message at once. Returns one combined reply."""
+    if len(urls) == 1:
+        return process_link(urls[0], host_url)
+    try:
+        return links_reply(ingest_links(urls), host_url)
+    except Exception as e:
+        logs.error('message_failed', links=len(urls), error=e, exc_info=True)
+        return error_reply(e)
+
+_twilio_client = None
+_twilio_client_lock = threading.Lock()
+
+def get_twilio_client():
+    """Lazily create the Twilio REST client used for out-of-band replies
+
+    The client is fully set up (base URL, and its lazily built messages
+    endpoint) before other threads can see it.
+    """
+    global _twilio_client
+    if _twilio_client is None:
+        with _twilio_client_lock:
+            if _twilio_client is None:
+                from twilio.rest import Client
+                client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+                if TWILIO_API_BASE:
+                    client.api.base_url = TWILIO_API_BASE
+                client.messages  # Builds the lazy api -> v2010 -> account chain now
+                _twilio_client = client
+    return _twilio_client
+
+def send_whatsapp_message(to_number, body):
+    """Send a WhatsApp message through the Twilio REST API"""
+    get_twilio_client().messages.create(
+        from_=TWILIO_WHATSAPP_NUMBER,
+        to=to_number,
+        body=body
+    )
+
+def run_ingest_job(job):
+    """Job queue handler: process the link, then reply to the sender via REST
+
+    Errors are raised so the queue retries with backoff; the keyword
+    fallback and the bare-link save are only used on the last attempt.
+    """
+    last_attempt = job_queue.is_last_attempt(job)
+    # A message with several links is one job: its URLs, one per line
+    urls = job['url'].split()
+    try:
+        if len(urls) > 1:
+            job_queue.set_state(job, jobqueue.FETCHING)
+            reply = links_reply(ingest_links(urls, allow_fallback=last_attempt), job['host_url'])
+        else:
+            category, summary = ingest_link(
+                job['url'],
+                allow_fallback=last_attempt,
+                on_stage=lambda state: job_queue.set_state(job, state)
+            )
+            reply = saved_reply(category, summary, job['host_url'])
+    except Exception as e:
+        if not last_attempt:
+            raise
+        logs.error('job_gave_up', job_id=job['id'], error=e)
+        reply = save_failed_link(job['url'], e) if len(urls) == 1 else error_reply(e)
+    
+    if job['from_number']:
+        try:
+            send_whatsapp_message(job['from_number'], reply)
+        except Exception as e:
+            # The save is done; retrying the job would only duplicate it
+            logs.error('reply_failed', job_id=job['id'], to=job['from_number'], error=e)
+
+# Durable background ingest (INGEST_MODE=async)
+job_queue = jobqueue.JobQueue(
+    db_path='saves.db',
+    handler=run_ingest_job,
+    workers=INGEST_WORKERS,
+    visibility_timeout=INGEST_VISIBILITY_TIMEOUT,
+    max_attempts=INGEST_MAX_ATTEMPTS,
+    retention=INGEST_JOB_RETENTION
+)
+if INGEST_MODE == 'async':
+    job_queue.start()
+
+def import_link(url):
+    """Importer handler: extract, tag and save one link of an import"""
+    try:
+        category, summary, row = analyze_link(url)
+    except Exception as e:
+        logs.warning('import_link_failed', url=url, error=e)
+        save_to_db(*failed_row(url))
+        return importer.FAILED
+    if row is None or save_to_db(*row) is None:
+        return importer.DUPLICATE
+    return importer.SAVED
+
+# Resumable bulk imports (flask import-links, POST /api/imports)
+link_importer = importer.Importer(
+    db_path='saves.db',
+    handler=import_link,
+    workers=IMPORT_WORKERS,
+    host_rate=IMPORT_HOST_RPS,
+    provider_rate=IMPORT_PROVIDER_RPS
+)
+
+@app.route('/api/imports', methods=['POST'])
+def start_import():
+    """Upload a file of links (multipart field "file") and import it in the background
+
+    ?format=text|html|json (default from the file name). Uploading a file
+    that was imported before resumes that import. Returns 202 with the
+    import record; poll GET /api/imports/<id> for progress.
+    """
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'No file uploaded (multipart field "file")'}), 400
+    fmt = request.args.get('format') or None
+    if fmt is not None and fmt not in importer.FORMATS:
+        return jsonify({'error': f"Unknown format: {fmt}"}), 400
+    
+    # Keep the upload on disk, named by content, so a re-upload resumes
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    partial = os.path.join(IMPORT_DIR, f"upload-{os.getpid()}-{time.time_ns()}.part")
+    upload.save(partial)
+    digest = importer.file_digest(partial)
+    path = os.path.join(IMPORT_DIR, digest)
+    os.replace(partial, path)
+    
+    record = link_importer.start(path, source=upload.filename, fmt=fmt, digest=digest)
+    return jsonify(record), 202
+
+@app.route('/api/imports/<int:import_id>', methods=['GET'])
+def get_import(import_id):
+    """Progress of an import: state, position (links handled), saved/duplicates/failed"""
+    record = link_importer.get(import_id)
+    if record is None:
+        return jsonify({'error': 'Import not found'}), 404
+    return jsonify(record)
+
+def valid_twilio_signature():
+    """Whether the request carries Twilio's signature for TWILIO_WEBHOOK_URL and its form fields"""
+    from twilio.request_validator import RequestValidator
+    return RequestValidator(TWILIO_AUTH_TOKEN or '').validate(
+        TWILIO_WEBHOOK_URL, request.form.to_dict(), request.headers.get('X-Twilio-Signature', ''))
+
 @app.route('/webhook', methods=['GET', 'POST'])
 def webhook():
     """Twilio webhook handler for WhatsApp messages"""
@@ -586,68 +1188,180 @@ def webhook():
         }), 200
     
     # Handle POST requests from Twilio
+    if TWILIO_WEBHOOK_URL and not valid_twilio_signature():
+        return jsonify({'error': 'Invalid Twilio signature'}), 403
+    
     incoming_msg = request.values.get('Body', '').strip()
     from_number = request.values.get('From', '')
     
     # Check if message contains a URL
     url_pattern = r'https?://[^\s]+'
-    urls = re.findall(url_pattern, incoming_msg)
+    urls = list(dict.fromkeys(re.findall(url_pattern, incoming_msg)))
     
     if not urls:
         resp = MessagingResponse()
         resp.message("👋 Hi! Send me an Instagram, Twitter, or article link and I'll save it to your dashboard!")
         return str(resp)
     
-    # Process the first URL found
-    url = urls[0]
-    
-    try:
-        # Extract content
-        content_data = extract_content(url)
-        caption = content_data['caption']
-        hashtags = content_data['hashtags']
-        platform = content_data['platform']
-        
-        # AI processing
-        try:
-            category, summary = ai_tag_and_summarize(caption, hashtags)
-        except Exception as e:
-            print(f"Error in AI processing: {e}")
-            # Use fallback
-            category = 'Other'
-            summary = caption[:100] + "..." if len(caption) > 100 else (caption or "Content saved")
-        
-        # Ensure we have valid values
-        if not category:
-            category = 'Other'
-        if not summary or summary == "Could not summarize":
-            summary = caption[:100] + "..." if caption and len(caption) > 10 else "Content saved successfully"
-        
-        # Save to database
-        save_to_db(url, platform, caption, hashtags, category, summary)
-        
-        # Respond to user
+    # All already saved? Answer from the existing rows, no network or AI work
+    existing = [find_saved(canonical.canonicalize(url)) for url in urls]
+    if all(existing):
         resp = MessagingResponse()
-        resp.message(f"✅ Got it! Saved to your '{category}' bucket.\n\n📝 {summary}\n\nView at: {request.host_url}")
+        if len(urls) == 1:
+            resp.message(saved_reply(existing[0][0], existing[0][1], request.host_url))
+        else:
+            resp.message(links_reply([(category, summary, None) for category, summary in existing], request.host_url))
         return str(resp)
     
-    except Exception as e:
-        print(f"Error processing message: {e}")
-        import traceback
-        traceback.print_exc()
-        resp = MessagingResponse()
-        # Still save the link even if processing fails
-        try:
-            save_to_db(url, 'unknown', url, [], 'Other', 'Link saved')
-            resp.message(f"✅ Link saved! (Processing had issues: {str(e)[:50]})")
-        except:
-            resp.message(f"❌ Oops! Something went wrong. Error: {str(e)[:100]}")
-        return str(resp)
+    if INGEST_MODE == 'async' and from_number:
+        # Ack right away; scraping and tagging must not count against
+        # Twilio's 15 s webhook timeout. One job per message, so its links
+        # get one reply.
+        job_queue.enqueue('\n'.join(urls), from_number, request.host_url)
+        return str(MessagingResponse())
+    
+    resp = MessagingResponse()
+    resp.message(process_links(urls, request.host_url))
+    return str(resp)
+
+def collect_metrics():
+    """Counters the caches, page reader, pool and breakers already keep, as /metrics samples"""
+    fetches = page_cache.stats()
+    answers = tag_cache.stats()
+    reads = page_stream.read_stats.stats()
+    pool = db_pool.stats()
+    writer = db_writer.stats()
+    samples = [
+        ('cache_lookups_total', 'counter', 'Page-fetch and AI result cache lookups by result', [
+            ({'cache': 'fetch', 'result': 'hit'}, fetches['hits']),
+            ({'cache': 'fetch', 'result': 'stale'}, fetches['stale']),
+            ({'cache': 'fetch', 'result': 'miss'}, fetches['misses']),
+            ({'cache': 'ai', 'result': 'hit'}, answers['hits']),
+            ({'cache': 'ai', 'result': 'miss'}, answers['misses']),
+        ]),
+        ('page_bytes_fetched_total', 'counter', 'Bytes of page bodies downloaded', [({}, reads['bytes_read'])]),
+        ('pages_fetched_total', 'counter', 'Page responses read', [({}, reads['pages'])]),
+        ('page_reads_cut_total', 'counter', 'Page bodies not read to the end, by reason', [
+            ({'reason': 'stopped_early'}, reads['stopped_early']),
+            ({'reason': 'truncated'}, reads['truncated']),
+            ({'reason': 'not_html'}, reads['not_html']),
+        ]),
+        ('db_pool_waits_total', 'counter', 'Borrows that waited for a free connection', [({}, pool['waits'])]),
+        ('db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a free connection', [({}, pool['wait_seconds'])]),
+        ('db_connections_in_use', 'gauge', 'Pooled connections currently borrowed', [({}, pool['in_use'])]),
+        ('db_write_batches_total', 'counter', 'Group-commit transactions', [({}, writer['batches'])]),
+        ('db_writes_total', 'counter', 'Writes committed through the group-commit writer', [({}, writer['writes'])]),
+        ('provider_circuit_open', 'gauge', '1 while a provider is skipped by its circuit breaker', [
+            ({'provider': name}, int(breaker.snapshot()['state'] == provider_health.OPEN))
+            for name, breaker in provider_breakers.items()
+        ]),
+    ]
+    if INGEST_MODE == 'async':
+        samples.append(('jobs', 'gauge', 'Ingest jobs per state', [
+            ({'state': state}, count) for state, count in job_queue.stats()['depth'].items()
+        ]))
+    return samples
+
+metrics.REGISTRY.add_collector(collect_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage and route latency histograms and counters, in Prometheus text format"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'ok', 'message': 'Server is running'}), 200
+    payload = {'status': 'ok', 'message': 'Server is running'}
+    payload['db'] = db_pool.stats()
+    payload['db']['writer'] = db_writer.stats()
+    payload['fetch_cache'] = page_cache.stats()
+    payload['page_reads'] = page_stream.read_stats.stats()
+    payload['html_parser'] = parsers.backend_name()
+    payload['ai_cache'] = tag_cache.stats()
+    payload['random'] = random_sampler.stats()
+    payload['providers'] = {name: breaker.snapshot() for name, breaker in provider_breakers.items()}
+    for name in payload['providers']:
+        payload['providers'][name]['latency'] = provider_latency.snapshot(name)
+        if name in provider_batchers:
+            payload['providers'][name]['batching'] = provider_batchers[name].stats()
+    payload['providers']['gemini']['endpoint'] = gemini_endpoint.snapshot()
+    if AI_PROVIDER == 'local':
+        payload['local_model'] = local_classifier.stats()
+    if INGEST_MODE == 'async':
+        payload['queue'] = job_queue.stats()
+    payload['imports'] = link_importer.stats()
+    return jsonify(payload), 200
+
+@app.cli.command('train-local-model')
+@click.option('--full', is_flag=True, help='Retrain from every save instead of only new ones')
+@click.option('--include-untagged', is_flag=True,
+              help='Also learn from saves made before tagged_by was recorded (implies --full); '
+                   'use it when those were tagged by an LLM provider')
+def train_local_model(full, include_untagged):
+    """Train the local classifier (AI_PROVIDER=local) from saves.db"""
+    start = time.perf_counter()
+    taggers = tuple(PROVIDER_NAMES) + ((None,) if include_untagged else ())
+    result = local_model.train('saves.db', LOCAL_MODEL_PATH, full=full or include_untagged, taggers=taggers)
+    if not result['added'] and not result['documents']:
+        click.echo("No LLM-tagged saves to train on (see --include-untagged); no model written")
+        return
+    click.echo(f"Trained on {result['added']} new saves ({result['documents']} total) "
+               f"in {time.perf_counter() - start:.2f}s -> {LOCAL_MODEL_PATH}/")
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats():
+    """Recompute the /api/stats counters from saves"""
+    with db_pool.connection() as conn:
+        conn.execute('BEGIN IMMEDIATE')  # No saves land between the count and the rewrite
+        drift = save_stats.rebuild(conn)
+    click.echo(f"Rebuilt save_stats ({drift} counters had drifted)")
+
+@app.cli.command('import-links')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(importer.FORMATS), default=None,
+              help='Default: from the file extension')
+def import_links_command(path, fmt):
+    """Import the links in PATH: a text list, bookmarks HTML or Instagram JSON export.
+
+    Interrupted imports resume from their checkpoint when run again.
+    """
+    record = link_importer.open(path, fmt=fmt)
+    if record['state'] == importer.DONE:
+        click.echo(f"{path} was already imported ({record['saved']} saved)")
+        return
+    if record['position']:
+        click.echo(f"Resuming import {record['id']} after {record['position']} links")
+    start = time.perf_counter()
+    first = record['position']
+    
+    def progress(record):
+        rate = (record['position'] - first) / max(time.perf_counter() - start, 1e-9)
+        click.echo(f"  {record['position']} links: {record['saved']} saved, {record['duplicates']} duplicates, "
+                   f"{record['failed']} failed ({rate:.1f} links/s)")
+    
+    record = link_importer.run(record, path, on_progress=progress)
+    click.echo(f"Imported {path} in {time.perf_counter() - start:.1f}s")
+
+@app.cli.command('export-saves')
+@click.argument('output', default='-')
+@click.option('--format', 'fmt', type=click.Choice(sorted(export.FORMATS)), default='ndjson')
+@click.option('--since', default=None, help='Only saves created after this timestamp')
+@click.option('--fields', default='', help='Comma-separated columns (default all)')
+def export_saves_command(output, fmt, since, fields):
+    """Export saves to OUTPUT (default stdout); gzipped if OUTPUT ends in .gz"""
+    try:
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--fields')
+    body = export.stream('saves.db', columns, format=fmt, since=since, compress=output.endswith('.gz'))
+    stream = click.get_binary_stream('stdout') if output == '-' else open(output, 'wb')
+    try:
+        for data in body:
+            stream.write(data)
+    finally:
+        if output != '-':
+            stream.close()
 
 if __name__ == '__main__':
     # Allow connections from all hosts (needed for ngrok)
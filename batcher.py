@@ -0,0 +1,105 @@
+"""
+Micro-batching for LLM tagging.
+
+During bulk shares dozens of saves arrive within seconds, each paying a
+full LLM round-trip with the same long instructions. MicroBatcher
+collects items from all threads for up to `max_batch` items or
+`max_wait` seconds, sends them as one batch call, and hands each caller
+its own result. Items the batch didn't answer validly are retried with
+a single call in the caller's thread, and so is every item of a batch
+whose reply couldn't be parsed at all (batch_fn raised ValueError, e.g. a
+JSON array cut off by the token limit). Any other error of the batch call
+(a transport error) is raised to every caller of that batch.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """Groups concurrent calls into batch calls"""
+
+    def __init__(self, batch_fn, single_fn, max_batch=16, max_wait=0.05, max_inflight=4, name='batch'):
+        """batch_fn(items) -> list of results (None = not answered); single_fn(item) -> result"""
+        self.batch_fn = batch_fn
+        self.single_fn = single_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix=f'{name}-call')
+        self._lock = threading.Lock()
+        self._counters = {'items': 0, 'batches': 0, 'batched_items': 0, 'singles': 0,
+                          'batch_errors': 0, 'unparsed_batches': 0}
+        self._thread = threading.Thread(target=self._collect, name=f'{name}-collector', daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        """Queue an item. The future resolves to its result, or None if the batch dropped it."""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def call(self, item):
+        """Blocking: batched result for item, falling back to a single call"""
+        result = self.submit(item).result()
+        if result is None:
+            with self._lock:
+                self._counters['singles'] += 1
+            result = self.single_fn(item)
+        return result
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        items = [item for item, _ in batch]
+        with self._lock:
+            self._counters['items'] += len(items)
+            self._counters['batches'] += 1
+        try:
+            if len(items) == 1:
+                results = [self.single_fn(items[0])]
+            else:
+                try:
+                    results = self.batch_fn(items)
+                except ValueError:
+                    # Unusable reply: every item is retried on its own
+                    with self._lock:
+                        self._counters['unparsed_batches'] += 1
+                    results = []
+        except Exception as e:
+            with self._lock:
+                self._counters['batch_errors'] += 1
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        results = list(results)[:len(batch)]
+        results += [None] * (len(batch) - len(results))
+        answered = 0
+        for (_, future), result in zip(batch, results):
+            if result is not None:
+                answered += 1
+            future.set_result(result)
+        with self._lock:
+            self._counters['batched_items'] += answered
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['avg_batch_size'] = round(stats['items'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['queued'] = self._queue.qsize()
+        return stats
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: throughput and per-item latency vs micro-batch size.
+
+A local OpenAI-compatible stub answers tagging prompts with a fixed
+per-request latency plus a small per-item cost, and serves at most
+--provider-concurrency requests at once (like a provider rate limit).
+A burst of saves is tagged through app.call_provider('openai', ...) with
+batching off and with MicroBatcher at several batch sizes.
+
+Then the stub cuts every batch reply off mid-array (as the token limit
+does) and the check is that each item is still answered by a single
+call, and that the provider's circuit breaker records no failures.
+
+Usage: python benchmarks/bench_batching.py [--items 512] [--sizes 1,4,8,16,32]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import batcher
+from stubs import CAPTIONS, StubServer, batch_size, llm_route
+
+
+def make_route(per_item):
+    def route(method, path, body):
+        prompt = body.decode('utf-8', 'replace')
+        time.sleep(per_item * batch_size(prompt))
+        return llm_route(method, path, body)
+    return route
+
+
+def truncating_route(method, path, body):
+    """llm_route() whose batch replies stop halfway through the JSON array"""
+    status, headers, data = llm_route(method, path, body)
+    if batch_size(json.loads(body)['messages'][-1]['content']) > 1:
+        payload = json.loads(data)
+        content = payload['choices'][0]['message']['content']
+        payload['choices'][0]['message']['content'] = content[:len(content) // 2]
+        payload['choices'][0]['finish_reason'] = 'length'
+        data = json.dumps(payload).encode()
+    return status, headers, data
+
+
+def make_batcher(app, size, wait_ms, inflight):
+    """The OpenAI MicroBatcher as app.py builds it, with another batch size"""
+    return batcher.MicroBatcher(
+        app.with_breaker('openai', app.ai_tag_batch_openai, batch=True),
+        app.with_breaker('openai', lambda item: app.ai_tag_and_summarize_openai(*item)),
+        max_batch=size, max_wait=wait_ms / 1000.0, max_inflight=inflight
+    )
+
+
+def run_burst(app, items, threads):
+    latencies = []
+
+    def one(item):
+        start = time.perf_counter()
+        result = app.call_provider('openai', *item)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(one, items))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return results, elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--items', type=int, default=512)
+    parser.add_argument('--threads', type=int, default=64, help='concurrent savers')
+    parser.add_argument('--sizes', default='1,4,8,16,32', help='batch sizes to try')
+    parser.add_argument('--wait-ms', type=float, default=50)
+    parser.add_argument('--latency', type=float, default=0.3, help='stub latency per request (s)')
+    parser.add_argument('--per-item', type=float, default=0.01, help='stub cost per item (s)')
+    parser.add_argument('--provider-concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    items = [(f"{CAPTIONS[i % len(CAPTIONS)]} (post {i})", []) for i in range(args.items)]
+
+    with StubServer(make_route(args.per_item), latency=args.latency,
+                    max_concurrency=args.provider_concurrency) as llm:
+        os.environ.update(OPENAI_API_KEY='stub', OPENAI_BASE_URL=f"{llm.url}/v1", AI_BATCHING='false')
+        os.chdir(tempfile.mkdtemp())  # keep saves.db out of the working tree
+        import app
+
+        print(f"{'batch':>7} {'items/s':>9} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        baseline = None
+        for size in ['off'] + [int(s) for s in args.sizes.split(',')]:
+            app.provider_batchers.clear()
+            if size != 'off':
+                app.provider_batchers['openai'] = make_batcher(
+                    app, size, args.wait_ms, args.provider_concurrency)
+            before = llm.requests
+            results, elapsed, latencies = run_burst(app, items, args.threads)
+            requests = llm.requests - before
+            if baseline is None:
+                baseline = results
+            elif results != baseline:
+                print(f"batch size {size}: results differ from unbatched calls")
+                return 1
+            print(f"{size!s:>7} {len(items) / elapsed:9.1f} {requests:9d} "
+                  f"{latencies[len(latencies) // 2] * 1000:8.0f} {latencies[int(len(latencies) * 0.95)] * 1000:8.0f}")
+
+    with StubServer(truncating_route, latency=0.05) as llm:
+        app.OPENAI_BASE_URL = f"{llm.url}/v1"
+        app._openai_client = None
+        breaker = app.provider_breakers['openai']
+        failures_before = breaker.total_failures
+        app.provider_batchers['openai'] = make_batcher(app, 8, args.wait_ms, args.provider_concurrency)
+        burst = items[:64]
+        results, _, _ = run_burst(app, burst, len(burst))
+        stats = app.provider_batchers['openai'].stats()
+        breaker_failures = breaker.total_failures - failures_before
+        print(f"\ntruncated batch replies: {stats['unparsed_batches']} batches unparsed, "
+              f"{stats['singles']} single retries, {breaker_failures} breaker failures")
+        if stats['singles'] != len(burst) - stats['batched_items'] or breaker_failures:
+            print("FAIL: items of an unparseable batch weren't retried alone, or counted as provider failures")
+            return 1
+        if results != baseline[:len(burst)]:
+            print("FAIL: the retried items were answered differently")
+            return 1
+    print("OK: same answers at every batch size; unparseable batches retried item by item")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark and accuracy check: compiled keyword classifier vs the old fallback.
+
+Times the previous substring-scan fallback (copied below as
+legacy_classify), KeywordClassifier.classify() and classify_many() on a
+synthetic corpus of captions, then checks:
+
+- classify_many() returns exactly what classify() returns per caption
+- a table of known captions, including the substring false positives the
+  old code had ("happy" -> Coding), gets the expected category
+- agreement with the old fallback stays above --min-agreement (the two
+  differ by design where the old code matched inside longer words)
+
+Usage: python benchmarks/bench_classifier.py [--captions 20000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from stubs import CAPTIONS
+
+import classifier
+
+# The fallback as it was before classifier.py (duplicates included)
+LEGACY_KEYWORDS = {
+    'Fitness': ['workout', 'fitness', 'exercise', 'gym', 'abs', 'cardio', 'yoga', 'pilates', 'running', 'training', 'muscle', 'strength', 'health', 'fit', 'diet', 'weight', 'nutrition'],
+    'Coding': ['code', 'programming', 'developer', 'python', 'javascript', 'coding', 'tutorial', 'algorithm', 'software', 'tech', 'coding', 'webdev', 'app', 'api', 'github', 'stackoverflow'],
+    'Food': ['recipe', 'food', 'cooking', 'pasta', 'meal', 'dish', 'cuisine', 'chef', 'baking', 'restaurant', 'delicious', 'tasty', 'recipe', 'cook', 'kitchen', 'dinner', 'lunch', 'breakfast'],
+    'Travel': ['travel', 'trip', 'vacation', 'destination', 'traveling', 'adventure', 'wanderlust', 'explore', 'journey', 'vacation', 'holiday', 'tourism', 'visit', 'sightseeing'],
+    'Design': ['design', 'graphic', 'ui', 'ux', 'art', 'creative', 'illustration', 'logo', 'branding', 'aesthetic', 'visual', 'typography', 'layout'],
+    'Fashion': ['fashion', 'style', 'outfit', 'clothing', 'wardrobe', 'trend', 'fashionable', 'dress', 'accessories', 'style'],
+    'Music': ['music', 'song', 'artist', 'album', 'concert', 'musician', 'beat', 'lyrics', 'spotify', 'playlist'],
+    'Photography': ['photo', 'photography', 'camera', 'shot', 'picture', 'image', 'photographer', 'lens', 'portrait', 'landscape'],
+    'Business': ['business', 'entrepreneur', 'startup', 'marketing', 'sales', 'strategy', 'finance', 'investment', 'company'],
+    'Education': ['learn', 'education', 'study', 'course', 'tutorial', 'lesson', 'student', 'school', 'university', 'knowledge']
+}
+
+
+def legacy_classify(caption, hashtags):
+    all_text = (caption or "").lower() + " " + " ".join(h.lower() for h in (hashtags or []))
+    scores = {}
+    for category, keywords in LEGACY_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in all_text)
+        if score > 0:
+            scores[category] = score
+    return max(scores, key=scores.get) if scores else 'Other'
+
+
+# (caption, hashtags, expected category)
+KNOWN_CASES = [
+    ("Full body workout you can do at home", [], 'Fitness'),
+    ("My favourite pasta recipe for busy weeknights", ['#food'], 'Food'),
+    ("Learning Python: build your first API with Flask", ['#coding'], 'Coding'),
+    ("Hidden beaches to visit on your next trip", ['#travel'], 'Travel'),
+    ("Three outfits for autumn", ['#fashion', '#style'], 'Fashion'),
+    ("New album drops Friday, first song out now", [], 'Music'),
+    ("Portrait lens comparison, shot on film", ['#photography'], 'Photography'),
+    ("How we grew our startup with zero marketing budget", [], 'Business'),
+    ("Study tips for university students", ['#education'], 'Education'),
+    ("Typography and layout basics for UI design", [], 'Design'),
+    ("Morning workouts and healthy dishes", [], 'Fitness'),
+    ("Python tutorial for beginners", [], 'Coding'),
+    # Substring false positives in the old fallback
+    ("So happy with how today went", [], 'Other'),     # "app" in "happy"
+    ("Start the weekend right", [], 'Other'),          # "art" in "start"
+    ("Unbeatable deals this weekend only", [], 'Other'),  # "beat" in "unbeatable"
+    ("Guitar practice on the sofa", [], 'Other'),      # "ui" in "guitar"
+    ("", [], 'Other'),
+    (None, None, 'Other'),
+]
+
+# Filler words that contain no keyword, so the old substring scan and the
+# word-boundary match only disagree on the keywords themselves
+FILLER = [word for word in (
+    "the a my our this that with for and on at to of in best new quick easy simple today "
+    "week morning night guide tips ideas favourite favorite top ten must try love look "
+    "here why how your some every little big great good more from into after before "
+    "happy start grateful guitar unbeatable sofa weekend"
+).split() if not any(k in word for words in LEGACY_KEYWORDS.values() for k in words)]
+
+
+def make_corpus(count, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [word for words in classifier.CATEGORY_KEYWORDS.values() for word in words]
+    corpus = []
+    for i in range(count):
+        if i % 4 == 0:
+            caption = CAPTIONS[i % len(CAPTIONS)]
+        else:
+            words = rng.sample(FILLER, rng.randint(4, 14))
+            for _ in range(rng.randint(0, 4)):
+                word = rng.choice(vocabulary)
+                if rng.random() < 0.2:
+                    word += 's'
+                words.insert(rng.randrange(len(words) + 1), word)
+            caption = ' '.join(words).capitalize()
+        hashtags = ['#' + rng.choice(vocabulary) for _ in range(rng.randint(0, 3))]
+        corpus.append((caption, hashtags))
+    return corpus
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--captions', type=int, default=20000)
+    parser.add_argument('--min-agreement', type=float, default=0.85)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.captions)
+    captions = [c for c, _ in corpus]
+    hashtags = [h for _, h in corpus]
+    engine, build_time = timed(classifier.KeywordClassifier)
+
+    legacy, legacy_time = timed(lambda: [legacy_classify(c, h) for c, h in corpus])
+    single, single_time = timed(lambda: [engine.classify(c, h) for c, h in corpus])
+    batch, batch_time = timed(lambda: engine.classify_many(captions, hashtags))
+
+    print(f"{len(corpus)} captions (classifier built in {build_time * 1000:.1f} ms)")
+    for name, seconds in (('legacy substring scan', legacy_time),
+                          ('classify()', single_time),
+                          ('classify_many()', batch_time)):
+        print(f"  {name:<22} {seconds * 1000:8.1f} ms  {len(corpus) / seconds:10.0f} captions/s  "
+              f"{legacy_time / seconds:5.1f}x")
+
+    failures = 0
+    if batch != single:
+        mismatches = sum(1 for a, b in zip(batch, single) if a != b)
+        print(f"FAIL: classify_many() differs from classify() on {mismatches} captions")
+        failures += 1
+
+    for caption, tags, expected in KNOWN_CASES:
+        got = engine.classify(caption, tags)
+        if got != expected or engine.classify_many([caption], [tags]) != [expected]:
+            print(f"FAIL: {caption!r} {tags} -> {got}, expected {expected}")
+            failures += 1
+
+    agreement = sum(1 for a, b in zip(legacy, single) if a == b) / len(corpus)
+    print(f"  agreement with legacy fallback: {agreement:.1%}")
+    if agreement < args.min_agreement:
+        print(f"FAIL: agreement below {args.min_agreement:.0%}")
+        failures += 1
+    examples = [(c, h, a, b) for (c, h), a, b in zip(corpus, legacy, single) if a != b][:5]
+    for caption, tags, old, new in examples:
+        print(f"    {old:>11} -> {new:<11} {caption[:60]!r} {tags}")
+
+    print("OK" if not failures else f"{failures} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
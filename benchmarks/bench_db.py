@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark: saves.db access, connect-per-call vs db.ConnectionPool.
+
+Reader threads run the hot request queries (find_saved() by canonical
+URL, a /api/saves page) while a writer thread inserts saves one commit
+at a time, like save_to_db() during a burst of shares. The baseline opens
+a fresh connection per call on a rollback-journal database (the old
+code); the pool reuses tuned connections on a WAL database. Reports
+reads/s, read latency percentiles, writes/s and "database is locked"
+errors, then checks that pooled readers see each write once it commits.
+
+Usage: python benchmarks/bench_db.py [--rows 100000] [--readers 8] [--seconds 3]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import db
+import schema
+
+CATEGORIES = ['Fitness', 'Coding', 'Food', 'Travel', 'Design', 'Other']
+
+FIND_SQL = 'SELECT category, summary FROM saves WHERE canonical_url = ?'
+PAGE_SQL = 'SELECT id, url, category, summary, created_at FROM saves ORDER BY created_at DESC, id DESC LIMIT 50'
+INSERT_SQL = '''
+    INSERT OR IGNORE INTO saves (url, platform, caption, hashtags, category, summary, canonical_url)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def build(db_path, rows, seed=5):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    schema.create_tables(conn)
+    conn.executemany(
+        'INSERT INTO saves (url, platform, caption, category, summary, canonical_url) VALUES (?, ?, ?, ?, ?, ?)',
+        ((f"https://example.com/p/{i}", 'article', f"caption {i} " * 20, rng.choice(CATEGORIES), 'summary',
+          f"https://example.com/p/{i}") for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def connect_per_call(db_path):
+    """The old pattern: a new connection for every query or save"""
+    def run(sql, params=(), write=False):
+        conn = sqlite3.connect(db_path, timeout=5)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+            if write:
+                conn.commit()
+            return rows
+        finally:
+            conn.close()
+    return run
+
+
+def pooled(db_path, size):
+    pool = db.ConnectionPool(db_path, size=size, timeout=5)
+    def run(sql, params=(), write=False):
+        with pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+    return run, pool
+
+
+def load(run, rows, readers, seconds):
+    stop = threading.Event()
+    latencies = [[] for _ in range(readers)]
+    errors = [0]
+    writes = [0]
+
+    def reader(i):
+        rng = random.Random(i)
+        samples = latencies[i]
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                if rng.random() < 0.8:
+                    run(FIND_SQL, (f"https://example.com/p/{rng.randrange(rows)}",))
+                else:
+                    run(PAGE_SQL)
+            except sqlite3.OperationalError:
+                errors[0] += 1
+                continue
+            samples.append(time.perf_counter() - start)
+
+    def writer():
+        n = rows
+        while not stop.is_set():
+            url = f"https://example.com/new/{n}"
+            try:
+                run(INSERT_SQL, (url, 'article', 'a new caption ' * 10, '#new', 'Other', 'summary', url), write=True)
+                writes[0] += 1
+            except sqlite3.OperationalError:
+                errors[0] += 1
+            n += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    samples = sorted(s for per_thread in latencies for s in per_thread)
+    return {
+        'reads_per_s': len(samples) / seconds,
+        'p50_ms': statistics.median(samples) * 1000 if samples else float('nan'),
+        'p99_ms': samples[int(len(samples) * 0.99)] * 1000 if samples else float('nan'),
+        'writes_per_s': writes[0] / seconds,
+        'errors': errors[0],
+    }
+
+
+def check_visibility(db_path):
+    """A save committed through the pool is visible to the next borrower on another thread"""
+    pool = db.ConnectionPool(db_path, size=4)
+    failures = 0
+    for i in range(200):
+        url = f"https://example.com/check/{i}"
+        with pool.connection() as conn:
+            conn.execute(INSERT_SQL, (url, 'article', 'check', '', 'Other', 'summary', url))
+        found = []
+        t = threading.Thread(target=lambda: found.append(pool_find(pool, url)))
+        t.start()
+        t.join()
+        if found != [('Other', 'summary')]:
+            failures += 1
+    journal = pool_journal_mode(pool)
+    if journal != 'wal':
+        print(f"FAIL: journal_mode is {journal}, expected wal")
+        failures += 1
+    if failures:
+        print(f"FAIL: {failures} visibility checks failed")
+    else:
+        print("OK: pooled readers see every committed save; database is in WAL mode")
+    return failures
+
+
+def pool_find(pool, url):
+    with pool.connection() as conn:
+        return conn.execute(FIND_SQL, (url,)).fetchone()
+
+
+def pool_journal_mode(pool):
+    with pool.connection() as conn:
+        return conn.execute('PRAGMA journal_mode').fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix='bench_db_')
+    try:
+        template = os.path.join(work, 'template.db')
+        print(f"Building {args.rows} saves...")
+        build(template, args.rows)
+
+        baseline_path = os.path.join(work, 'baseline.db')
+        shutil.copy(template, baseline_path)
+        baseline = load(connect_per_call(baseline_path), args.rows, args.readers, args.seconds)
+
+        pooled_path = os.path.join(work, 'pooled.db')
+        shutil.copy(template, pooled_path)
+        run, pool = pooled(pooled_path, size=args.readers + 1)
+        result = load(run, args.rows, args.readers, args.seconds)
+        pool.close()
+
+        print(f"\n{args.readers} readers + 1 writer for {args.seconds:g}s")
+        print(f"{'mode':<28}{'reads/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'writes/s':>10}{'errors':>8}")
+        for name, r in (('connect per call (rollback)', baseline), ('pool + WAL', result)):
+            print(f"{name:<28}{r['reads_per_s']:>10.0f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                  f"{r['writes_per_s']:>10.0f}{r['errors']:>8}")
+        print()
+        failures = check_visibility(pooled_path)
+    finally:
+        shutil.rmtree(work)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
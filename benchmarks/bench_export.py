@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming export (export.py) vs materializing the table.
+
+Fills saves tables of increasing size, then exports each as NDJSON and
+CSV, plain and gzipped, each in a forked child process, recording time,
+output size and the child's peak RSS. The old approach, fetchall() into dicts and one
+json.dumps(), is measured alongside for comparison. Every export is read
+back to check that it holds every row.
+
+Usage: python benchmarks/bench_export.py [--sizes 100000,1000000]
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import multiprocessing
+import os
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from stubs import CAPTIONS
+
+import export
+import schema
+
+FIELDS = ['id', 'url', 'platform', 'caption', 'hashtags', 'category', 'summary', 'created_at']
+
+
+def build(db_path, size):
+    conn = sqlite3.connect(db_path)
+    schema.create_tables(conn)
+    conn.executemany(
+        'INSERT INTO saves (url, platform, caption, hashtags, category, summary, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((f"https://example.com/p/{i}", 'article', CAPTIONS[i % len(CAPTIONS)] * 3, '#one, #two', 'Other',
+          CAPTIONS[i % len(CAPTIONS)], f"2026-01-{1 + i % 28:02d} {i % 24:02d}:00:00") for i in range(size))
+    )
+    conn.commit()
+    conn.close()
+
+
+def _child(fn, pipe):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    pipe.send((result, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024))
+    pipe.close()
+
+
+def measure(fn):
+    """(result, seconds, peak RSS bytes) of fn() run in a forked child process"""
+    context = multiprocessing.get_context('fork')
+    parent, child = context.Pipe(duplex=False)
+    process = context.Process(target=_child, args=(fn, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    return result
+
+
+def write_stream(body, path):
+    with open(path, 'wb') as f:
+        for data in body:
+            f.write(data)
+    return os.path.getsize(path)
+
+
+def materialize(db_path, path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute('SELECT * FROM saves ORDER BY created_at DESC').fetchall()]
+    conn.close()
+    with open(path, 'w') as f:
+        f.write(json.dumps(rows))
+    return os.path.getsize(path)
+
+
+def count_rows(path, fmt):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            return sum(1 for _ in csv.reader(f)) - 1
+        return sum(1 for line in f if json.loads(line))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='100000,1000000')
+    parser.add_argument('--skip-materialize-above', type=int, default=200000,
+                        help='only run the fetchall() baseline up to this many rows')
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    print(f"{'rows':>8} {'export':>16} {'seconds':>8} {'MB out':>8} {'peak RSS MB':>12}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        db_path = os.path.join(work, f"saves_{size}.db")
+        build(db_path, size)
+        runs = [(fmt, gz) for fmt in ('ndjson', 'csv') for gz in (False, True)]
+        for fmt, gz in runs:
+            path = os.path.join(work, f"out.{fmt}" + ('.gz' if gz else ''))
+            written, seconds, peak = measure(
+                lambda: write_stream(export.stream(db_path, FIELDS, format=fmt, compress=gz), path))
+            rows = count_rows(path, fmt)
+            if rows != size:
+                print(f"FAIL: {fmt} export holds {rows} rows, expected {size}")
+                return 1
+            label = fmt + (' + gzip' if gz else '')
+            print(f"{size:8d} {label:>16} {seconds:8.2f} {written / 1e6:8.1f} {peak / 1e6:12.1f}")
+        if size <= args.skip_materialize_above:
+            path = os.path.join(work, 'out.json')
+            written, seconds, peak = measure(lambda: materialize(db_path, path))
+            print(f"{size:8d} {'fetchall + dumps':>16} {seconds:8.2f} {written / 1e6:8.1f} {peak / 1e6:12.1f}")
+        os.remove(db_path)
+    print("OK: every export holds every row")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full page downloads vs bounded streaming reads.
+
+Serves heavy pages from a local stub server, the way the real sites are
+heavy: social pages with megabytes of inline JSON and markup after the
+<head>, articles followed by long comment threads, a latin-1 page and an
+image behind a link. Each link is then fetched through:
+
+    full      requests .text, then parsers.parse_content() (the original path)
+    stream    stream=True + page_stream.read_html(), then parse_content()
+
+and the benchmark reports bytes read and time per link, and checks that
+both paths extract the same caption and hashtags from every HTML page and
+that the image is never downloaded by the streaming path.
+
+Usage: python benchmarks/bench_fetch.py [--links 60] [--page-kb 3072]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import page_stream
+import parsers
+from stubs import CAPTIONS, StubServer
+
+KINDS = ['instagram.com/p', 'x.com/status', 'article', 'latin1/article', 'image']
+
+
+def heavy_route(page_kb):
+    filler = '<div class="c">' + 'x' * 1000 + '</div>'
+    tail = filler * page_kb
+
+    def route(method, path, body):
+        n = int(path.rstrip('/').rsplit('/', 1)[-1] or 0)
+        caption = CAPTIONS[n % len(CAPTIONS)]
+        if '/image/' in path:
+            return 200, {'Content-Type': 'image/jpeg'}, b'\xff\xd8' + b'\0' * (page_kb * 1024)
+        if '/latin1/' in path:
+            title = f'Café crème {n}'
+            html = (f'<html><head><title>{title}</title></head><body><article><h1>{title}</h1>'
+                    f'<p>{caption} à la française</p></article><section>{tail}</section></body></html>')
+            return 200, {'Content-Type': 'text/html; charset=ISO-8859-1'}, html.encode('latin-1')
+        if '/article/' in path:
+            html = (f'<!DOCTYPE html><html><head><title>{caption.split("#")[0].strip()}</title></head>'
+                    f'<body><nav>Home</nav><article><h1>Post {n}</h1>{"<p>" + caption + "</p>" * 20}'
+                    f'<article class="quote"><p>nested</p></article></article>'
+                    f'<section id="comments">{tail}</section></body></html>')
+        else:
+            html = (f'<!DOCTYPE html><html><head><title>Post {n}</title>'
+                    f'<script>window.__data = "{"y" * 20000}";</script>'
+                    f'<meta property="og:title" content="Post {n}">'
+                    f'<meta property="og:description" content="{caption}">'
+                    f'</head><body>{tail}</body></html>')
+        return 200, {'Content-Type': 'text/html; charset=utf-8'}, html.encode()
+
+    return route
+
+
+def fetch_full(session, url, platform):
+    response = session.get(url, timeout=30)
+    html = response.text if response.status_code == 200 and page_stream.is_html(
+        response.headers.get('Content-Type')) else None
+    return parsers.parse_content(platform, html), len(response.content)
+
+
+def fetch_stream(session, url, platform, max_bytes):
+    before = page_stream.read_stats.stats()['bytes_read']
+    response = session.get(url, timeout=30, stream=True)
+    html = page_stream.read_html(response, platform, max_bytes=max_bytes)
+    return parsers.parse_content(platform, html), page_stream.read_stats.stats()['bytes_read'] - before
+
+
+def run(fetch, urls, *args):
+    session = requests.Session()
+    results, total_bytes = [], 0
+    start = time.perf_counter()
+    for url in urls:
+        content, read = fetch(session, url, parsers.detect_platform(url), *args)
+        results.append(content)
+        total_bytes += read
+    return results, total_bytes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=60)
+    parser.add_argument('--page-kb', type=int, default=3072, help='size of the heavy part of each page')
+    parser.add_argument('--max-bytes', type=int, default=page_stream.DEFAULT_MAX_BYTES)
+    args = parser.parse_args()
+
+    with StubServer(heavy_route(args.page_kb)) as server:
+        urls = [f"{server.url}/{KINDS[i % len(KINDS)]}/{i}" for i in range(args.links)]
+        full, full_bytes, full_seconds = run(fetch_full, urls)
+        streamed, stream_bytes, stream_seconds = run(fetch_stream, urls, args.max_bytes)
+
+    print(f"{'path':<8}{'MB read':>10}{'KB/link':>10}{'ms/link':>10}")
+    for name, total, seconds in (('full', full_bytes, full_seconds), ('stream', stream_bytes, stream_seconds)):
+        print(f"{name:<8}{total / 1024 / 1024:>10.1f}{total / 1024 / len(urls):>10.1f}"
+              f"{seconds * 1000 / len(urls):>10.1f}")
+    print(f"\nstream reads {full_bytes / max(stream_bytes, 1):.0f}x fewer bytes, "
+          f"{full_seconds / stream_seconds:.1f}x faster per link")
+    print(f"page_reads: {page_stream.read_stats.stats()}\n")
+
+    failures = 0
+    for url, a, b in zip(urls, full, streamed):
+        if '/image/' in url:
+            continue
+        if (a['caption'], a['hashtags']) != (b['caption'], b['hashtags']):
+            print(f"FAIL: {url} extracted differently:\n  full:   {a['caption'][:80]!r}\n  stream: {b['caption'][:80]!r}")
+            failures += 1
+    if page_stream.read_stats.stats()['not_html'] != sum('/image/' in url for url in urls):
+        print("FAIL: a non-HTML body was read")
+        failures += 1
+    if not failures:
+        print("OK: identical captions and hashtags for every HTML page; non-HTML bodies skipped")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pooled HTTP connections with per-host limits vs bare requests.
+
+Fetches pages from a local stub server and tags each one with a Hugging
+Face call to an LLM stub, from --threads threads, two ways:
+
+    bare      requests.get() / requests.post() per call (the original
+              path: a new connection every time)
+    pooled    app.fetch_page() and app.http_session.post(): keep-alive
+              connections, at most HOST_CONCURRENCY per host
+
+and reports links per second and connections opened (both read whole
+pages and skip parsing, so only the HTTP layer differs). Then checks
+that HOST_CONCURRENCY holds: 4x that many requests to one slow host from
+as many threads take at least 4 round trips, through the shared session
+and through the shared OpenAI client, while a second host isn't slowed.
+
+Usage: python benchmarks/bench_http_pool.py [--links 400] [--threads 64] [--host-concurrency 16]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import tagging
+from stubs import StubServer, llm_route
+from bench_message import unique_pages_route
+
+SLOW = 0.1  # Seconds per request on the stubs that check the limits
+
+
+def run(fn, items, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(fn, items))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--host-concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    with StubServer(unique_pages_route, latency=0.01) as pages, StubServer(llm_route, latency=0.01) as llm, \
+            StubServer(unique_pages_route, latency=SLOW) as slow_pages, \
+            StubServer(unique_pages_route, latency=SLOW) as other_pages, \
+            StubServer(llm_route, latency=SLOW) as slow_llm:
+        os.environ['HOST_CONCURRENCY'] = str(args.host_concurrency)
+        os.environ['HUGGINGFACE_API_BASE'] = llm.url
+        os.environ['OPENAI_API_KEY'] = 'stub'
+        os.environ['OPENAI_BASE_URL'] = slow_llm.url + '/v1'
+        os.environ['LOG_LEVEL'] = 'error'
+        os.chdir(tempfile.mkdtemp())  # keep saves.db out of the working tree
+        import app
+
+        urls = [f"{pages.url}/instagram.com/p/{i}" for i in range(args.links)]
+        hf_url = f"{llm.url}/models/{app.HUGGINGFACE_MODEL}"
+
+        def bare(url):
+            requests.get(url, headers=app.BROWSER_HEADERS, timeout=10).content
+            requests.post(hf_url, json={'inputs': tagging.build_prompt(url, [])}, timeout=10).json()
+
+        def pooled(url):
+            app.fetch_page(url).content
+            app.http_session.post(hf_url, json={'inputs': tagging.build_prompt(url, [])}, timeout=10).json()
+
+        def connections():
+            return sum(app.http_session.get_adapter(url).get_connection(url).num_connections
+                       for url in (pages.url, llm.url))
+
+        pooled(urls[0])
+        app.openai_complete(tagging.build_prompt('warm up', []), 50)  # The client's first call is slow
+        requests_before, connections_before = pages.requests + llm.requests, connections()
+        bare_time = run(bare, urls, args.threads)
+        bare_connections = pages.requests + llm.requests - requests_before
+        connections_before = connections()
+        pooled_time = run(pooled, urls, args.threads)
+        pooled_connections = connections() - connections_before
+
+        print(f"{args.links} links (page fetch + Hugging Face call) from {args.threads} threads, "
+              f"HOST_CONCURRENCY={args.host_concurrency}")
+        for name, seconds, opened in (('bare requests', bare_time, bare_connections),
+                                      ('pooled session', pooled_time, pooled_connections)):
+            print(f"  {name:<16}{seconds:8.2f}s {args.links / seconds:8.0f} links/s {opened:6d} connections opened")
+
+        burst = 4 * args.host_concurrency
+        minimum = 4 * SLOW * 0.9
+        slow_urls = [f"{slow_pages.url}/article/{i}" for i in range(burst)]
+        other_urls = [f"{other_pages.url}/article/{i}" for i in range(burst)]
+        timings = {
+            'bare, one host': run(lambda url: requests.get(url, timeout=10).text, slow_urls, burst),
+            'session, one host': run(lambda url: app.fetch_page(url).close(), slow_urls, burst),
+            'session, two hosts': run(lambda url: app.fetch_page(url).close(), slow_urls + other_urls, 2 * burst),
+            'OpenAI client': run(lambda i: app.openai_complete(tagging.build_prompt(f"post {i}", []), 50),
+                                 range(burst), burst),
+        }
+        print(f"\n{burst} requests at once per host, {SLOW * 1000:.0f} ms each:")
+        for name, seconds in timings.items():
+            print(f"  {name:<20}{seconds:6.2f}s")
+
+    failures = 0
+    if pooled_connections > 2 * args.host_concurrency:
+        print(f"FAIL: the pooled session opened {pooled_connections} connections for 2 hosts")
+        failures += 1
+    for name in ('session, one host', 'OpenAI client'):
+        if timings[name] < minimum:
+            print(f"FAIL: {name}: {burst} requests took {timings[name]:.2f}s, "
+                  f"HOST_CONCURRENCY={args.host_concurrency} allows no less than {minimum:.2f}s")
+            failures += 1
+    if timings['session, two hosts'] > 1.5 * timings['session, one host']:
+        print("FAIL: requests to a second host waited for the first host's limit")
+        failures += 1
+
+    print()
+    if not failures:
+        print("OK: connections reused, at most HOST_CONCURRENCY requests in flight per host")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk import throughput, resume after an interruption, rate limits.
+
+Writes an archive of links (with repeats and tracking-parameter variants
+of the same link) as a text list, a bookmarks HTML file and an Instagram
+saved_posts.json, and checks that importer.iter_links() finds the same
+links in all three, even when read a few bytes at a time. Then, against
+local page and Hugging Face stubs with latency:
+
+    * imports the text list with IMPORT_WORKERS threads, interrupting it
+      a third of the way through and running it again, and checks that it
+      resumed from the checkpoint and saved every distinct link once
+    * imports a file with the per-host limit set, and checks the stub saw
+      no more requests per second than allowed
+    * imports a file with AI_PROVIDER=fallback and a provider limit of
+      1/s, and checks it isn't throttled (the keyword classifier makes
+      no remote calls)
+
+Usage: python benchmarks/bench_import.py [--links 2000] [--workers 16] [--latency 0.05]
+"""
+
+import argparse
+import html
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from stubs import StubServer, llm_route
+from bench_message import unique_pages_route
+
+KINDS = ['instagram.com/p', 'x.com/status', 'article']
+
+
+class Interrupted(Exception):
+    pass
+
+
+def make_links(base, count, first=0):
+    links = []
+    for i in range(first, first + count):
+        url = f"{base}/{KINDS[i % 3]}/{i}"
+        links.append(url)
+        if i % 10 == 0:
+            links.append(url + '?utm_source=ig_share')  # the same link, canonically
+        if i % 25 == 0:
+            links.append(url)
+    return links
+
+
+def write_formats(links, work):
+    paths = {'text': os.path.join(work, 'links.txt'),
+             'html': os.path.join(work, 'bookmarks.html'),
+             'json': os.path.join(work, 'saved_posts.json')}
+    with open(paths['text'], 'w') as f:
+        f.write('My saved links:\n' + ''.join(f"{url}\n" for url in links))
+    with open(paths['html'], 'w') as f:
+        f.write('<!DOCTYPE NETSCAPE-Bookmark-file-1>\n<DL><p>\n')
+        for i, url in enumerate(links):
+            f.write(f'<DT><A HREF="{html.escape(url)}" ADD_DATE="1700000000" '
+                    f'ICON_URI="https://example.com/favicon.ico">Link {i}</A>\n')
+        f.write('</DL><p>\n')
+    with open(paths['json'], 'w') as f:
+        media = [{'title': '', 'string_map_data': {'Saved on': {'href': url, 'timestamp': 1700000000 + i}}}
+                 for i, url in enumerate(links)]
+        # Instagram escapes slashes in its exports
+        f.write(json.dumps({'saved_saved_media': media}).replace('/', '\\/'))
+    return paths
+
+
+def check_formats(importer, links, paths):
+    failures = 0
+    for fmt, path in paths.items():
+        for chunk_size in (7, importer.CHUNK_SIZE):
+            with open(path, 'rb') as f:
+                found = list(importer.iter_links(f, fmt, chunk_size=chunk_size))
+            if found != links:
+                print(f"FAIL: {fmt} (chunks of {chunk_size}) found {len(found)} links, expected {len(links)}")
+                failures += 1
+    if list(importer.iter_links(io.BytesIO(b'see https://a.example/x, and (https://b.example/y).'))) != \
+            ['https://a.example/x', 'https://b.example/y']:
+        print("FAIL: trailing punctuation kept in a text list")
+        failures += 1
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub latency per request (s)')
+    args = parser.parse_args()
+
+    with StubServer(unique_pages_route, latency=args.latency) as pages, \
+            StubServer(llm_route, latency=args.latency) as llm:
+        os.environ['AI_PROVIDER'] = 'huggingface'
+        os.environ['HUGGINGFACE_API_BASE'] = llm.url
+        os.environ['IMPORT_WORKERS'] = str(args.workers)
+        os.environ['IMPORT_HOST_RPS'] = '0'  # every stub page is on one host
+        os.environ['IMPORT_PROVIDER_RPS'] = '0'
+        work = tempfile.mkdtemp()
+        os.chdir(work)  # keep saves.db out of the working tree
+        import app
+        import importer
+        importer.CHECKPOINT_INTERVAL = 0.2
+
+        def saves():
+            with app.db_pool.connection() as conn:
+                return conn.execute('SELECT COUNT(*), COUNT(DISTINCT canonical_url) FROM saves').fetchone()
+
+        links = make_links(pages.url, args.links)
+        paths = write_formats(links, work)
+        failures = check_formats(importer, links, paths)
+
+        # Interrupted a third of the way through, then resumed
+        record = app.link_importer.open(paths['text'])
+
+        def interrupt(record):
+            if record['position'] >= len(links) // 3:
+                raise Interrupted()
+
+        start = time.perf_counter()
+        try:
+            app.link_importer.run(record, paths['text'], on_progress=interrupt)
+        except Interrupted:
+            pass
+        stopped = app.link_importer.get(record['id'])
+        resumed_at = stopped['position']
+        record = app.link_importer.open(paths['text'])
+        record = app.link_importer.run(record, paths['text'])
+        elapsed = time.perf_counter() - start
+        rows, distinct = saves()
+        print(f"{len(links)} links ({args.links} distinct) with {args.workers} workers: {elapsed:.2f}s, "
+              f"{len(links) / elapsed:.0f} links/s")
+        print(f"interrupted in state {stopped['state']!r} at link {resumed_at}, resumed: {record['saved']} saved, "
+              f"{record['duplicates']} duplicates, {record['failed']} failed")
+        if stopped['state'] != importer.INTERRUPTED or not 0 < resumed_at < len(links):
+            print("FAIL: the interruption didn't leave a checkpoint to resume from")
+            failures += 1
+        if rows != args.links or distinct != args.links:
+            print(f"FAIL: {rows} saves ({distinct} distinct) for {args.links} distinct links")
+            failures += 1
+        if record['state'] != importer.DONE or record['position'] != len(links):
+            print(f"FAIL: import ended in state {record['state']!r} at {record['position']}")
+            failures += 1
+
+        # Per-host rate limit
+        rate = 20.0
+        app.link_importer.hosts = importer.RateLimiter(rate, burst=2)
+        limited = make_links(pages.url, 80, first=args.links)
+        path = os.path.join(work, 'limited.txt')
+        with open(path, 'w') as f:
+            f.write('\n'.join(limited))
+        before = pages.requests
+        start = time.perf_counter()
+        app.link_importer.run(app.link_importer.open(path), path)
+        elapsed = time.perf_counter() - start
+        observed = (pages.requests - before) / elapsed
+        print(f"host limit {rate:.0f}/s: {pages.requests - before} page requests in {elapsed:.2f}s "
+              f"= {observed:.1f}/s")
+        if observed > rate * 1.1:
+            print("FAIL: the per-host rate limit was exceeded")
+            failures += 1
+
+        # Provider limit with a provider that makes no remote calls
+        app.link_importer.hosts = importer.RateLimiter(0)
+        app.link_importer.providers = importer.RateLimiter(1.0)
+        app.AI_PROVIDER = 'fallback'
+        local = make_links(pages.url, 40, first=args.links + 80)
+        path = os.path.join(work, 'fallback.txt')
+        with open(path, 'w') as f:
+            f.write('\n'.join(local))
+        start = time.perf_counter()
+        record = app.link_importer.run(app.link_importer.open(path), path)
+        elapsed = time.perf_counter() - start
+        print(f"AI_PROVIDER=fallback with a provider limit of 1/s: {record['saved']} links in {elapsed:.2f}s")
+        if elapsed > 10:
+            print("FAIL: links tagged without a remote provider were throttled")
+            failures += 1
+
+    print()
+    if not failures:
+        print("OK: all formats parsed alike, import resumed from its checkpoint, every link saved once, "
+              "rate limit held, local tagging not throttled")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Load test: the whole app under a steady request rate, fully offline.
+
+Starts local stand-ins (benchmarks/stubs.py) for Instagram/X/article
+pages, the AI provider (Hugging Face, Gemini or OpenAI) and Twilio's REST
+API, each with configurable latency, jitter and error rate, then runs the
+app in its own process (flask's threaded server, a fresh saves.db seeded
+with --seed saves) and replays a mix of requests at --rate per second:
+
+    webhook    signed Twilio-style WhatsApp POSTs to /webhook (one link,
+               sometimes three, some already saved)
+    saves      GET /api/saves, a page of the dashboard
+    search     GET /api/saves?search=...
+    tags       GET /api/tags
+    stats      GET /api/stats
+    random     GET /api/random
+
+Arrivals are open-loop: requests go out on schedule whether or not
+earlier ones have finished, and latency is measured from the scheduled
+time, so a saturated server shows up as latency instead of a lower
+offered rate. With --mode async, the `reply` stage is the time from the
+webhook POST until the stub Twilio API receives the reply message.
+
+Per stage it reports throughput, p50/p95/p99/max latency and error rate,
+and writes them with the settings, the git revision and the app's
+/health snapshot to a JSON file. --compare OLD.json prints the change
+against an earlier run.
+
+Usage: python benchmarks/bench_load.py [--rate 50] [--duration 20] [--mode sync|async]
+           [--provider huggingface] [--latency 0.1] [--error-rate 0.02] [--compare OLD.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from stubs import CAPTIONS, StubServer, llm_route, twilio_route
+from bench_message import unique_pages_route
+
+KINDS = ['instagram.com/p', 'x.com/status', 'article']
+SEARCH_TERMS = ['pasta', 'python', 'workout', 'beaches', 'logo', 'startup', 'portrait', 'study']
+ACCOUNT_SID = 'AC' + '0' * 32
+AUTH_TOKEN = 'loadtest'
+
+SERVER = """
+import os, app
+app.app.run(host='127.0.0.1', port=int(os.environ['LOAD_PORT']), threaded=True, debug=False)
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    """Latencies and errors per stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage, seconds, ok):
+        with self._lock:
+            latencies, errors = self._stages.setdefault(stage, ([], [0]))
+            latencies.append(seconds)
+            errors[0] += not ok
+
+    def summary(self, duration):
+        result = {}
+        with self._lock:
+            stages = {name: (sorted(latencies), errors[0]) for name, (latencies, errors) in self._stages.items()}
+        for name, (ordered, errors) in sorted(stages.items()):
+            result[name] = {
+                'requests': len(ordered),
+                'errors': errors,
+                'error_rate': round(errors / len(ordered), 4) if ordered else 0.0,
+                'throughput': round((len(ordered) - errors) / duration, 2),
+                'p50_ms': ms(percentile(ordered, 50)),
+                'p95_ms': ms(percentile(ordered, 95)),
+                'p99_ms': ms(percentile(ordered, 99)),
+                'max_ms': ms(ordered[-1] if ordered else None),
+            }
+        return result
+
+
+def sign(url, params):
+    """X-Twilio-Signature for a POST of `params` to `url`"""
+    from twilio.request_validator import RequestValidator
+    return RequestValidator(AUTH_TOKEN).compute_signature(url, params)
+
+
+class Load:
+    """Builds and sends the request mix against a running app"""
+
+    def __init__(self, app_url, pages_url, recorder, mix, seeded):
+        self.app_url = app_url
+        self.webhook_url = f"{app_url}/webhook"
+        self.pages_url = pages_url
+        self.recorder = recorder
+        self.stages = [stage for stage, weight in mix.items() for _ in range(weight)]
+        self.sent = {}  # from number -> time the webhook was scheduled (async replies)
+        self._lock = threading.Lock()
+        self._next_link = seeded
+        self._next_sender = 0
+        self._local = threading.local()
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _link(self):
+        with self._lock:
+            if self._next_link and random.random() < 0.1:
+                n = random.randrange(self._next_link)  # already saved
+            else:
+                n = self._next_link
+                self._next_link += 1
+        return f"{self.pages_url}/{KINDS[n % 3]}/{n}"
+
+    def webhook(self, scheduled):
+        links = [self._link() for _ in range(3 if random.random() < 0.2 else 1)]
+        with self._lock:
+            sender = f"whatsapp:+1555{self._next_sender:07d}"
+            self._next_sender += 1
+        params = {'Body': 'saving these ' + ' '.join(links), 'From': sender,
+                  'To': 'whatsapp:+14155238886', 'AccountSid': ACCOUNT_SID,
+                  'MessageSid': f"SM{random.getrandbits(128):032x}"}
+        self.sent[sender] = scheduled
+        return self._session().post(self.webhook_url, data=params, timeout=60,
+                                    headers={'X-Twilio-Signature': sign(self.webhook_url, params)})
+
+    def get(self, stage):
+        paths = {
+            'saves': '/api/saves?limit=50',
+            'search': f"/api/saves?search={random.choice(SEARCH_TERMS)}",
+            'tags': '/api/tags',
+            'stats': '/api/stats',
+            'random': '/api/random',
+        }
+        return self._session().get(self.app_url + paths[stage], timeout=60)
+
+    def send(self, stage, scheduled):
+        ok = False
+        try:
+            response = self.webhook(scheduled) if stage == 'webhook' else self.get(stage)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            pass
+        self.recorder.record(stage, time.monotonic() - scheduled, ok)
+
+    def run(self, rate, duration, clients):
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            for i in range(int(rate * duration)):
+                scheduled = start + i / rate
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.send, random.choice(self.stages), scheduled)
+        return time.monotonic() - start
+
+
+def collect_replies(deliveries, load, recorder, wait):
+    """Record the async `reply` stage from the stub Twilio API's deliveries"""
+    deadline = time.monotonic() + wait
+    pending = set(load.sent)
+    while pending and time.monotonic() < deadline:
+        try:
+            to, body, received = deliveries.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if to in pending:
+            pending.discard(to)
+            # Stub times are wall clock; convert via the offset at this moment
+            delay = received - time.time() + time.monotonic() - load.sent[to]
+            recorder.record('reply', delay, '❌' not in body)
+    for _ in pending:
+        recorder.record('reply', wait, False)
+
+
+def seed(work, env, count):
+    """Fill a fresh saves.db with `count` saves through the app's own write path"""
+    os.environ.update(env)
+    os.chdir(work)
+    import app
+    rows = []
+    for i in range(count):
+        caption = f"{CAPTIONS[i % len(CAPTIONS)]} (post {i})"
+        hashtags = [tag.lstrip('#') for tag in caption.split() if tag.startswith('#')]
+        rows.append((f"https://seed.example/{i}", 'article', caption, hashtags,
+                     'Other', caption[:100], f"https://seed.example/{i}"))
+    for i in range(0, len(rows), 1000):
+        app.db_writer.write(app.insert_saves, rows[i:i + 1000])
+    app.db_writer.close()
+
+
+def start_app(work, env, port):
+    log = open(os.path.join(work, 'app.log'), 'w')
+    process = subprocess.Popen([sys.executable, '-c', SERVER], cwd=work, stdout=log, stderr=subprocess.STDOUT,
+                               env=dict(os.environ, **env, LOAD_PORT=str(port), PYTHONPATH=ROOT))
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The app exited; see {log.name}")
+        try:
+            requests.get(f"{url}/health", timeout=2)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("The app didn't start within 60s")
+
+
+def print_summary(stages, previous=None):
+    columns = ['requests', 'throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'error_rate']
+    print(f"{'stage':<10}" + ''.join(f"{c:>12}" for c in columns))
+    for name, row in stages.items():
+        print(f"{name:<10}" + ''.join(f"{'-' if row[c] is None else row[c]:>12}" for c in columns))
+        old = (previous or {}).get(name)
+        if old:
+            cells = []
+            for c in columns:
+                if row[c] is None or old.get(c) in (None, 0):
+                    cells.append(f"{'':>12}")
+                else:
+                    cells.append(f"{(row[c] - old[c]) / old[c] * 100:>+11.0f}%")
+            print(f"{'  vs old':<10}" + ''.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=float, default=50, help='requests per second')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of load')
+    parser.add_argument('--clients', type=int, default=128, help='most requests in flight')
+    parser.add_argument('--mix', default='webhook=2,saves=3,search=2,tags=1,stats=1,random=1',
+                        help='relative weight of each stage')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync', help='INGEST_MODE of the app')
+    parser.add_argument('--provider', choices=['huggingface', 'gemini', 'openai'], default='huggingface')
+    parser.add_argument('--seed', type=int, default=5000, help='saves in the library before the run')
+    parser.add_argument('--latency', type=float, default=0.1, help='stub latency per request (s)')
+    parser.add_argument('--jitter', type=float, default=0.1, help='extra random stub latency (s)')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='share of stub requests that fail')
+    parser.add_argument('--output', default=None, help='results file (default bench_load-<time>.json)')
+    parser.add_argument('--compare', default=None, help='an earlier results file to compare with')
+    args = parser.parse_args()
+
+    mix = {name: int(weight) for name, weight in (part.split('=') for part in args.mix.split(','))}
+    output = os.path.abspath(args.output or f"bench_load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['stages']
+
+    deliveries = multiprocessing.Queue()
+    stub = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    with StubServer(unique_pages_route, **stub) as pages, StubServer(llm_route, **stub) as llm, \
+            StubServer(twilio_route(deliveries), latency=args.latency) as twilio:
+        port = free_port()
+        work = tempfile.mkdtemp(prefix='bench_load_')
+        env = {
+            'AI_PROVIDER': args.provider,
+            'HUGGINGFACE_API_BASE': llm.url, 'HUGGINGFACE_API_TOKEN': 'stub',
+            'GEMINI_API_BASE': llm.url, 'GEMINI_API_KEY': 'stub',
+            'OPENAI_BASE_URL': llm.url, 'OPENAI_API_KEY': 'stub',
+            'TWILIO_API_BASE': twilio.url, 'TWILIO_ACCOUNT_SID': ACCOUNT_SID, 'TWILIO_AUTH_TOKEN': AUTH_TOKEN,
+            'TWILIO_WEBHOOK_URL': f"http://127.0.0.1:{port}/webhook",
+            'INGEST_MODE': args.mode,
+        }
+        seed_process = multiprocessing.get_context('fork').Process(target=seed, args=(work, env, args.seed))
+        seed_process.start()
+        seed_process.join()
+        process, app_url = start_app(work, env, port)
+        try:
+            recorder = Recorder()
+            load = Load(app_url, pages.url, recorder, mix, args.seed)
+            print(f"{args.rate:g} req/s for {args.duration:g}s against {app_url} "
+                  f"({args.mode}, {args.provider}, {args.seed} saves seeded)...")
+            duration = load.run(args.rate, args.duration, args.clients)
+            forged = requests.post(load.webhook_url, data={'Body': pages.url + '/article/0', 'From': 'whatsapp:+1'},
+                                   headers={'X-Twilio-Signature': 'forged'}, timeout=10)
+            if args.mode == 'async' and load.sent:
+                collect_replies(deliveries, load, recorder, wait=60)
+            health = requests.get(f"{app_url}/health", timeout=10).json()
+        finally:
+            process.terminate()
+            process.wait()
+
+    stages = recorder.summary(duration)
+    results = {
+        'revision': git_revision(),
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'settings': vars(args),
+        'duration': round(duration, 2),
+        'stages': stages,
+        'health': health,
+    }
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print()
+    print_summary(stages, previous)
+    print(f"\nresults: {output}  (app log: {os.path.join(work, 'app.log')})")
+    if forged.status_code != 403:
+        print(f"FAIL: a webhook POST with a bad signature got {forged.status_code}, not 403")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local classifier (AI_PROVIDER=local) training and prediction.
+
+Fills a temporary saves.db with synthetic labelled captions (category
+keywords mixed with filler and words from other categories), trains on
+most of them, then adds the rest and retrains incrementally. Reports
+training time, per-caption prediction latency, and held-out accuracy
+for the local model and the keyword fallback, overall and for the items
+above the confidence threshold (the ones that would not go to an LLM).
+Rows tagged by the keyword fallback or the local model are mixed in
+with wrong categories; training must skip them. A library saved before
+tagged_by existed must train nothing (no empty model, no skipped ids)
+unless its untagged rows are opted in.
+
+Usage: python benchmarks/bench_local_model.py [--rows 20000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import classifier
+import local_model
+import schema
+
+FILLER = ("the a my our this that with for and on at to of in best new quick easy simple today "
+          "week morning night guide tips ideas favourite top ten must try love look here why "
+          "how your some every little big great good more from into after before").split()
+
+
+def make_rows(count, seed=11):
+    rng = random.Random(seed)
+    keywords = classifier.CATEGORY_KEYWORDS
+    categories = list(keywords)
+    everything = [w for words in keywords.values() for w in words]
+    rows = []
+    for _ in range(count):
+        category = rng.choice(categories)
+        words = rng.sample(FILLER, rng.randint(5, 15))
+        words += rng.sample(keywords[category], rng.randint(1, 3))
+        words += [rng.choice(everything) for _ in range(rng.randint(0, 2))]  # noise
+        rng.shuffle(words)
+        hashtags = ['#' + rng.choice(keywords[category])] if rng.random() < 0.5 else []
+        rows.append((' '.join(words).capitalize(), hashtags, category))
+    return rows
+
+
+def insert(db_path, rows, tagged_by='gemini'):
+    conn = sqlite3.connect(db_path)
+    schema.create_tables(conn)
+    conn.executemany('INSERT INTO saves (url, caption, hashtags, category, tagged_by) VALUES (?, ?, ?, ?, ?)',
+                     [('https://example.com', c, ', '.join(h), cat, tagged_by) for c, h, cat in rows])
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--holdout', type=int, default=2000)
+    parser.add_argument('--min-confidence', type=float, default=0.6)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    db_path = os.path.join(work, 'saves.db')
+    model_path = os.path.join(work, 'local_model')
+    rows = make_rows(args.rows + args.holdout)
+    train_rows, holdout = rows[:args.rows], rows[args.rows:]
+    initial = train_rows[:int(len(train_rows) * 0.9)]
+
+    insert(db_path, initial)
+    for seed, source in enumerate(('fallback', 'local', None)):  # None: saved before tagged_by existed
+        insert(db_path, [(c, h, 'Other') for c, h, _ in make_rows(args.rows // 20, seed=seed)], source)
+    start = time.perf_counter()
+    result = local_model.train(db_path, model_path, full=True)
+    print(f"full train:        {result['added']:6d} saves in {time.perf_counter() - start:6.2f}s")
+    failures = 0
+    if result['added'] != len(initial):
+        print(f"FAIL: trained on {result['added']} saves, expected only the {len(initial)} LLM-tagged ones")
+        failures += 1
+
+    legacy_db = os.path.join(work, 'legacy.db')
+    legacy_model = os.path.join(work, 'legacy_model')
+    insert(legacy_db, initial[:300], None)
+    result = local_model.train(legacy_db, legacy_model)
+    if result['added'] or result['last_id'] or os.path.exists(legacy_model):
+        print(f"FAIL: untagged legacy rows trained or skipped past: {result}")
+        failures += 1
+    result = local_model.train(legacy_db, legacy_model, taggers=local_model.LLM_TAGGERS + (None,))
+    if result['added'] != 300:
+        print(f"FAIL: opted-in legacy rows: trained on {result['added']} of 300")
+        failures += 1
+
+    insert(db_path, train_rows[len(initial):])
+    start = time.perf_counter()
+    result = local_model.train(db_path, model_path)
+    print(f"incremental train: {result['added']:6d} saves in {time.perf_counter() - start:6.2f}s "
+          f"({result['documents']} total)")
+
+    model = local_model.ModelFile(model_path, min_confidence=args.min_confidence)
+    keywords = classifier.KeywordClassifier()
+    latencies, correct, confident, confident_correct, keyword_correct = [], 0, 0, 0, 0
+    for caption, hashtags, expected in holdout:
+        start = time.perf_counter()
+        category, confidence, is_confident = model.classify(caption, hashtags)
+        latencies.append(time.perf_counter() - start)
+        correct += category == expected
+        confident += is_confident
+        confident_correct += is_confident and category == expected
+        keyword_correct += keywords.classify(caption, hashtags) == expected
+    latencies.sort()
+
+    n = len(holdout)
+    print(f"predict latency:   p50 {latencies[n // 2] * 1e6:.0f} us, p99 {latencies[int(n * 0.99)] * 1e6:.0f} us")
+    print(f"held-out accuracy: local model {correct / n:.1%}, keyword fallback {keyword_correct / n:.1%}")
+    print(f"confident (>= {args.min_confidence}): {confident / n:.1%} of items, "
+          f"{confident_correct / max(confident, 1):.1%} accurate; the rest would go to the LLM")
+    if not failures:
+        print("OK: only LLM-tagged saves (and opted-in legacy saves) were trained on")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a message with several links, one link at a time vs fanned out.
+
+Serves Instagram/X/article pages and a Hugging Face-compatible endpoint
+from local stub servers with latency and jitter, then posts to /webhook
+(INGEST_MODE=sync) through Flask's test client:
+
+    one by one    a message per link, sent after the previous reply
+                  (what users had to do when only the first link counted)
+    one message   every link in one message (app.ingest_links())
+
+and compares the fanned-out time with the slowest single link. Then
+checks that the message's saves were written in one transaction, that
+every link got a line in the single reply and that resending the same
+message is answered from the saved rows.
+
+Usage: python benchmarks/bench_message.py [--links 1,5,10] [--latency 0.2]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from stubs import CAPTIONS, StubServer, article_page, llm_route, social_page
+
+KINDS = ['instagram.com/p', 'x.com/status', 'article']
+
+
+def unique_pages_route(method, path, body):
+    """pages_route() with a caption per URL, so no run is served from the AI cache"""
+    n = int(path.rstrip('/').rsplit('/', 1)[-1] or 0)
+    caption = f"{CAPTIONS[n % len(CAPTIONS)]} (post {n})"
+    if '/article/' in path:
+        html = article_page(caption.split('#')[0].strip(), [caption] * 20)
+    else:
+        html = social_page(caption)
+    return 200, {'Content-Type': 'text/html; charset=utf-8'}, html.encode()
+
+
+def post(client, body):
+    start = time.perf_counter()
+    response = client.post('/webhook', data={'Body': body, 'From': 'whatsapp:+10000000000'})
+    return response.get_data(as_text=True), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--links', default='1,5,10')
+    parser.add_argument('--latency', type=float, default=0.2, help='stub latency per request (s)')
+    parser.add_argument('--jitter', type=float, default=0.2, help='extra random latency per request (s)')
+    args = parser.parse_args()
+
+    with StubServer(unique_pages_route, latency=args.latency, jitter=args.jitter) as pages, \
+            StubServer(llm_route, latency=args.latency, jitter=args.jitter) as llm:
+        os.environ['AI_PROVIDER'] = 'huggingface'
+        os.environ['HUGGINGFACE_API_BASE'] = llm.url
+        os.environ['INGEST_MODE'] = 'sync'
+        os.chdir(tempfile.mkdtemp())  # keep saves.db out of the working tree
+        import app
+        client = app.app.test_client()
+
+        def saves():
+            with app.db_pool.connection() as conn:
+                return conn.execute('SELECT COUNT(*) FROM saves').fetchone()[0]
+
+        next_id = 0
+        failures = 0
+        print(f"{'links':>6}{'one by one':>12}{'one message':>13}{'slowest link':>14}{'speedup':>9}")
+        for count in [int(n) for n in args.links.split(',')]:
+            sequential = [f"{pages.url}/{KINDS[i % 3]}/{next_id + i}" for i in range(count)]
+            together = [f"{pages.url}/{KINDS[i % 3]}/{next_id + count + i}" for i in range(count)]
+            next_id += 2 * count
+
+            times = [post(client, url)[1] for url in sequential]
+            batches = app.db_writer.stats()['batches']
+            before = saves()
+            reply, elapsed = post(client, "check these out\n" + "\n".join(together))
+            print(f"{count:>6}{sum(times):>11.2f}s{elapsed:>12.2f}s{max(times):>13.2f}s"
+                  f"{sum(times) / elapsed:>8.1f}x")
+
+            if saves() - before != count:
+                print(f"FAIL: {saves() - before} saves written for {count} links")
+                failures += 1
+            if app.db_writer.stats()['batches'] - batches != 1:
+                print("FAIL: the message's saves took more than one transaction")
+                failures += 1
+            if count > 1 and reply.count("' - ") != min(count, app.REPLY_MAX_LINES):
+                print(f"FAIL: the reply doesn't list every link:\n{reply}")
+                failures += 1
+            again, _ = post(client, " ".join(together))
+            if saves() - before != count or 'Got it' not in again:
+                print("FAIL: resending the message saved again or wasn't answered")
+                failures += 1
+
+    print()
+    if not failures:
+        print("OK: one transaction and one reply per message, all links saved once")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the instrumentation, and the /metrics output.
+
+Measures the time per Histogram.observe(), Counter.inc() and timed stage
+(`with STAGE_SECONDS.time(...)`), from one thread and from several at
+once, next to the latency of the cheapest stage it wraps. Then sends
+messages through /webhook (INGEST_MODE=sync, page and Hugging Face stubs,
+every 5th provider call failing, starting with the first) via Flask's
+test client and checks that /metrics:
+
+    * has a histogram series for every pipeline stage and route used
+    * is valid exposition format: cumulative buckets ending in +Inf equal
+      to _count, one HELP/TYPE per family, no duplicate samples
+    * counts provider successes + failures = provider calls made, and
+      fallbacks for the links whose provider call failed
+
+Usage: python benchmarks/bench_metrics.py [--samples 200000] [--threads 8] [--messages 20]
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import metrics
+from stubs import StubServer, llm_route
+from bench_message import unique_pages_route
+
+KINDS = ['instagram.com/p', 'x.com/status', 'article']
+STAGES = ['canonicalize', 'extract', 'fetch', 'parse', 'tag', 'fallback', 'save']
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+
+
+def per_call(fn, samples, threads):
+    """Nanoseconds per fn() call, with `threads` threads calling it at once"""
+    def run():
+        for _ in range(samples // threads):
+            fn()
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / samples * 1e9
+
+
+def check_exposition(text):
+    """Problems with the Prometheus text format of `text`"""
+    problems = []
+    declared = {}
+    seen = set()
+    histograms = {}  # (name, labels without le) -> [bucket counts], count
+    for line in text.splitlines():
+        if line.startswith('# TYPE '):
+            _, _, name, kind = line.split(' ', 3)
+            if name in declared:
+                problems.append(f"{name} declared twice")
+            declared[name] = kind
+            continue
+        if line.startswith('#') or not line:
+            continue
+        match = SAMPLE.match(line)
+        if not match:
+            problems.append(f"unparseable line {line!r}")
+            continue
+        name, labels, value = match.group(1), match.group(2) or '', float(match.group(3))
+        if (name, labels) in seen:
+            problems.append(f"duplicate sample {name}{labels}")
+        seen.add((name, labels))
+        family = re.sub(r'_(bucket|sum|count)$', '', name)
+        if family not in declared and name not in declared:
+            problems.append(f"{name} has no TYPE")
+        if declared.get(family) == 'histogram':
+            key = (family, re.sub(r',?le="[^"]*"', '', labels).replace('{,', '{').replace('{}', ''))
+            buckets, count = histograms.setdefault(key, ([], None))
+            if name.endswith('_bucket'):
+                buckets.append((labels.rsplit('le="', 1)[1].split('"')[0], value))
+            elif name.endswith('_count'):
+                histograms[key] = (buckets, value)
+    for (family, labels), (buckets, count) in histograms.items():
+        values = [value for _, value in buckets]
+        if values != sorted(values) or not buckets or buckets[-1][0] != '+Inf' or buckets[-1][1] != count:
+            problems.append(f"{family}{labels} buckets aren't cumulative up to +Inf = _count")
+    return problems
+
+
+def sample(text, name, **labels):
+    """Value of one sample in `text` (0 if absent)"""
+    wanted = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    for line in text.splitlines():
+        if line.startswith(name + ('{' + wanted + '}' if wanted else ' ')):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--messages', type=int, default=20)
+    args = parser.parse_args()
+
+    registry = metrics.Registry()
+    histogram = registry.histogram('bench_seconds', 'bench', ['stage'])
+    counter = registry.counter('bench', 'bench', ['provider', 'outcome'])
+
+    def timed():
+        with histogram.time(stage='bench'):
+            pass
+
+    print(f"{'operation':<22}{'1 thread':>12}{f'{args.threads} threads':>14}")
+    costs = {}
+    for name, fn in (('Histogram.observe()', lambda: histogram.observe(0.0123, stage='fetch')),
+                     ('Counter.inc()', lambda: counter.inc(provider='gemini', outcome='success')),
+                     ('timed stage', timed)):
+        single = per_call(fn, args.samples, 1)
+        shared = per_call(fn, args.samples, args.threads)
+        costs[name] = max(single, shared)
+        print(f"{name:<22}{single:>10.0f}ns{shared:>12.0f}ns")
+
+    failures = 0
+    with StubServer(unique_pages_route) as pages, StubServer(llm_route, error_every=5) as llm:
+        os.environ['AI_PROVIDER'] = 'huggingface'
+        os.environ['HUGGINGFACE_API_BASE'] = llm.url
+        os.environ['INGEST_MODE'] = 'sync'
+        os.environ['PROVIDER_FAILURE_THRESHOLD'] = '1000'  # every link reaches the provider
+        os.environ['LOG_LEVEL'] = 'error'
+        os.chdir(tempfile.mkdtemp())  # keep saves.db out of the working tree
+        import app
+        client = app.app.test_client()
+        for i in range(args.messages):
+            links = [f"{pages.url}/{KINDS[(i + j) % 3]}/{i * 3 + j}" for j in range(1 + i % 3)]
+            client.post('/webhook', data={'Body': ' '.join(links), 'From': 'whatsapp:+10000000000'})
+        client.get('/api/saves')
+        client.get('/api/stats')
+        text = client.get('/metrics').get_data(as_text=True)
+        requests_sent = llm.requests
+
+    links = sum(1 + i % 3 for i in range(args.messages))
+    timed_calls = sum(float(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+                      if re.match(r'\w+_seconds_count\b', line) and '/metrics' not in line)
+    per_link = sample(text, f"{metrics.PREFIX}http_request_seconds_sum", route='/webhook', method='POST') / links
+    overhead = timed_calls / links * costs['timed stage'] / 1e9
+    print(f"\n{timed_calls / links:.1f} timed sections per link: {overhead * 1e6:.0f}us of "
+          f"{per_link * 1000:.1f}ms per link ({overhead / per_link * 100:.2f}%)")
+
+    problems = check_exposition(text)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    failures += len(problems)
+    prefix = metrics.PREFIX
+    for stage in STAGES:
+        if not sample(text, f"{prefix}stage_seconds_count", stage=stage):
+            print(f"FAIL: no latency recorded for stage {stage!r}")
+            failures += 1
+    for route in ('/webhook', '/api/saves', '/api/stats'):
+        method = 'POST' if route == '/webhook' else 'GET'
+        if not sample(text, f"{prefix}http_request_seconds_count", route=route, method=method):
+            print(f"FAIL: no latency recorded for {method} {route}")
+            failures += 1
+    calls = {outcome: sample(text, f"{prefix}provider_calls_total", provider='huggingface', call='single',
+                             outcome=outcome) for outcome in ('success', 'failure')}
+    fallbacks = sample(text, f"{prefix}tags_total", provider='huggingface', source='fallback')
+    print(f"provider calls: {calls['success']:.0f} succeeded, {calls['failure']:.0f} failed "
+          f"({requests_sent} stub requests); {fallbacks:.0f} links tagged by the fallback")
+    if calls['success'] + calls['failure'] != requests_sent:
+        print("FAIL: provider calls counted don't match the requests the stub received")
+        failures += 1
+    if fallbacks < calls['failure']:
+        print("FAIL: a failed provider call wasn't counted as a fallback")
+        failures += 1
+
+    print()
+    if not failures:
+        print("OK: every stage and route timed, valid exposition format, provider outcomes add up")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parse time per page for each HTML parser backend.
+
+Parses the pages in benchmarks/corpus/ (Instagram and X posts with the
+usual megabyte-scale app shells, login walls, and articles from clean
+<article> markup to <main>-only, paragraph-only, XHTML and 1990s
+uppercase tables) with every installed backend in parsers.BACKENDS, and
+checks that each one extracts the same caption and hashtags as the
+html.parser reference. The platform of a page is the first part of its
+file name (instagram-*, twitter-*, article-*).
+
+The corpus is synthetic: hand-written pages modelled on the structure of
+real ones (meta tags, script-heavy shells, article layouts), not saved
+copies of real posts, so timings are indicative only.
+
+Usage: python benchmarks/bench_parsers.py [--repeat 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import parsers
+
+CORPUS = os.path.join(HERE, 'corpus')
+
+
+def load_corpus():
+    pages = []
+    for name in sorted(os.listdir(CORPUS)):
+        if name.endswith('.html'):
+            with open(os.path.join(CORPUS, name), encoding='utf-8') as f:
+                pages.append((name, name.split('-', 1)[0], f.read()))
+    return pages
+
+
+def time_parse(backend, platform, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parsers.parse_content(platform, html, backend)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    backends = []
+    for name in parsers.BACKENDS:
+        try:
+            backends.append(parsers.load_backend(name))
+        except ImportError as e:
+            print(f"skipping {name}: {e}")
+    pages = load_corpus()
+
+    print(f"{'page':<28}{'KB':>7}" + ''.join(f"{backend.name:>14}" for backend in backends) + "  (ms/parse)")
+    totals = [0.0] * len(backends)
+    failures = 0
+    for name, platform, html in pages:
+        reference = parsers.parse_content(platform, html, backends[0])
+        cells = []
+        for i, backend in enumerate(backends):
+            seconds = time_parse(backend, platform, html, args.repeat)
+            totals[i] += seconds
+            cells.append(f"{seconds * 1000:>14.2f}")
+            result = parsers.parse_content(platform, html, backend)
+            if (result['caption'], result['hashtags']) != (reference['caption'], reference['hashtags']):
+                print(f"FAIL: {backend.name} on {name}:\n  {backends[0].name}: {reference['caption'][:80]!r}"
+                      f"\n  {backend.name}: {result['caption'][:80]!r}")
+                failures += 1
+        print(f"{name:<28}{len(html.encode()) / 1024:>7.0f}" + ''.join(cells))
+    print(f"{'mean':<35}" + ''.join(f"{total * 1000 / len(pages):>14.2f}" for total in totals))
+    print(f"{'speedup':<35}" + ''.join(f"{totals[0] / total:>13.1f}x" for total in totals))
+    print()
+    if not failures:
+        print(f"OK: {len(backends)} backends extract identical captions and hashtags from {len(pages)} pages")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/random sampling, ORDER BY RANDOM() vs sampler.RandomSampler.
+
+Times one pick from tables of increasing size: the old full-table sort,
+and the sampler unfiltered, filtered by category, filtered by category
+and platform, with n=10 and with recency weighting. Then checks on a
+small table with deleted rows that picks are uniform over the remaining
+rows, that filters hold, that n picks are distinct and that recency=N
+puts about half the picks in the newest N saves. Finally checks that
+filtered picks don't wait for the periodic rebuild of the id lists.
+
+Usage: python benchmarks/bench_random.py [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+import collections
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import sampler
+import schema
+
+CATEGORIES = ['Fitness', 'Coding', 'Food', 'Travel', 'Design', 'Fashion', 'Music', 'Photography', 'Business', 'Education', 'Other']
+PLATFORMS = ['instagram', 'twitter', 'article']
+
+
+def build(db_path, size, seed=3):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    schema.create_tables(conn)
+    conn.executemany(
+        'INSERT INTO saves (url, platform, caption, category, summary) VALUES (?, ?, ?, ?, ?)',
+        ((f"https://example.com/p/{i}", rng.choice(PLATFORMS), f"caption {i} " * 20, rng.choice(CATEGORIES), 'summary')
+         for i in range(size))
+    )
+    conn.commit()
+    return conn
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def check_distribution(work):
+    db_path = os.path.join(work, 'small.db')
+    conn = build(db_path, 600)
+    conn.execute('DELETE FROM saves WHERE id % 3 = 0')  # gaps
+    conn.commit()
+    remaining = {row[0]: row[1] for row in conn.execute('SELECT id, category FROM saves')}
+    conn.close()
+    s = sampler.RandomSampler(db_path)
+    failures = 0
+
+    draws = 80000
+    counts = collections.Counter(s.sample()[0]['id'] for _ in range(draws))
+    expected = draws / len(remaining)
+    if set(counts) != set(remaining) or max(abs(c - expected) / expected for c in counts.values()) > 0.35:
+        print(f"FAIL: unfiltered picks not uniform over remaining rows ({min(counts.values())}..{max(counts.values())}, expected ~{expected:.0f})")
+        failures += 1
+
+    picks = [s.sample(category='Food')[0] for _ in range(2000)]
+    food = {i for i, c in remaining.items() if c == 'Food'}
+    if any(p['category'] != 'Food' for p in picks) or {p['id'] for p in picks} != food:
+        print("FAIL: category filter")
+        failures += 1
+
+    batch = s.sample(n=10, platform='article')
+    if len({p['id'] for p in batch}) != 10 or any(p['platform'] != 'article' for p in batch):
+        print("FAIL: n=10 picks not distinct or not filtered")
+        failures += 1
+    if len(s.sample(n=50)) != 50:
+        print("FAIL: n=50 picks")
+        failures += 1
+
+    # Unfiltered recency counts ids, filtered recency counts matching saves
+    top = max(remaining)
+    recent = sum(s.sample(recency=20)[0]['id'] > top - 20 for _ in range(4000)) / 4000
+    newest_food = sorted(food)[-5:]
+    recent_food = sum(s.sample(recency=5, category='Food')[0]['id'] in newest_food for _ in range(4000)) / 4000
+    if not 0.45 < recent < 0.55 or not 0.45 < recent_food < 0.55:
+        print(f"FAIL: recency put {recent:.0%} / {recent_food:.0%} of picks in the newest ids / Food saves, expected ~50%")
+        failures += 1
+    print(f"distribution checks on 600 rows with gaps: {'OK' if not failures else f'{failures} failed'} "
+          f"(recency: {recent:.0%} / {recent_food:.0%} of picks in the newest 20 ids / 5 Food saves)")
+    return failures
+
+
+def check_rebuild(work, size=300000, picks=300):
+    """Filtered picks while the id lists are rebuilt over and over"""
+    db_path = os.path.join(work, 'rebuild.db')
+    build(db_path, size).close()
+    s = sampler.RandomSampler(db_path, refresh_interval=0.0, rebuild_interval=0.0)
+    start = time.perf_counter()
+    s.sample(category='Food')  # The first build is the only one a pick waits for
+    scan = time.perf_counter() - start
+    times = []
+    for _ in range(picks):
+        start = time.perf_counter()
+        pick = s.sample(category='Food')[0]
+        times.append(time.perf_counter() - start)
+        if pick['category'] != 'Food':
+            print("FAIL: category filter during a rebuild")
+            return 1
+    times.sort()
+    worst = times[-1]
+    print(f"picks during rebuilds of {size} rows: p50 {times[len(times) // 2] * 1000:.2f} ms, "
+          f"max {worst * 1000:.1f} ms (a full scan takes {scan * 1000:.0f} ms)")
+    if worst > scan / 2:
+        print("FAIL: a pick waited for the id lists to be rebuilt")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    print(f"{'rows':>8} {'ORDER BY RANDOM()':>18} {'sampler':>8} {'category':>9} {'cat+plat':>9} {'n=10':>7} {'recency':>8}  (ms)")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        db_path = os.path.join(work, f"saves_{size}.db")
+        conn = build(db_path, size)
+        s = sampler.RandomSampler(db_path)
+        s.sample(category='Food')  # build the id lists once, as the first filtered request would
+        old = median_ms(lambda: conn.execute('SELECT * FROM saves ORDER BY RANDOM() LIMIT 1').fetchone(),
+                        max(3, args.repeat // 4))
+        timings = [
+            median_ms(lambda: s.sample(), args.repeat),
+            median_ms(lambda: s.sample(category='Food'), args.repeat),
+            median_ms(lambda: s.sample(category='Food', platform='article'), args.repeat),
+            median_ms(lambda: s.sample(n=10), args.repeat),
+            median_ms(lambda: s.sample(recency=100), args.repeat),
+        ]
+        conn.close()
+        print(f"{size:8d} {old:18.2f} {timings[0]:8.3f} {timings[1]:9.3f} {timings[2]:9.3f} {timings[3]:7.3f} {timings[4]:8.3f}")
+        os.remove(db_path)
+    failures = check_distribution(work)
+    failures += check_rebuild(work)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /api/saves search, LIKE scan vs the FTS5 index (search.py).
+
+Builds saves tables of increasing size (the app's schema without the
+search index) from synthetic captions, backfills saves_fts (the
+migration path), then times the old LOWER(...) LIKE query
+and search.search() for a few queries. Both are limited to one page of
+results. Also checks that rows inserted, updated and deleted after the
+backfill are reflected through the triggers.
+
+Usage: python benchmarks/bench_search.py [--sizes 10000,100000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import classifier
+import save_stats
+import schema
+import search
+import tags
+
+FILLER = ("the a my our this that with for and on at to of in best new quick easy simple today "
+          "week morning night guide tips ideas favourite top ten must try love look here why "
+          "how your some every little big great good more from into after before").split()
+
+LIKE_SQL = '''
+    SELECT * FROM saves
+    WHERE LOWER(caption) LIKE ? OR LOWER(category) LIKE ? OR LOWER(hashtags) LIKE ?
+    ORDER BY created_at DESC LIMIT ?
+'''
+
+QUERIES = ['pasta', 'wanderlust', 'python tutorial', 'photog']
+
+
+def make_rows(count, seed=5):
+    rng = random.Random(seed)
+    keywords = classifier.CATEGORY_KEYWORDS
+    categories = list(keywords)
+    rows = []
+    for i in range(count):
+        category = rng.choice(categories)
+        words = rng.choices(FILLER, k=rng.randint(20, 60)) + rng.sample(keywords[category], 3)
+        rng.shuffle(words)
+        caption = ' '.join(words).capitalize() + f" (post {i})"
+        hashtags = ', '.join('#' + w for w in rng.sample(keywords[category], 2))
+        rows.append((f"https://example.com/p/{i}", 'article', caption, hashtags, category, caption[:80]))
+    return rows
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def check_triggers(conn):
+    conn.execute("INSERT INTO saves (url, caption, category) VALUES ('u', 'zebracrossing tutorial', 'Design')")
+    found = search.search(conn, 'zebracrossing')
+    assert len(found) == 1 and '<mark>zebracrossing</mark>' in found[0]['snippet'], found
+    conn.execute("UPDATE saves SET caption = 'okapi sighting' WHERE caption = 'zebracrossing tutorial'")
+    assert not search.search(conn, 'zebracrossing') and len(search.search(conn, 'okapi')) == 1
+    conn.execute("DELETE FROM saves WHERE caption = 'okapi sighting'")
+    assert not search.search(conn, 'okapi')
+    assert search.search(conn, '"(*:^') == []  # no terms: nothing to search
+    search.search(conn, 'c++ AND NEAR("quoted')  # must not raise an FTS5 syntax error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10000,100000')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp()
+    print(f"{'rows':>8} {'backfill s':>10} {'query':>16} {'LIKE ms':>9} {'FTS5 ms':>9} {'matches':>8}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        conn = sqlite3.connect(os.path.join(work, f"saves_{size}.db"))
+        conn.row_factory = sqlite3.Row
+        schema.create_saves_table(conn)
+        tags.init_tags(conn)
+        save_stats.init_stats(conn)
+        conn.executemany('INSERT INTO saves (url, platform, caption, hashtags, category, summary) '
+                         'VALUES (?, ?, ?, ?, ?, ?)', make_rows(size))
+        conn.commit()
+        start = time.perf_counter()
+        if not search.init_fts(conn):
+            print("SQLite has no FTS5")
+            return 1
+        conn.commit()
+        backfill = time.perf_counter() - start
+
+        for text in QUERIES:
+            pattern = f"%{text}%"
+            like = median_ms(lambda: conn.execute(LIKE_SQL, (pattern, pattern, pattern, args.limit)).fetchall(),
+                             args.repeat)
+            fts = median_ms(lambda: search.search(conn, text, limit=args.limit), args.repeat)
+            matches = conn.execute('SELECT COUNT(*) FROM saves_fts WHERE saves_fts MATCH ?',
+                                   (search.build_query(search.query_terms(text)),)).fetchone()[0]
+            print(f"{size:8d} {backfill:10.2f} {text!r:>16} {like:9.2f} {fts:9.2f} {matches:8d}")
+        check_triggers(conn)
+        conn.close()
+    print("OK: triggers keep saves_fts in sync")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
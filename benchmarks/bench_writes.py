@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark: save inserts per second, commit-per-save vs group commit.
+
+Threads insert saves as fast as they can, like a bulk import or a burst
+of shares in a group chat, through:
+
+    connect per save    new connection, INSERT, commit (the original save_to_db)
+    pool, commit each   pooled WAL connection, one transaction per save
+                        (synchronous=NORMAL: not yet on disk when it returns)
+    pool, FULL each     the same with synchronous=FULL, one fsync per save
+    group commit        db.GroupCommitWriter (WAL, synchronous=FULL), on disk
+                        when it returns, one fsync per batch
+
+Then checks the group-commit writer: every row is written exactly once,
+futures resolve to the new ids, duplicates resolve to None and a failing
+write fails only its own future.
+
+Usage: python benchmarks/bench_writes.py [--saves 2000] [--threads 1,8,32]
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import db
+import schema
+
+INSERT_SQL = '''
+    INSERT OR IGNORE INTO saves (url, platform, caption, hashtags, category, summary, canonical_url)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def insert_save(conn, url):
+    cur = conn.execute(INSERT_SQL, (url, 'article', 'a saved caption ' * 10, '#tag', 'Other', 'summary', url))
+    return cur.lastrowid if cur.rowcount else None
+
+
+def create(db_path):
+    conn = sqlite3.connect(db_path)
+    schema.create_tables(conn)
+    conn.commit()
+    conn.close()
+
+
+def connect_per_save(db_path):
+    def save(url):
+        conn = sqlite3.connect(db_path, timeout=30)
+        insert_save(conn, url)
+        conn.commit()
+        conn.close()
+    return save, None
+
+
+def pool_commit_each(db_path):
+    pool = db.ConnectionPool(db_path, size=8)
+    def save(url):
+        with pool.connection() as conn:
+            insert_save(conn, url)
+    return save, pool.close
+
+
+def pool_full_each(db_path):
+    pool = db.ConnectionPool(db_path, size=8)
+    def save(url):
+        with pool.connection() as conn:
+            conn.execute('PRAGMA synchronous=FULL')
+            insert_save(conn, url)
+    return save, pool.close
+
+
+def group_commit(db_path):
+    writer = db.GroupCommitWriter(db_path)
+    def save(url):
+        writer.write(insert_save, url)
+    return save, writer
+
+
+def run(mode, work, saves, threads):
+    db_path = os.path.join(work, f"{mode.__name__}-{threads}.db")
+    create(db_path)
+    save, closer = mode(db_path)
+    per_thread = saves // threads
+
+    def worker(t):
+        for i in range(per_thread):
+            save(f"https://example.com/{t}/{i}")
+
+    workers = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stats = None
+    if isinstance(closer, db.GroupCommitWriter):
+        stats = closer.stats()
+        closer.close()
+    elif closer:
+        closer()
+    written = sqlite3.connect(db_path).execute('SELECT COUNT(*) FROM saves').fetchone()[0]
+    return per_thread * threads / elapsed, written == per_thread * threads, stats
+
+
+def check_writer(work):
+    db_path = os.path.join(work, 'check.db')
+    create(db_path)
+    writer = db.GroupCommitWriter(db_path, max_wait=0.01)
+    failures = 0
+
+    futures = [writer.submit(insert_save, f"https://example.com/check/{i}") for i in range(500)]
+    ids = [f.result() for f in futures]
+    if sorted(ids) != list(range(1, 501)):
+        print("FAIL: futures did not resolve to the 500 new ids")
+        failures += 1
+    if writer.write(insert_save, "https://example.com/check/7") is not None:
+        print("FAIL: a duplicate canonical_url did not resolve to None")
+        failures += 1
+
+    def bad(conn):
+        conn.execute('INSERT INTO saves (url) VALUES (NULL)')
+
+    good_before = writer.submit(insert_save, "https://example.com/check/a")
+    failing = writer.submit(bad)
+    good_after = writer.submit(insert_save, "https://example.com/check/b")
+    try:
+        failing.result()
+        print("FAIL: the failing write resolved")
+        failures += 1
+    except sqlite3.IntegrityError:
+        pass
+    if good_before.result() is None or good_after.result() is None:
+        print("FAIL: writes batched with a failing one were lost")
+        failures += 1
+    writer.close()
+
+    rows = sqlite3.connect(db_path).execute('SELECT COUNT(*) FROM saves').fetchone()[0]
+    if rows != 502:
+        print(f"FAIL: {rows} rows written, expected 502")
+        failures += 1
+    if not failures:
+        print("OK: every write committed once, ids and duplicates resolved, failures isolated")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--saves', type=int, default=2000)
+    parser.add_argument('--threads', default='1,8,32')
+    args = parser.parse_args()
+
+    modes = [('connect per save', connect_per_save), ('pool, commit each', pool_commit_each),
+             ('pool, FULL each', pool_full_each), ('group commit', group_commit)]
+    work = tempfile.mkdtemp(prefix='bench_writes_')
+    try:
+        print(f"{'threads':>8}" + ''.join(f"{name:>20}" for name, _ in modes) + f"{'avg batch':>11}  (inserts/s)")
+        failures = 0
+        for threads in [int(t) for t in args.threads.split(',')]:
+            cells = []
+            for _, mode in modes:
+                rate, complete, stats = run(mode, work, args.saves, threads)
+                failures += not complete
+                cells.append(f"{rate:>20.0f}" + ('' if complete else ' (rows missing!)'))
+            print(f"{threads:>8}" + ''.join(cells) + f"{stats['avg_batch_size']:>11}")
+        print()
+        failures += check_writer(work)
+    finally:
+        shutil.rmtree(work)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Local stand-ins for the sites and APIs the pipeline talks to: Instagram,
+X and article pages, the Hugging Face, Gemini and OpenAI endpoints, and
+Twilio's REST API for out-of-band replies.
+
+Each StubServer runs a ThreadingHTTPServer (HTTP/1.1 keep-alive) on
+127.0.0.1 in a forked child process, so serving doesn't compete with the
+code under test for the GIL. Latency and errors can be injected, and
+max_concurrency caps requests served at once (like a provider's
+concurrency/rate limit; excess requests wait). Benchmarks point the app at them through URLs and the
+*_API_BASE / OPENAI_BASE_URL settings, so nothing leaves the machine.
+"""
+
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+CAPTIONS = [
+    "Killer abs workout for the gym #fitness #workout #abs",
+    "Creamy garlic pasta recipe ready in 20 minutes #food #recipe #pasta",
+    "Learn Python decorators in 60 seconds #coding #python #tutorial",
+    "Hidden beaches of Portugal you need to visit #travel #wanderlust",
+    "Minimal logo design process from sketch to vector #design #branding",
+    "Street style outfit ideas for autumn #fashion #style",
+    "Behind the scenes of our new album #music #concert",
+    "Golden hour portrait tips with a 50mm lens #photography #portrait",
+    "How we grew our startup to 10k users #business #startup #marketing",
+    "Study routine that got me through university #education #study",
+]
+
+
+def social_page(caption, title="Post"):
+    """An Instagram/X-style page: the caption lives in og:description"""
+    return f"""<!DOCTYPE html><html><head><title>{title}</title>
+<meta property="og:title" content="{title}">
+<meta property="og:description" content="{caption}">
+</head><body><div id="root">{'<div class="x">filler</div>' * 200}</div></body></html>"""
+
+
+def article_page(title, paragraphs):
+    """A blog-style page with an <article> body"""
+    body = ''.join(f'<p>{p}</p>' for p in paragraphs)
+    return f"""<!DOCTYPE html><html><head><title>{title}</title></head>
+<body><nav>Home | About</nav><article><h1>{title}</h1>{body}</article>
+<footer>Copyright</footer></body></html>"""
+
+
+def pages_route(method, path, body):
+    """Serve /instagram.com/p/<n>, /x.com/<n> and /article/<n> pages.
+
+    The platform host is part of the path so parsers.detect_platform()
+    classifies local URLs the same way as the real ones.
+    """
+    n = int(path.rstrip('/').rsplit('/', 1)[-1] or 0)
+    caption = CAPTIONS[n % len(CAPTIONS)]
+    if '/article/' in path:
+        html = article_page(caption.split('#')[0].strip(), [caption] * 20)
+    else:
+        html = social_page(caption)
+    return 200, {'Content-Type': 'text/html; charset=utf-8'}, html.encode()
+
+
+def _guess(content):
+    content = content.lower()
+    category = 'Other'
+    for name in ('Fitness', 'Food', 'Coding', 'Travel', 'Design', 'Fashion',
+                 'Music', 'Photography', 'Business', 'Education'):
+        if f'#{name.lower()}' in content:
+            category = name
+            break
+    return {'category': category, 'summary': f'A {category.lower()} post.'}
+
+
+def batch_size(prompt):
+    """Number of items in a tagging prompt (1 unless it's a batch prompt)"""
+    return prompt.count('\nContent: ') if 'Items:' in prompt else 1
+
+
+def _tagging_json(prompt):
+    """A plausible answer for a tagging prompt: an object, or an array for batch prompts"""
+    if 'Items:' in prompt:
+        items = prompt.split('Items:', 1)[1].split('\nContent: ')[1:]
+        return json.dumps([dict(_guess(item.split('\nHashtags:')[0]), id=i) for i, item in enumerate(items)])
+    return json.dumps(_guess(prompt.split('Content:', 1)[-1]))
+
+
+def llm_route(method, path, body):
+    """Hugging Face, Gemini and OpenAI-compatible tagging endpoints"""
+    request = json.loads(body or b'{}')
+    if path.startswith('/models/'):
+        payload = [{'generated_text': _tagging_json(request.get('inputs', ''))}]
+    elif ':generateContent' in path:
+        prompt = request['contents'][0]['parts'][0]['text']
+        payload = {'candidates': [{'content': {'parts': [{'text': _tagging_json(prompt)}]}}]}
+    elif path.endswith('/chat/completions'):
+        prompt = request['messages'][-1]['content']
+        payload = {
+            'id': 'stub', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': _tagging_json(prompt)}}],
+        }
+    else:
+        return 404, {'Content-Type': 'application/json'}, b'{"error": "not found"}'
+    return 200, {'Content-Type': 'application/json'}, json.dumps(payload).encode()
+
+
+def twilio_route(deliveries=None):
+    """Twilio's REST Messages endpoint (what send_whatsapp_message() calls).
+
+    Each message sent is put on `deliveries` (a multiprocessing queue made
+    before the server starts) as (to, body, time.time()).
+    """
+    def route(method, path, body):
+        if method != 'POST' or not path.endswith('/Messages.json'):
+            return 404, {'Content-Type': 'application/json'}, b'{"message": "not found"}'
+        form = {name: values[0] for name, values in parse_qs(body.decode()).items()}
+        if deliveries is not None:
+            deliveries.put((form.get('To', ''), form.get('Body', ''), time.time()))
+        payload = {
+            'sid': f"SM{random.getrandbits(128):032x}", 'status': 'queued',
+            'to': form.get('To'), 'from': form.get('From'), 'body': form.get('Body'),
+            'account_sid': path.split('/Accounts/', 1)[-1].split('/', 1)[0],
+        }
+        return 201, {'Content-Type': 'application/json'}, json.dumps(payload).encode()
+    return route
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients that stop reading a body early (page_stream) drop the connection
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """Threaded local HTTP server with latency and error injection
+
+    error_rate fails that fraction of requests at random; error_every=N
+    fails the 1st, (N+1)th, (2N+1)th... request, for checks that need a
+    known number of errors.
+    """
+
+    def __init__(self, route, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 max_concurrency=None, error_every=None):
+        self.route = route
+        self.max_concurrency = max_concurrency
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_every = error_every
+        self.error_status = error_status
+        self._requests = multiprocessing.Value('l', 0)
+        self._server = None
+        self._process = None
+
+    @property
+    def requests(self):
+        """Requests served so far"""
+        return self._requests.value
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        stub = self
+        slots = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # One write per response and no Nagle, otherwise keep-alive
+            # requests stall ~40 ms on delayed ACKs
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                with stub._requests.get_lock():
+                    stub._requests.value += 1
+                    number = stub._requests.value
+                if slots is not None:
+                    slots.acquire()
+                try:
+                    delay = stub.latency + (random.uniform(0, stub.jitter) if stub.jitter else 0)
+                    if delay:
+                        time.sleep(delay)
+                    if (stub.error_every and (number - 1) % stub.error_every == 0) or \
+                            (stub.error_rate and random.random() < stub.error_rate):
+                        status, headers, payload = stub.error_status, {'Content-Type': 'text/plain'}, b'injected error'
+                    else:
+                        status, headers, payload = stub.route(self.command, self.path, body)
+                finally:
+                    if slots is not None:
+                        slots.release()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _serve
+            do_POST = _serve
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        # Bind in the parent so the port is known (and listening) before
+        # the child starts accepting
+        self._server = _Server(('127.0.0.1', 0), self._handler_class())
+        context = multiprocessing.get_context('fork')
+        self._process = context.Process(target=self._server.serve_forever, daemon=True)
+        self._process.start()
+        return self
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+        if self._server is not None:
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,149 @@
+"""
+URL canonicalization for ingest.
+
+The same post arrives as x.com vs twitter.com, with ?igshid=/utm_* noise,
+or behind t.co/bit.ly. canonicalize() is a pure function that strips
+tracking parameters and unifies host aliases; Canonicalizer.resolve()
+additionally follows short links, remembering each redirect in the
+`redirects` table of saves.db so a short link is only resolved once.
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import db
+import logs
+
+# Query parameters that only track the share, never select content
+TRACKING_PARAMS = {
+    'igshid', 'igsh', 'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'ref_url', 'si', 'feature', 'share_id', 'mibextid', '_hsenc', '_hsmi',
+}
+TRACKING_PREFIXES = ('utm_',)
+
+# Per-host parameters that are tracking-only on that host
+HOST_TRACKING_PARAMS = {
+    'x.com': {'s', 't'},
+    'www.instagram.com': {'hl', 'img_index'},
+}
+
+HOST_ALIASES = {
+    'twitter.com': 'x.com',
+    'www.twitter.com': 'x.com',
+    'mobile.twitter.com': 'x.com',
+    'www.x.com': 'x.com',
+    'mobile.x.com': 'x.com',
+    'instagram.com': 'www.instagram.com',
+    'm.instagram.com': 'www.instagram.com',
+    'instagr.am': 'www.instagram.com',
+}
+
+# Hosts that only redirect somewhere else
+SHORTENER_HOSTS = {
+    't.co', 'bit.ly', 'tinyurl.com', 'goo.gl', 'ow.ly', 'buff.ly', 'lnkd.in',
+    'is.gd', 'dlvr.it', 'trib.al', 'rebrand.ly', 'cutt.ly', 'shorturl.at', 'tiny.cc',
+}
+
+
+def canonicalize(url):
+    """Canonical form of a URL: https, aliased host, no tracking params or fragment"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or 'https'
+    host = (parts.hostname or '').lower()
+    host = HOST_ALIASES.get(host, host)
+    if host in HOST_ALIASES.values():
+        scheme = 'https'
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+    if host == 'www.instagram.com' and path.startswith('/reels/'):
+        path = '/reel/' + path[len('/reels/'):]
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/')
+
+    host_params = HOST_TRACKING_PARAMS.get(host, set())
+    params = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS
+        and k.lower() not in host_params
+        and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(params))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def is_short_link(url):
+    return (urlsplit(url).hostname or '').lower() in SHORTENER_HOSTS
+
+
+class Canonicalizer:
+    """canonicalize() plus cached short-link resolution"""
+
+    def __init__(self, session, db_path='saves.db', timeout=5):
+        self.session = session
+        self.db_path = db_path
+        self.timeout = timeout
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._pool = db.get_pool(db_path)
+        self.init_table()
+
+    def init_table(self):
+        with self._pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS redirects (
+                    short_url TEXT PRIMARY KEY,
+                    target_url TEXT NOT NULL,
+                    resolved_at REAL NOT NULL
+                )
+            ''')
+
+    def _cached_target(self, short_url):
+        with self._lock:
+            target = self._memory.get(short_url)
+        if target is not None:
+            return target
+        with self._pool.connection() as conn:
+            row = conn.execute('SELECT target_url FROM redirects WHERE short_url = ?', (short_url,)).fetchone()
+        if row is not None:
+            with self._lock:
+                self._memory[short_url] = row[0]
+            return row[0]
+        return None
+
+    def _follow(self, short_url):
+        # HEAD is enough for shorteners; some only answer GET
+        try:
+            response = self.session.head(short_url, allow_redirects=True, timeout=self.timeout)
+            if response.status_code < 400:
+                return response.url
+        except Exception:
+            pass
+        response = self.session.get(short_url, allow_redirects=True, timeout=self.timeout, stream=True)
+        response.close()
+        return response.url
+
+    def resolve(self, url):
+        """Canonical URL, following short links through the cached redirect map"""
+        canonical = canonicalize(url)
+        if not is_short_link(canonical):
+            return canonical
+
+        target = self._cached_target(canonical)
+        if target is not None:
+            return target
+
+        try:
+            target = canonicalize(self._follow(canonical))
+        except Exception as e:
+            logs.warning('short_link_failed', url=canonical, error=e)
+            return canonical
+
+        with self._pool.connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO redirects (short_url, target_url, resolved_at) VALUES (?, ?, ?)',
+                         (canonical, target, time.time()))
+        with self._lock:
+            self._memory[canonical] = target
+        return target
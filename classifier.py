@@ -0,0 +1,90 @@
+"""
+Keyword classifier for the fallback path.
+
+The keyword tables are compiled once into a token -> keyword lookup and
+the categories each keyword counts for. Text is lowercased and tokenized
+in a single pass; each token is looked up in the table (word-boundary
+match, so "app" no longer fires inside "happy"). Simple plurals
+("workouts", "dishes") map to their keyword.
+
+classify_many() is the batch API: one classify() per caption, as a
+NumPy keyword-presence matrix product measured no faster.
+"""
+
+import re
+
+CATEGORY_KEYWORDS = {
+    'Fitness': ['workout', 'fitness', 'exercise', 'gym', 'abs', 'cardio', 'yoga', 'pilates', 'running', 'training', 'muscle', 'strength', 'health', 'fit', 'diet', 'weight', 'nutrition'],
+    'Coding': ['code', 'programming', 'developer', 'python', 'javascript', 'coding', 'tutorial', 'algorithm', 'software', 'tech', 'webdev', 'app', 'api', 'github', 'stackoverflow'],
+    'Food': ['recipe', 'food', 'cooking', 'pasta', 'meal', 'dish', 'cuisine', 'chef', 'baking', 'restaurant', 'delicious', 'tasty', 'cook', 'kitchen', 'dinner', 'lunch', 'breakfast'],
+    'Travel': ['travel', 'trip', 'vacation', 'destination', 'traveling', 'adventure', 'wanderlust', 'explore', 'journey', 'holiday', 'tourism', 'visit', 'sightseeing'],
+    'Design': ['design', 'graphic', 'ui', 'ux', 'art', 'creative', 'illustration', 'logo', 'branding', 'aesthetic', 'visual', 'typography', 'layout'],
+    'Fashion': ['fashion', 'style', 'outfit', 'clothing', 'wardrobe', 'trend', 'fashionable', 'dress', 'accessories'],
+    'Music': ['music', 'song', 'artist', 'album', 'concert', 'musician', 'beat', 'lyrics', 'spotify', 'playlist'],
+    'Photography': ['photo', 'photography', 'camera', 'shot', 'picture', 'image', 'photographer', 'lens', 'portrait', 'landscape'],
+    'Business': ['business', 'entrepreneur', 'startup', 'marketing', 'sales', 'strategy', 'finance', 'investment', 'company'],
+    'Education': ['learn', 'education', 'study', 'course', 'tutorial', 'lesson', 'student', 'school', 'university', 'knowledge'],
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+DEFAULT_CATEGORY = 'Other'
+
+
+class KeywordClassifier:
+    """Compiled keyword tables; build once, share between threads (read-only)"""
+
+    def __init__(self, category_keywords=CATEGORY_KEYWORDS, default=DEFAULT_CATEGORY):
+        self.categories = list(category_keywords)
+        self.default = default
+        self.keywords = []
+        keyword_ids = {}
+        # A keyword can count for several categories ("tutorial")
+        self._keyword_categories = []
+        for c, words in enumerate(category_keywords.values()):
+            for word in words:
+                word = word.lower()
+                if word not in keyword_ids:
+                    keyword_ids[word] = len(self.keywords)
+                    self.keywords.append(word)
+                    self._keyword_categories.append([])
+                categories = self._keyword_categories[keyword_ids[word]]
+                if c not in categories:
+                    categories.append(c)
+
+        # Token -> keyword id, including plural forms. Exact keywords win
+        # over a plural of another keyword.
+        self.lookup = {}
+        for word, k in keyword_ids.items():
+            for form in (word + 's', word + 'es'):
+                self.lookup.setdefault(form, k)
+        self.lookup.update(keyword_ids)
+        self._tokens = self.lookup.keys()
+
+    def keyword_ids(self, caption, hashtags=None):
+        """Set of keyword ids present in the caption and hashtags"""
+        text = (caption or '').lower()
+        if hashtags:
+            text += ' ' + ' '.join(hashtags).lower()
+        lookup = self.lookup
+        return {lookup[token] for token in self._tokens & set(TOKEN_PATTERN.findall(text))}
+
+    def scores(self, caption, hashtags=None):
+        """Per-category score: how many of the category's keywords appear"""
+        scores = [0] * len(self.categories)
+        for k in self.keyword_ids(caption, hashtags):
+            for c in self._keyword_categories[k]:
+                scores[c] += 1
+        return scores
+
+    def classify(self, caption, hashtags=None):
+        """Best category for one caption; ties go to the earlier category"""
+        scores = self.scores(caption, hashtags)
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return self.categories[best] if scores[best] > 0 else self.default
+
+    def classify_many(self, captions, hashtags=None):
+        """Categories for a list of captions (hashtags: parallel list of lists, optional)"""
+        if hashtags is None:
+            hashtags = [None] * len(captions)
+        return [self.classify(caption, tags) for caption, tags in zip(captions, hashtags)]
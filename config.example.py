@@ -19,5 +19,5 @@ TWILIO_ACCOUNT_SID = "your_twilio_account_sid_here"
 TWILIO_AUTH_TOKEN = "your_twilio_auth_token_here"
 TWILIO_WHATSAPP_NUMBER = "whatsapp:+14155238886"
 
-# AI Provider Selection: "openai", "huggingface", "gemini", or "fallback"
+# AI Provider Selection: "openai", "huggingface", "gemini", "local", or "fallback"
 AI_PROVIDER = "fallback"  # Using enhanced keyword-based system (FREE & RELIABLE!)
@@ -0,0 +1,310 @@
+"""
+Shared SQLite connection pool for saves.db.
+
+Every module that touches saves.db borrows connections from one pool per
+database file (get_pool()), so a request no longer pays for opening a
+connection, parsing the schema and warming the page cache. Connections
+are opened lazily up to `size` and handed out LIFO, so the warmest ones
+are reused first.
+
+Each connection is tuned on open:
+
+    journal_mode=WAL      readers don't block the writer and vice versa
+    synchronous=NORMAL    fsync at checkpoints, not on every commit (safe with WAL)
+    mmap_size             reads come straight from the OS page cache
+    cache_size            per-connection page cache, kept warm by pooling
+    temp_store=MEMORY     sorts and temp b-trees stay off disk
+
+and keeps sqlite3's per-connection statement cache (`cached_statements`),
+so repeated queries skip SQL parsing and planning.
+
+GroupCommitWriter funnels writes from every thread through one writer
+thread and connection. Writes that queue up while a commit is running
+(up to `max_batch` of them, optionally waiting `max_wait` for more) share
+the next transaction, so a burst of saves costs one fsync instead of one
+each. The writer runs with synchronous=FULL: a write's future resolves
+only after its transaction is on disk, and the fsync is paid once per
+batch.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_CACHE_SIZE_KB = 16 * 1024
+CACHED_STATEMENTS = 256
+DEFAULT_WRITE_BATCH = 256
+DEFAULT_WRITE_WAIT = 0.0
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def connect(path, timeout=30.0, synchronous='NORMAL',
+            mmap_size=DEFAULT_MMAP_SIZE, cache_size_kb=DEFAULT_CACHE_SIZE_KB):
+    """A tuned connection usable from any thread (one thread at a time)"""
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False,
+                           cached_statements=CACHED_STATEMENTS)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA synchronous={synchronous}')
+    conn.execute(f'PRAGMA mmap_size={int(mmap_size)}')
+    conn.execute(f'PRAGMA cache_size={-int(cache_size_kb)}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of tuned connections to one SQLite file"""
+
+    def __init__(self, path, size=DEFAULT_POOL_SIZE, timeout=30.0,
+                 mmap_size=DEFAULT_MMAP_SIZE, cache_size_kb=DEFAULT_CACHE_SIZE_KB):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self._lock = threading.Lock()
+        self._idle = []  # LIFO: the most recently used connection is the warmest
+        self._waiters = deque()  # [event, handed-over connection] per blocked borrower
+        self._pid = os.getpid()
+        self._open = 0
+        self._counters = {'borrows': 0, 'opened': 0, 'waits': 0, 'wait_seconds': 0.0}
+
+    def _connect(self):
+        return connect(self.path, timeout=self.timeout, mmap_size=self.mmap_size, cache_size_kb=self.cache_size_kb)
+
+    def _after_fork(self):
+        # SQLite handles must not cross fork(); the child starts a fresh pool
+        self._lock = threading.Lock()
+        self._idle = []
+        self._waiters = deque()
+        self._open = 0
+        self._pid = os.getpid()
+
+    def _acquire(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            opening = self._open < self.size
+            if opening:
+                self._open += 1
+                self._counters['opened'] += 1
+            else:
+                waiter = [threading.Event(), None]
+                self._waiters.append(waiter)
+        if opening:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                raise
+        # Released connections are handed to waiters first come, first served
+        start = time.perf_counter()
+        if not waiter[0].wait(self.timeout):
+            with self._lock:
+                if waiter[1] is None:
+                    self._waiters.remove(waiter)
+                    raise PoolTimeout(f"No free connection to {self.path} after {self.timeout}s")
+        with self._lock:
+            self._counters['waits'] += 1
+            self._counters['wait_seconds'] += time.perf_counter() - start
+        return waiter[1]
+
+    def _release(self, conn, broken=False):
+        if broken:
+            conn.close()
+            with self._lock:
+                if not self._waiters:
+                    self._open -= 1
+                    return
+            conn = self._connect()  # A replacement for the next waiter
+        conn.row_factory = None
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter[1] = conn
+                waiter[0].set()
+            else:
+                self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success, rolls back on an exception"""
+        conn = self._acquire()
+        with self._lock:
+            self._counters['borrows'] += 1
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                self._release(conn, broken=True)
+                raise
+            self._release(conn)
+            raise
+        self._release(conn)
+
+    def close(self):
+        """Close the idle connections (at shutdown)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = self.size
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+        stats['in_use'] = stats['open'] - stats['idle']
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        return stats
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued writes in batches"""
+
+    def __init__(self, path, max_batch=DEFAULT_WRITE_BATCH, max_wait=DEFAULT_WRITE_WAIT,
+                 synchronous='FULL', timeout=30.0, name='db-writer'):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.synchronous = synchronous
+        self.timeout = timeout
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._counters = {'writes': 0, 'batches': 0, 'errors': 0, 'commit_seconds': 0.0}
+
+    def submit(self, fn, *args):
+        """Run fn(conn, *args) in the next batch transaction.
+
+        The future resolves to fn's return value once the transaction has
+        committed, or to fn's exception (only that write is rolled back,
+        under a savepoint; the rest of the batch still commits).
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    def write(self, fn, *args):
+        """Blocking submit(): fn's result once it is committed"""
+        return self.submit(fn, *args).result()
+
+    def _ensure_started(self):
+        # Started on first use, and again in a forked child (threads don't survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        conn = connect(self.path, timeout=self.timeout, synchronous=self.synchronous)
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch = []
+            deadline = time.monotonic() + self.max_wait
+            while True:
+                if item is None:  # close()
+                    stop = True
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+                try:
+                    # Whatever is already queued joins even after the deadline
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._commit(conn, batch)
+        conn.close()
+
+    def _commit(self, conn, batch):
+        start = time.perf_counter()
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for fn, args, future in batch:
+                conn.execute('SAVEPOINT write')
+                try:
+                    outcomes.append((future, fn(conn, *args), None))
+                    conn.execute('RELEASE write')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write')
+                    conn.execute('RELEASE write')
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._counters['errors'] += len(batch)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self._counters['writes'] += len(batch)
+            self._counters['batches'] += 1
+            self._counters['errors'] += sum(1 for _, _, error in outcomes if error is not None)
+            self._counters['commit_seconds'] += time.perf_counter() - start
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def close(self, timeout=None):
+        """Commit everything queued so far and stop the writer thread"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        self._pid = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        seconds = stats.pop('commit_seconds')
+        stats['avg_batch_size'] = round(stats['writes'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['avg_commit_ms'] = round(seconds / stats['batches'] * 1000, 2) if stats['batches'] else 0.0
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+
+def get_pool(path, **options):
+    """The shared pool for a database file, created with `options` on first use"""
+    key = os.path.abspath(path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(path, **options)
+        return pool
@@ -0,0 +1,94 @@
+"""
+Streaming export of the saves table as NDJSON or CSV.
+
+iter_saves() walks the table in (created_at, id) order with keyset
+chunks: each chunk is its own short query on a pooled connection, so
+no read lock or connection is held between chunks and webhook writes
+keep going during a long export. The formatters and encode() (gzip on
+the fly) are generators too, so an export of any size holds one chunk
+in memory at a time.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+import db
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+CHUNK_SIZE = 1000
+
+
+def iter_saves(db_path, fields, since=None, chunk_size=CHUNK_SIZE):
+    """Yield lists of row tuples (fields order), oldest first.
+
+    since (e.g. '2026-01-31' or '2026-01-31 12:00:00') keeps only rows
+    with a later created_at, for incremental backups.
+    """
+    pool = db.get_pool(db_path)
+    # created_at and id drive the keyset; they are dropped again if not requested
+    selected = list(fields) + [f for f in ('created_at', 'id') if f not in fields]
+    created_index = selected.index('created_at')
+    id_index = selected.index('id')
+    base = f"SELECT {', '.join(selected)} FROM saves"
+    # The connection goes back to the pool between chunks, while the client reads
+    with pool.connection() as conn:
+        if since:
+            rows = conn.execute(f'{base} WHERE created_at > ? ORDER BY created_at, id LIMIT ?',
+                                (since, chunk_size)).fetchall()
+        else:
+            rows = conn.execute(f'{base} ORDER BY created_at, id LIMIT ?', (chunk_size,)).fetchall()
+    while rows:
+        yield [row[:len(fields)] for row in rows]
+        if len(rows) < chunk_size:
+            break
+        last = rows[-1]
+        with pool.connection() as conn:
+            rows = conn.execute(f'{base} WHERE (created_at, id) > (?, ?) ORDER BY created_at, id LIMIT ?',
+                                (last[created_index], last[id_index], chunk_size)).fetchall()
+
+
+def ndjson_chunks(chunks, fields):
+    """One JSON object per line, one string per chunk"""
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+def csv_chunks(chunks, fields):
+    """CSV with a header row, one string per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode(chunks, compress=False):
+    """UTF-8 bytes, gzip-compressed on the fly if compress"""
+    if not compress:
+        for text in chunks:
+            yield text.encode('utf-8')
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for text in chunks:
+        data = compressor.compress(text.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(db_path, fields, format='ndjson', since=None, compress=False, chunk_size=CHUNK_SIZE):
+    """Export as an iterator of bytes"""
+    chunks = iter_saves(db_path, fields, since=since, chunk_size=chunk_size)
+    formatter = csv_chunks if format == 'csv' else ndjson_chunks
+    return encode(formatter(chunks, fields), compress=compress)
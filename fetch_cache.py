@@ -0,0 +1,171 @@
+"""
+Persistent page-fetch cache for the extractors.
+
+Stores the *extracted* content (caption/hashtags/platform) for a URL plus
+its ETag/Last-Modified validators. An in-memory LRU sits in front of the
+`fetch_cache` table in saves.db. Fresh entries are served without any
+network; stale ones are revalidated with a conditional GET, so a repeat
+link costs at most a 304.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import canonical
+import db
+
+
+def cache_key(url):
+    """Cache key for a URL: its canonical form (see canonical.py)"""
+    return canonical.canonicalize(url)
+
+
+class FetchCache:
+    """Two-tier (memory LRU + SQLite) cache of extracted page content"""
+
+    def __init__(self, db_path='saves.db', ttl=86400, memory_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0, 'memory_hits': 0, 'disk_hits': 0,
+            'stale': 0, 'revalidated': 0, 'misses': 0,
+            'stores': 0, 'evictions': 0,
+        }
+        self._pool = db.get_pool(db_path)
+        self.init_table()
+
+    def init_table(self):
+        with self._pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS fetch_cache (
+                    key TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_fetch_cache_accessed ON fetch_cache (accessed_at)')
+            self._disk_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM fetch_cache').fetchone()[0]
+
+    def _count(self, *names):
+        with self._lock:
+            for name in names:
+                self._counters[name] += 1
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def lookup(self, url):
+        """Return (entry, fresh) for a URL, or (None, False) on a miss.
+
+        entry is a dict with 'content', 'etag', 'last_modified', 'expires_at'.
+        """
+        key = cache_key(url)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        tier = 'memory_hits'
+        if entry is None:
+            tier = 'disk_hits'
+            now = time.time()
+            with self._pool.connection() as conn:
+                row = conn.execute(
+                    'SELECT content, etag, last_modified, expires_at FROM fetch_cache WHERE key = ?',
+                    (key,)).fetchone()
+                if row is not None:
+                    conn.execute('UPDATE fetch_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            if row is None:
+                self._count('misses')
+                return None, False
+            entry = {
+                'content': json.loads(row[0]),
+                'etag': row[1],
+                'last_modified': row[2],
+                'expires_at': row[3],
+            }
+            self._remember(key, entry)
+
+        if entry['expires_at'] > time.time():
+            self._count('hits', tier)
+            return entry, True
+        self._count('stale')
+        return entry, False
+
+    def put(self, url, content, etag=None, last_modified=None):
+        """Store freshly extracted content for a URL"""
+        key = cache_key(url)
+        now = time.time()
+        entry = {
+            'content': content,
+            'etag': etag,
+            'last_modified': last_modified,
+            'expires_at': now + self.ttl,
+        }
+        payload = json.dumps(content)
+        size = len(key) + len(payload)
+        with self._pool.connection() as conn:
+            old = conn.execute('SELECT size FROM fetch_cache WHERE key = ?', (key,)).fetchone()
+            conn.execute('''
+                INSERT OR REPLACE INTO fetch_cache (key, content, etag, last_modified, expires_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (key, payload, etag, last_modified, entry['expires_at'], now, size))
+            conn.commit()
+            with self._lock:
+                self._disk_bytes += size - (old[0] if old else 0)
+                over = self._disk_bytes > self.max_bytes
+            if over:
+                self._evict(conn)
+        self._remember(key, entry)
+        self._count('stores')
+
+    def refresh(self, url, entry):
+        """The origin answered 304: extend the entry's lifetime"""
+        key = cache_key(url)
+        now = time.time()
+        entry['expires_at'] = now + self.ttl
+        with self._pool.connection() as conn:
+            conn.execute('UPDATE fetch_cache SET expires_at = ?, accessed_at = ? WHERE key = ?',
+                         (entry['expires_at'], now, key))
+        self._remember(key, entry)
+        self._count('revalidated')
+
+    def _evict(self, conn):
+        # Drop least recently accessed rows until we're at 90% of the budget
+        target = self.max_bytes * 0.9
+        evicted = []
+        for key, size in conn.execute('SELECT key, size FROM fetch_cache ORDER BY accessed_at'):
+            if self._disk_bytes <= target:
+                break
+            evicted.append(key)
+            with self._lock:
+                self._disk_bytes -= size
+        conn.executemany('DELETE FROM fetch_cache WHERE key = ?', [(k,) for k in evicted])
+        conn.commit()
+        with self._lock:
+            for key in evicted:
+                self._memory.pop(key, None)
+            self._counters['evictions'] += len(evicted)
+
+    def stats(self):
+        """Hit/miss counters and tier sizes, for sizing the cache"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_bytes'] = self._disk_bytes
+        lookups = stats['hits'] + stats['stale'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
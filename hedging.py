@@ -0,0 +1,131 @@
+"""
+Hedged requests across AI providers.
+
+hedged_call() starts the primary provider and, if it hasn't produced a
+valid answer within the hedge delay, starts the next one, and so on. The
+first valid answer wins; calls that already started finish in the
+background and their results are dropped.
+
+Each call runs on a thread of its own rather than a shared pool: a
+losing call can hold its thread until the provider's timeout, and in a
+fixed pool those leftovers would queue new primaries and their backups
+behind them exactly when a provider is slow. The number of threads is
+bounded by the callers (at most one per candidate provider per caller).
+
+LatencyStats keeps a sliding window of per-provider latencies; its p95 is
+the default hedge delay, so backups only fire for the slow tail.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+
+class LatencyStats:
+    """Sliding-window latency percentiles per provider"""
+
+    def __init__(self, window=200, min_samples=20, percentile=95,
+                 default_delay=2.0, min_delay=0.05, max_delay=10.0):
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def quantile(self, name, q):
+        """q-th percentile (0-100) of the recent samples, or None if there are none"""
+        with self._lock:
+            samples = sorted(self._samples.get(name, ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+    def hedge_delay(self, name):
+        """How long to wait on a provider before starting a backup"""
+        with self._lock:
+            count = len(self._samples.get(name, ()))
+        if count < self.min_samples:
+            return self.default_delay
+        delay = self.quantile(name, self.percentile)
+        return max(self.min_delay, min(self.max_delay, delay))
+
+    def snapshot(self, name):
+        with self._lock:
+            count = len(self._samples.get(name, ()))
+        p50 = self.quantile(name, 50)
+        p95 = self.quantile(name, 95)
+        return {
+            'samples': count,
+            'p50': round(p50, 4) if p50 is not None else None,
+            'p95': round(p95, 4) if p95 is not None else None,
+            'hedge_delay': round(self.hedge_delay(name), 4),
+        }
+
+
+def _start(fn, name):
+    """Run fn() on a new daemon thread; returns a Future of its result"""
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=f'hedge-{name}', daemon=True).start()
+    return future
+
+
+def hedged_call(calls, delay_for, validate=None):
+    """Run calls [(name, fn), ...] hedged. Returns (name, result) of the first valid answer.
+
+    delay_for(name) gives the time to wait on the most recently started
+    call before starting the next one. A call that fails or returns an
+    invalid answer starts the next call immediately. Raises if all fail.
+    """
+    remaining = list(calls)
+    pending = {}
+    errors = []
+    last_started = None
+
+    def start_next():
+        nonlocal last_started
+        name, fn = remaining.pop(0)
+        pending[_start(fn, name)] = name
+        last_started = name
+
+    start_next()
+    while pending:
+        timeout = delay_for(last_started) if remaining else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            start_next()  # Hedge: the current call is in its slow tail
+            continue
+        failed = False
+        for future in done:
+            name = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+                failed = True
+                continue
+            if validate is not None and not validate(result):
+                errors.append(f"{name}: invalid answer {result!r}")
+                failed = True
+                continue
+            return name, result
+        if failed and remaining:
+            start_next()  # Replace the failed call right away
+    raise Exception("All providers failed: " + "; ".join(errors))
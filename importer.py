@@ -0,0 +1,326 @@
+"""
+Resumable bulk import of saved-link archives.
+
+An import reads a file of links, in one of three formats:
+
+    text    anything with URLs in it, e.g. one link per line
+    html    a bookmarks export (Netscape bookmark file): the HREFs
+    json    an Instagram data export (saved_posts.json etc.): every URL
+
+The file is streamed in chunks, never loaded whole. Links are deduped by
+canonical URL, both within the file and against saves, and the rest go
+through the handler (extract, tag, save) on a bounded worker pool. Reading
+stops while `workers * 2` links are in flight, so a 50k-link file never
+queues more than that.
+
+Progress lives in the `imports` table, keyed by the file's SHA-256. Its
+`position` is a checkpoint: every link before it has been handled and
+saved. Importing the same file again resumes from there; links after the
+checkpoint that had already been saved are skipped as duplicates.
+
+Requests are throttled with token buckets, per host and per remote AI
+provider, so an import doesn't get the server blocked by Instagram or
+rate limited by the provider. The app calls throttle_fetch() right before
+a page request and throttle_provider() right before a provider call; both
+only wait in a thread that is running an import, so duplicates, cache
+hits and the keyword/local classifiers never wait, and webhook traffic
+isn't throttled at all.
+"""
+
+import codecs
+import hashlib
+import html
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import canonical
+import db
+import logs
+
+FORMATS = ('text', 'html', 'json')
+
+# Outcomes of the handler
+SAVED = 'saved'
+DUPLICATE = 'duplicate'
+FAILED = 'failed'
+
+RUNNING = 'running'
+DONE = 'done'
+INTERRUPTED = 'interrupted'
+
+CHUNK_SIZE = 64 * 1024
+CHECKPOINT_INTERVAL = 2.0
+
+URL_PATTERN = re.compile(r'https?://[^\s"\'<>\\]+')
+HREF_PATTERN = re.compile(r'''href\s*=\s*["']?(https?://[^"'\s>]+)''', re.IGNORECASE)
+JSON_ESCAPE = re.compile(r'\\u([0-9a-fA-F]{4})')
+TRAILING_PUNCTUATION = '.,;:!?)]}'
+
+
+# The Importer whose handler this thread is running, if any
+_current = threading.local()
+
+
+def throttle_fetch(url):
+    """Wait for a request slot on the URL's host, if this thread is importing"""
+    running = getattr(_current, 'importer', None)
+    if running is not None:
+        running.hosts.acquire(urlsplit(url).hostname or '')
+
+
+def throttle_provider(provider):
+    """Wait for a call slot on the AI provider, if this thread is importing"""
+    running = getattr(_current, 'importer', None)
+    if running is not None:
+        running.providers.acquire(provider)
+
+
+def detect_format(filename):
+    """Format from a file name: .html/.htm -> html, .json -> json, anything else text"""
+    name = (filename or '').lower()
+    if name.endswith(('.html', '.htm')):
+        return 'html'
+    if name.endswith('.json'):
+        return 'json'
+    return 'text'
+
+
+def _find_links(text, fmt):
+    if fmt == 'html':
+        return [html.unescape(url) for url in HREF_PATTERN.findall(text)]
+    if fmt == 'json':
+        text = JSON_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), text.replace('\\/', '/'))
+    return [url.rstrip(TRAILING_PUNCTUATION) for url in URL_PATTERN.findall(text)]
+
+
+def iter_links(stream, fmt='text', chunk_size=CHUNK_SIZE):
+    """Links in a binary stream, in file order, read `chunk_size` bytes at a time"""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    carry = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        text = carry + decoder.decode(chunk or b'', final=not chunk)
+        if chunk:
+            # A link can't span whitespace, a tag boundary or (outside
+            # HTML, where they delimit attributes) quotes: keep the
+            # unfinished tail for the next chunk
+            cut = max(text.rfind(c) for c in (' \n\t>' if fmt == 'html' else ' \n\t>"\''))
+            text, carry = (text[:cut + 1], text[cut + 1:]) if cut >= 0 else ('', text)
+        yield from _find_links(text, fmt)
+        if not chunk:
+            return
+
+
+def file_digest(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RateLimiter:
+    """At most `rate` acquisitions per second per key, in bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._next = {}  # key -> theoretical arrival time of the next acquisition
+
+    def acquire(self, key):
+        """Block until `key` has a free slot. Returns the seconds waited."""
+        if not self.rate or self.rate <= 0:
+            return 0.0
+        interval = 1.0 / self.rate
+        with self._lock:
+            now = time.monotonic()
+            arrival = max(self._next.get(key, now), now)
+            self._next[key] = arrival + interval
+            delay = arrival - (self.burst - 1) * interval - now
+        if delay > 0:
+            time.sleep(delay)
+            return delay
+        return 0.0
+
+
+class Importer:
+    """Runs imports through `handler` with checkpoints in the imports table"""
+
+    def __init__(self, db_path='saves.db', handler=None, workers=8, host_rate=2.0, provider_rate=5.0):
+        self.db_path = db_path
+        self.handler = handler  # handler(url) -> SAVED / DUPLICATE / FAILED
+        self.workers = workers
+        self.hosts = RateLimiter(host_rate, burst=2)
+        self.providers = RateLimiter(provider_rate, burst=max(1, int(provider_rate)))
+        self._pool = db.get_pool(db_path)
+        self._lock = threading.Lock()
+        self._running = {}  # import id -> thread
+        self.init_table()
+
+    def init_table(self):
+        with self._pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS imports (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    digest TEXT NOT NULL UNIQUE,
+                    source TEXT,
+                    format TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    position INTEGER NOT NULL DEFAULT 0,
+                    saved INTEGER NOT NULL DEFAULT 0,
+                    duplicates INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+
+    def open(self, path, source=None, fmt=None, digest=None):
+        """The import record for a file: resumed if the same file was imported before"""
+        digest = digest or file_digest(path)
+        fmt = fmt or detect_format(source or path)
+        now = time.time()
+        with self._pool.connection() as conn:
+            conn.execute('''
+                INSERT INTO imports (digest, source, format, state, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (digest) DO NOTHING
+            ''', (digest, source or path, fmt, INTERRUPTED, now, now))
+            return self._row(conn, 'digest = ?', digest)
+
+    def get(self, import_id):
+        with self._pool.connection() as conn:
+            return self._row(conn, 'id = ?', import_id)
+
+    @staticmethod
+    def _row(conn, where, value):
+        cur = conn.execute(f'SELECT * FROM imports WHERE {where}', (value,))
+        row = cur.fetchone()
+        return dict(zip([c[0] for c in cur.description], row)) if row else None
+
+    def _checkpoint(self, record, state=None, error=None):
+        record['updated_at'] = time.time()
+        if state:
+            record['state'] = state
+        with self._pool.connection() as conn:
+            conn.execute('''
+                UPDATE imports SET state = ?, position = ?, saved = ?, duplicates = ?, failed = ?,
+                    last_error = COALESCE(?, last_error), updated_at = ?
+                WHERE id = ?
+            ''', (record['state'], record['position'], record['saved'], record['duplicates'],
+                  record['failed'], error, record['updated_at'], record['id']))
+
+    def _already_saved(self, canonical_url):
+        with self._pool.connection() as conn:
+            return conn.execute('SELECT 1 FROM saves WHERE canonical_url = ?', (canonical_url,)).fetchone() is not None
+
+    def _handle(self, url):
+        _current.importer = self
+        try:
+            return self.handler(url)
+        except Exception as e:
+            logs.warning('import_link_failed', url=url, error=e)
+            return FAILED
+        finally:
+            _current.importer = None
+
+    def run(self, record, path, on_progress=None):
+        """Import the file of `record` from its checkpoint; returns the final record.
+
+        on_progress(record) is called at every checkpoint.
+        """
+        skip = record['position']
+        seen = set()
+        in_flight = {}  # future -> index in the file
+        pending = set()  # indices not yet finished
+        next_index = skip
+        last_checkpoint = time.monotonic()
+        self._checkpoint(record, RUNNING)
+
+        def finish(done):
+            for future in done:
+                pending.discard(in_flight.pop(future))
+                record[{SAVED: 'saved', DUPLICATE: 'duplicates'}.get(future.result(), 'failed')] += 1
+
+        def checkpoint(force=False):
+            nonlocal last_checkpoint
+            if force or time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                # Everything before the oldest unfinished link is done
+                record['position'] = min(pending) if pending else next_index
+                self._checkpoint(record)
+                last_checkpoint = time.monotonic()
+                if on_progress:
+                    on_progress(record)
+
+        try:
+            with open(path, 'rb') as stream, \
+                    ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='import') as pool:
+                for index, url in enumerate(iter_links(stream, record['format'])):
+                    if index < skip:
+                        continue
+                    next_index = index + 1
+                    canonical_url = canonical.canonicalize(url)
+                    if canonical_url in seen or self._already_saved(canonical_url):
+                        record['duplicates'] += 1
+                    else:
+                        seen.add(canonical_url)
+                        # Backpressure: don't read ahead of the workers
+                        while len(in_flight) >= self.workers * 2:
+                            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                            finish(done)
+                        pending.add(index)
+                        in_flight[pool.submit(self._handle, url)] = index
+                    checkpoint()
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    finish(done)
+                    checkpoint()
+        except BaseException as e:
+            # Interrupted (Ctrl-C, a read error): links that were in flight
+            # have finished by now; checkpoint behind the rest
+            finish([future for future in in_flight if future.done() and not future.cancelled()])
+            record['position'] = min(pending) if pending else next_index
+            self._checkpoint(record, INTERRUPTED, error=str(e)[:500] or type(e).__name__)
+            raise
+        record['position'] = next_index
+        self._checkpoint(record, DONE)
+        if on_progress:
+            on_progress(record)
+        return record
+
+    def start(self, path, source=None, fmt=None, digest=None):
+        """Run an import in a background thread. Returns its record (already running: as is)."""
+        record = self.open(path, source, fmt, digest)
+        with self._lock:
+            thread = self._running.get(record['id'])
+            if thread is not None and thread.is_alive():
+                return record
+            if record['state'] == DONE:
+                return record
+            thread = threading.Thread(target=self._run_background, args=(record, path),
+                                      name=f"import-{record['id']}", daemon=True)
+            self._running[record['id']] = thread
+            thread.start()
+        return record
+
+    def _run_background(self, record, path):
+        try:
+            self.run(record, path)
+        except Exception as e:
+            logs.error('import_stopped', import_id=record['id'], error=e)
+        finally:
+            with self._lock:
+                self._running.pop(record['id'], None)
+
+    def stats(self):
+        """Imports per state, for monitoring"""
+        with self._pool.connection() as conn:
+            states = dict(conn.execute('SELECT state, COUNT(*) FROM imports GROUP BY state'))
+        with self._lock:
+            running = len(self._running)
+        return {'states': states, 'running': running}
@@ -0,0 +1,246 @@
+"""
+Durable SQLite-backed job queue for the ingest pipeline.
+
+Jobs live in the `jobs` table of saves.db, so links that were accepted by
+the webhook survive a process restart. A worker claims a job by taking a
+lease (visibility timeout); if the worker dies, the lease expires and the
+job becomes claimable again. Failed attempts are retried with exponential
+backoff until `max_attempts` is reached. Done and failed jobs are
+deleted `retention` seconds after they finish, so the table (and the
+per-state counts on /health and /metrics) stays the size of recent work.
+"""
+
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import db
+import logs
+
+# Job states
+QUEUED = 'queued'
+FETCHING = 'fetching'
+TAGGING = 'tagging'
+DONE = 'done'
+FAILED = 'failed'
+
+ACTIVE_STATES = (FETCHING, TAGGING)
+
+
+class JobQueue:
+    """Persistent work queue with leases, retries and a worker pool"""
+
+    def __init__(self, db_path='saves.db', handler=None, workers=4,
+                 visibility_timeout=120, max_attempts=5,
+                 backoff_base=2.0, backoff_max=300.0, poll_interval=0.5,
+                 retention=7 * 86400, prune_interval=300.0):
+        self.db_path = db_path
+        self.handler = handler
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self._pruned_at = 0.0
+        self._prune_lock = threading.Lock()
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._pool = db.get_pool(db_path)
+        self.init_table()
+
+    @contextmanager
+    def _connect(self):
+        with self._pool.connection() as conn:
+            conn.row_factory = sqlite3.Row
+            yield conn
+
+    def init_table(self):
+        """Create the jobs table and its claim index"""
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL,
+                    from_number TEXT,
+                    host_url TEXT,
+                    state TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    leased_until REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_state_available ON jobs (state, available_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_state_updated ON jobs (state, updated_at)')
+
+    def enqueue(self, url, from_number='', host_url=''):
+        """Add a job and wake an idle worker. Returns the job id."""
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute('''
+                INSERT INTO jobs (url, from_number, host_url, state, available_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (url, from_number, host_url, QUEUED, now, now, now))
+        self._wakeup.set()
+        return cur.lastrowid
+
+    def claim(self):
+        """Lease the next runnable job, or return None if there is none.
+
+        Runnable means queued and past its backoff delay, or active with an
+        expired lease (its worker crashed or the process restarted).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            # Take the write lock before choosing, so two workers can't claim one job
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('''
+                SELECT * FROM jobs
+                WHERE (state = ? AND available_at <= ?)
+                   OR (state IN (?, ?) AND leased_until <= ?)
+                ORDER BY available_at, id
+                LIMIT 1
+            ''', (QUEUED, now, FETCHING, TAGGING, now)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            conn.execute('''
+                UPDATE jobs SET state = ?, attempts = attempts + 1,
+                    leased_until = ?, updated_at = ?
+                WHERE id = ?
+            ''', (FETCHING, now + self.visibility_timeout, now, row['id']))
+            conn.execute('COMMIT')
+        job = dict(row)
+        job['state'] = FETCHING
+        job['attempts'] += 1
+        return job
+
+    def _update_leased(self, job, sql, params):
+        # The attempts check makes a stale worker (whose lease expired and
+        # was re-claimed) unable to overwrite the newer attempt's state
+        with self._connect() as conn:
+            cur = conn.execute(sql + ' WHERE id = ? AND attempts = ?', params + (job['id'], job['attempts']))
+        return cur.rowcount == 1
+
+    def set_state(self, job, state):
+        """Record pipeline progress and extend the job's lease"""
+        now = time.time()
+        job['state'] = state
+        return self._update_leased(
+            job, 'UPDATE jobs SET state = ?, leased_until = ?, updated_at = ?',
+            (state, now + self.visibility_timeout, now))
+
+    def complete(self, job):
+        """Mark a job done"""
+        job['state'] = DONE
+        return self._update_leased(
+            job, 'UPDATE jobs SET state = ?, leased_until = NULL, last_error = NULL, updated_at = ?',
+            (DONE, time.time()))
+
+    def fail(self, job, error):
+        """Schedule a retry with exponential backoff, or give up after max_attempts"""
+        now = time.time()
+        if job['attempts'] >= self.max_attempts:
+            job['state'] = FAILED
+            return self._update_leased(
+                job, 'UPDATE jobs SET state = ?, leased_until = NULL, last_error = ?, updated_at = ?',
+                (FAILED, str(error)[:500], now))
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (job['attempts'] - 1)))
+        delay *= random.uniform(0.5, 1.0)  # jitter so retries don't stampede
+        job['state'] = QUEUED
+        return self._update_leased(
+            job, 'UPDATE jobs SET state = ?, available_at = ?, leased_until = NULL, last_error = ?, updated_at = ?',
+            (QUEUED, now + delay, str(error)[:500], now))
+
+    def is_last_attempt(self, job):
+        return job['attempts'] >= self.max_attempts
+
+    def run_one(self):
+        """Claim and run a single job. Returns False if the queue was empty."""
+        job = self.claim()
+        if job is None:
+            return False
+        try:
+            self.handler(job)
+        except Exception as e:
+            logs.warning('job_failed', job_id=job['id'], attempt=job['attempts'], error=e, exc_info=True)
+            self.fail(job, e)
+        else:
+            self.complete(job)
+        return True
+
+    def prune(self, now=None):
+        """Delete done and failed jobs finished more than `retention` seconds ago. Returns the count."""
+        cutoff = (now or time.time()) - self.retention
+        with self._connect() as conn:
+            cur = conn.execute('DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?', (DONE, FAILED, cutoff))
+        if cur.rowcount:
+            logs.info('jobs_pruned', count=cur.rowcount)
+        return cur.rowcount
+
+    def _maybe_prune(self):
+        # One worker prunes every prune_interval; the others skip
+        now = time.monotonic()
+        if now - self._pruned_at < self.prune_interval or not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            self._pruned_at = now
+            self.prune()
+        finally:
+            self._prune_lock.release()
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                self._maybe_prune()
+                if self.run_one():
+                    continue
+            except Exception as e:
+                logs.error('job_worker_error', error=e)
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def start(self):
+        """Start the worker threads"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f'ingest-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=None):
+        """Ask workers to exit and wait for them"""
+        self._stop.set()
+        self._wakeup.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def stats(self):
+        """Queue depth per state and job ages (seconds), for monitoring"""
+        now = time.time()
+        with self._connect() as conn:
+            depth = {state: 0 for state in (QUEUED, FETCHING, TAGGING, DONE, FAILED)}
+            for row in conn.execute('SELECT state, COUNT(*) AS n FROM jobs GROUP BY state'):
+                depth[row['state']] = row['n']
+            oldest_queued = conn.execute(
+                'SELECT MIN(created_at) FROM jobs WHERE state = ?', (QUEUED,)).fetchone()[0]
+            oldest_active = conn.execute(
+                'SELECT MIN(created_at) FROM jobs WHERE state IN (?, ?)', ACTIVE_STATES).fetchone()[0]
+        return {
+            'depth': depth,
+            'pending': depth[QUEUED] + depth[FETCHING] + depth[TAGGING],
+            'oldest_queued_age': round(now - oldest_queued, 3) if oldest_queued else 0,
+            'oldest_active_age': round(now - oldest_active, 3) if oldest_active else 0,
+            'workers': len(self._threads),
+        }
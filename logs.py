@@ -0,0 +1,58 @@
+"""
+Structured logs: one JSON object per line on stdout.
+
+    logs.error('provider_failed', provider='gemini', error=e)
+
+writes {"ts": ..., "level": "error", "event": "provider_failed",
+"provider": "gemini", "error": "..."}. Events are snake_case names, so
+logs can be filtered and counted without parsing messages; values that
+aren't JSON types (exceptions, paths) are written as strings. Lines below
+the level set with set_level() (LOG_LEVEL in app.py) are dropped.
+"""
+
+import json
+import sys
+import threading
+import time
+import traceback
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+_level = LEVELS['info']
+_lock = threading.Lock()
+
+
+def set_level(name):
+    global _level
+    if name.lower() not in LEVELS:
+        raise ValueError(f"Unknown log level {name!r}; expected one of {', '.join(LEVELS)}")
+    _level = LEVELS[name.lower()]
+
+
+def log(level, event, exc_info=False, **fields):
+    if LEVELS[level] < _level:
+        return
+    record = {'ts': round(time.time(), 3), 'level': level, 'event': event}
+    record.update(fields)
+    if exc_info:
+        record['traceback'] = traceback.format_exc()
+    line = json.dumps(record, default=str, ensure_ascii=False)
+    with _lock:
+        sys.stdout.write(line + '\n')
+        sys.stdout.flush()
+
+
+def debug(event, **fields):
+    log('debug', event, **fields)
+
+
+def info(event, **fields):
+    log('info', event, **fields)
+
+
+def warning(event, **fields):
+    log('warning', event, **fields)
+
+
+def error(event, **fields):
+    log('error', event, **fields)
@@ -0,0 +1,225 @@
+"""
+Counters and latency histograms, exposed in Prometheus text format.
+
+Histograms have fixed buckets (Prometheus-style cumulative `le` buckets
+on output), so recording a sample is a bisect and three additions under
+a lock: cheap enough to wrap every stage of every request. Label values
+are given as keyword arguments and each distinct combination is its own
+series, so labels must stay low-cardinality (a route rule, not a URL).
+
+Stats that other modules already keep (cache hits, bytes read, pool
+waits) aren't counted twice: a collector registered with add_collector()
+turns them into samples when /metrics is scraped.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+PREFIX = 'socialsaver_'
+
+# Seconds: from a cache hit (sub-millisecond) to a slow provider call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = PREFIX + name + '_total'
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple([labels[name] for name in self.labels])
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple([labels[name] for name in self.labels])
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name + _label_text(self.labels, key), value) for key, value in values]
+
+
+class Histogram:
+    """Latency distribution per label combination, in fixed buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = PREFIX + name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [count per bucket (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, **labels):
+        key = tuple([labels[name] for name in self.labels])
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the `with` block, even if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        key = tuple([labels[name] for name in self.labels])
+        with self._lock:
+            series = self._series.get(key)
+            return series[2] if series else 0
+
+    def sum(self, **labels):
+        key = tuple([labels[name] for name in self.labels])
+        with self._lock:
+            series = self._series.get(key)
+            return series[1] if series else 0.0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        samples = []
+        names = self.labels + ('le',)
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket
+                samples.append((self.name + '_bucket' + _label_text(names, key + (_number(bound),)), cumulative))
+            samples.append((self.name + '_sum' + _label_text(self.labels, key), total))
+            samples.append((self.name + '_count' + _label_text(self.labels, key), count))
+        return samples
+
+
+class Registry:
+    """The metrics of a process, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() -> [(name, kind, help, [(labels dict, value)])], called at every scrape"""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """All metrics in Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {_number(value)}" for name, value in metric.samples())
+        for collect in collectors:
+            for name, kind, help, values in collect():
+                name = PREFIX + name
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    lines.append(f"{name}{_label_text(tuple(labels), labels.values())} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'stage_seconds', 'Time spent in each stage of processing a link', ['stage'])
+PROVIDER_SECONDS = REGISTRY.histogram(
+    'provider_seconds', 'Time per AI provider call', ['provider', 'call'])
+PROVIDER_CALLS = REGISTRY.counter(
+    'provider_calls', 'AI provider calls by outcome (success, failure)', ['provider', 'call', 'outcome'])
+TAGS = REGISTRY.counter(
+    'tags', 'Links tagged per configured provider, by where the answer came from '
+    '(provider, cache, local, fallback)', ['provider', 'source'])
+HTTP_SECONDS = REGISTRY.histogram(
+    'http_request_seconds', 'Time to handle a request, per route', ['route', 'method'])
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests', 'Requests handled, per route and status code', ['route', 'method', 'status'])
+
+
+def timed_provider(provider, call='single'):
+    """Decorator for a provider call: its latency and success/failure count"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = 'failure'
+            try:
+                result = fn(*args, **kwargs)
+                outcome = 'success'
+                return result
+            finally:
+                PROVIDER_SECONDS.observe(time.perf_counter() - start, provider=provider, call=call)
+                PROVIDER_CALLS.inc(provider=provider, call=call, outcome=outcome)
+        return wrapper
+    return decorate
+
+
+def timed_stage(stage):
+    """Decorator: the function's duration goes to STAGE_SECONDS as `stage`"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def render():
+    return REGISTRY.render()
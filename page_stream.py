@@ -0,0 +1,167 @@
+"""
+Bounded, streaming page reads for the content extractors.
+
+Instead of downloading a whole page and then parsing all of it, the body
+is streamed in chunks through an incremental HTML scanner (the stdlib
+HTMLParser, fed as bytes arrive) that knows what the platform's parser
+needs:
+
+    instagram / twitter   og:description, which lives in <head>: stop at
+                          that meta tag, or at <body> if there is none
+    article               the title and the first <article>: stop once
+                          that element has closed
+
+Reading also stops at `max_bytes`, and bodies whose Content-Type isn't
+HTML are not read at all. The text read so far then goes to the normal
+parsers.parse_content(), which yields the same caption as a full parse
+for any page whose needed tags fall inside the prefix, while most pages
+are cut short after a few kilobytes.
+
+Bodies are decoded with the charset from Content-Type, else UTF-8.
+"""
+
+import codecs
+import threading
+from html.parser import HTMLParser
+
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+
+CHUNK_SIZE = 16 * 1024
+
+
+class StopScanner(HTMLParser):
+    """Watches the tags of a page as it streams in; `done` once the parser has what it needs"""
+
+    def __init__(self, platform):
+        super().__init__(convert_charrefs=False)
+        self.platform = platform
+        self.done = False
+        self._title_seen = False
+        self._head_closed = False
+        self._article_depth = 0
+        self._article_started = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.platform != 'article':
+            if tag == 'body' or (tag == 'meta' and ('property', 'og:description') in attrs):
+                self.done = True
+        elif tag == 'body':
+            self._head_closed = True
+        elif tag == 'article' and (self._article_depth or not self._article_started):
+            self._article_started = True
+            self._article_depth += 1
+
+    def handle_endtag(self, tag):
+        if self.platform != 'article':
+            return
+        if tag == 'title':
+            self._title_seen = True
+        elif tag == 'head':
+            self._head_closed = True
+        elif tag == 'article' and self._article_depth:
+            self._article_depth -= 1
+            if not self._article_depth and (self._title_seen or self._head_closed):
+                self.done = True
+
+
+def charset(content_type):
+    """The charset parameter of a Content-Type header, or None"""
+    for param in (content_type or '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            value = value.strip().strip('"\'')
+            try:
+                return codecs.lookup(value).name
+            except LookupError:
+                return None
+    return None
+
+
+def is_html(content_type):
+    """HTML, or no Content-Type at all (which browsers sniff as HTML too)"""
+    if not content_type:
+        return True
+    return content_type.split(';')[0].strip().lower() in HTML_TYPES
+
+
+class PageReader:
+    """Feed body chunks; collects the decoded text until the scanner is done or the budget runs out"""
+
+    def __init__(self, platform, content_type=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.stopped_early = False
+        self.truncated = False
+        self._decoder = codecs.getincrementaldecoder(charset(content_type) or 'utf-8')(errors='replace')
+        self._scanner = StopScanner(platform)
+        self._parts = []
+
+    def feed(self, chunk):
+        """Take one chunk; returns False once no more should be read"""
+        room = self.max_bytes - self.bytes_read
+        if len(chunk) > room:
+            chunk = chunk[:room]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+        text = self._decoder.decode(chunk)
+        self._parts.append(text)
+        self._scanner.feed(text)
+        if self._scanner.done:
+            self.stopped_early = True
+            return False
+        return not self.truncated
+
+    def html(self):
+        self._parts.append(self._decoder.decode(b'', final=True))
+        return ''.join(self._parts)
+
+
+class ReadStats:
+    """Counters for /health: how much of each page was actually downloaded"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {'pages': 0, 'bytes_read': 0, 'stopped_early': 0, 'truncated': 0, 'not_html': 0}
+
+    def record(self, reader=None, not_html=False):
+        with self._lock:
+            self._counters['pages'] += 1
+            if not_html:
+                self._counters['not_html'] += 1
+                return
+            self._counters['bytes_read'] += reader.bytes_read
+            self._counters['stopped_early'] += reader.stopped_early
+            self._counters['truncated'] += reader.truncated
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        read = stats['pages'] - stats['not_html']
+        stats['avg_kb_read'] = round(stats['bytes_read'] / read / 1024, 1) if read else 0.0
+        return stats
+
+
+read_stats = ReadStats()
+
+
+def read_html(response, platform, max_bytes=DEFAULT_MAX_BYTES, chunk_size=CHUNK_SIZE):
+    """HTML from a streamed requests response (stream=True), or None if it isn't HTML.
+
+    Closes the response; an early stop drops the rest of the body unread.
+    """
+    try:
+        content_type = response.headers.get('Content-Type')
+        if not is_html(content_type):
+            read_stats.record(not_html=True)
+            return None
+        reader = PageReader(platform, content_type, max_bytes)
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk and not reader.feed(chunk):
+                break
+        read_stats.record(reader)
+        return reader.html()
+    finally:
+        response.close()
+
@@ -0,0 +1,270 @@
+"""
+HTML parsing for the content extractors.
+
+These functions only parse; fetching is done by the caller
+(app.extract_platform_content(), or a benchmark reading the same page
+another way), so every fetch path extracts the same caption and hashtags.
+
+The HTML itself is read by a pluggable backend, chosen once at startup
+with set_backend() (the HTML_PARSER setting):
+
+    html.parser   BeautifulSoup with the stdlib parser (default, pure Python)
+    lxml          lxml.html (libxml2), optional
+    selectolax    selectolax's lexbor parser, optional
+
+A backend only answers two questions, the og:description of a page and
+the title and main text of an article, and each one reproduces the
+BeautifulSoup results (text as get_text(strip=True), titles as .string;
+lxml and selectolax read markup inside <title> as text, like browsers).
+benchmarks/bench_parsers.py times them on the synthetic pages in
+benchmarks/corpus/ and checks they extract the same captions.
+"""
+
+import re
+from bs4 import BeautifulSoup
+
+HASHTAG_PATTERN = re.compile(r'#(\w+)')
+
+DEFAULT_BACKEND = 'html.parser'
+
+# Elements whose text BeautifulSoup's get_text() leaves out
+SKIPPED_TEXT = frozenset(('script', 'style', 'template'))
+
+MAX_ARTICLE_PARAGRAPHS = 10
+
+DEFAULT_CAPTIONS = {
+    'instagram': "Instagram content saved",
+    'twitter': "Twitter content saved",
+    'article': "Article content saved",
+}
+
+
+def detect_platform(url):
+    """Map a URL to the extractor platform name"""
+    if 'instagram.com' in url:
+        return 'instagram'
+    elif 'twitter.com' in url or 'x.com' in url:
+        return 'twitter'
+    return 'article'
+
+
+def default_content(platform):
+    """Placeholder content used when a page can't be fetched or parsed"""
+    return {
+        'caption': DEFAULT_CAPTIONS[platform],
+        'hashtags': [],
+        'platform': platform
+    }
+
+
+def _joined(strings, separator):
+    """get_text(strip=True, separator=...) over a sequence of raw strings"""
+    return separator.join(text for text in (string.strip() for string in strings) if text)
+
+
+class SoupBackend:
+    """BeautifulSoup with the stdlib html.parser: the reference behaviour"""
+
+    name = 'html.parser'
+
+    def og_description(self, html):
+        meta = BeautifulSoup(html, 'html.parser').find('meta', property='og:description')
+        return meta.get('content', '') if meta else None
+
+    def article(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        title = ""
+        if soup.title:
+            title = soup.title.string
+        else:
+            og_title = soup.find('meta', property='og:title')
+            if og_title:
+                title = og_title.get('content', '')
+
+        # Get main content (try article tag, or main, or just p tags)
+        article = soup.find('article') or soup.find('main')
+        if article:
+            content = article.get_text(strip=True, separator=' ')
+        else:
+            paragraphs = soup.find_all('p', limit=MAX_ARTICLE_PARAGRAPHS)
+            content = ' '.join(p.get_text(strip=True) for p in paragraphs)
+        return title, content
+
+
+class LxmlBackend:
+    """lxml.html: libxml2's HTML parser, one C-level parse and XPath lookups"""
+
+    name = 'lxml'
+
+    def __init__(self):
+        import lxml.etree
+        import lxml.html
+        self._etree = lxml.etree
+        self._html = lxml.html
+        # Text is passed in already decoded; re-encode it so a page's own
+        # <meta charset> or XML declaration can't override that
+        self._parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    def _parse(self, html):
+        try:
+            return self._html.document_fromstring(html.encode('utf-8', 'surrogatepass'), parser=self._parser)
+        except self._etree.ParserError:  # nothing but whitespace
+            return None
+
+    @staticmethod
+    def _strings(element):
+        stack = [(element, None)]
+        while stack:
+            node, tail = stack.pop()
+            if node is None:
+                yield tail
+                continue
+            if isinstance(node.tag, str) and node.tag not in SKIPPED_TEXT:  # comments have a callable tag
+                if node.text:
+                    yield node.text
+                for child in reversed(node):
+                    if child.tail:
+                        stack.append((None, child.tail))
+                    stack.append((child, None))
+
+    def og_description(self, html):
+        doc = self._parse(html)
+        if doc is None:
+            return None
+        meta = doc.xpath('(//meta[@property="og:description"])[1]')
+        return meta[0].get('content', '') if meta else None
+
+    def article(self, html):
+        doc = self._parse(html)
+        if doc is None:
+            return "", ""
+        title = ""
+        found = doc.xpath('(//title)[1]')
+        if found:
+            title = found[0].text or None
+        else:
+            og_title = doc.xpath('(//meta[@property="og:title"])[1]')
+            if og_title:
+                title = og_title[0].get('content', '')
+
+        found = doc.xpath('(//article)[1]') or doc.xpath('(//main)[1]')
+        if found:
+            content = _joined(self._strings(found[0]), ' ')
+        else:
+            paragraphs = doc.xpath(f'(//p)[position() <= {MAX_ARTICLE_PARAGRAPHS}]')
+            content = ' '.join(_joined(self._strings(p), '') for p in paragraphs)
+        return title, content
+
+
+class SelectolaxBackend:
+    """selectolax over lexbor: a fast HTML5 parser with CSS selectors"""
+
+    name = 'selectolax'
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    @staticmethod
+    def _strings(node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.is_text_node:
+                yield node.text_content
+            elif node.is_element_node and node.tag not in SKIPPED_TEXT:
+                stack.extend(reversed(list(node.iter(include_text=True))))
+
+    def og_description(self, html):
+        meta = self._parser(html).css_first('meta[property="og:description"]')
+        return meta.attributes.get('content') or '' if meta else None
+
+    def article(self, html):
+        tree = self._parser(html)
+        title = ""
+        found = tree.css_first('title')
+        if found:
+            title = found.text(deep=False) or None
+        else:
+            og_title = tree.css_first('meta[property="og:title"]')
+            if og_title:
+                title = og_title.attributes.get('content') or ''
+
+        found = tree.css_first('article') or tree.css_first('main')
+        if found:
+            content = _joined(self._strings(found), ' ')
+        else:
+            paragraphs = tree.css('p')[:MAX_ARTICLE_PARAGRAPHS]
+            content = ' '.join(_joined(self._strings(p), '') for p in paragraphs)
+        return title, content
+
+
+BACKENDS = {backend.name: backend for backend in (SoupBackend, LxmlBackend, SelectolaxBackend)}
+
+_backend = SoupBackend()
+
+
+def load_backend(name):
+    """A new backend instance; ImportError if its package isn't installed"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser {name!r} (choose from {', '.join(BACKENDS)})")
+    return BACKENDS[name]()
+
+
+def set_backend(name):
+    """Parse with the named backend from now on"""
+    global _backend
+    _backend = load_backend(name)
+    return _backend
+
+
+def backend_name():
+    return _backend.name
+
+
+def parse_og_description(html, platform, backend=None):
+    """Caption and hashtags from og:description (Instagram and Twitter/X)"""
+    caption = ""
+    hashtags = []
+    if html is not None:
+        caption = (backend or _backend).og_description(html) or ""
+
+        # Extract hashtags from caption
+        hashtags = HASHTAG_PATTERN.findall(caption)
+
+    # If we couldn't extract, return defaults
+    if not caption:
+        caption = DEFAULT_CAPTIONS[platform]
+
+    return {
+        'caption': caption,
+        'hashtags': hashtags,
+        'platform': platform
+    }
+
+
+def parse_article(html, backend=None):
+    """Title and main text from an article/blog page"""
+    if html is None:
+        return default_content('article')
+
+    title, content = (backend or _backend).article(html)
+
+    # Limit content length
+    if len(content) > 1000:
+        content = content[:1000] + "..."
+
+    caption = f"{title}\n\n{content}" if title else content
+
+    return {
+        'caption': caption,
+        'hashtags': [],
+        'platform': 'article'
+    }
+
+
+def parse_content(platform, html, backend=None):
+    """Parse a fetched page for the given platform. html=None means the fetch failed."""
+    if platform == 'article':
+        return parse_article(html, backend)
+    return parse_og_description(html, platform, backend)
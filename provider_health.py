@@ -0,0 +1,136 @@
+"""
+Health state for the AI providers.
+
+CircuitBreaker stops us from waiting out a 10 s timeout on every message
+while a provider is down: after `failure_threshold` consecutive failures
+the breaker opens and the provider is skipped instantly; after `cooldown`
+seconds one trial call is let through (half-open) to probe recovery.
+
+WorkingEndpoint remembers the endpoint that answered last time (e.g. the
+Gemini API version/model pair), so discovery only runs once per
+`refresh_interval` instead of on every message.
+"""
+
+import threading
+import time
+
+import logs
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class BreakerOpen(Exception):
+    """Raised when a provider is skipped because its breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over consecutive failures"""
+
+    def __init__(self, name, failure_threshold=3, cooldown=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.total_failures = 0
+        self.rejections = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self):
+        """May we call the provider now? Half-open lets one trial call through."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejections += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self._failures = 0
+            self._state = CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != OPEN:
+                    logs.warning('circuit_opened', provider=self.name, failures=self._failures)
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            state = self._current_state()
+            retry_in = 0.0
+            if state == OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'cooldown': self.cooldown,
+                'retry_in': round(retry_in, 1),
+                'successes': self.successes,
+                'failures': self.total_failures,
+                'rejections': self.rejections,
+            }
+
+
+class WorkingEndpoint:
+    """Remembers a discovered endpoint until it fails or refresh_interval passes"""
+
+    def __init__(self, refresh_interval=3600.0):
+        self.refresh_interval = refresh_interval
+        self._value = None
+        self._found_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._value is not None and time.monotonic() - self._found_at < self.refresh_interval:
+                return self._value
+            return None
+
+    def set(self, value):
+        """Record a freshly discovered endpoint"""
+        with self._lock:
+            self._value = value
+            self._found_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+
+    def snapshot(self):
+        with self._lock:
+            age = time.monotonic() - self._found_at if self._value is not None else None
+            return {
+                'endpoint': self._value,
+                'age': round(age, 1) if age is not None else None,
+                'refresh_interval': self.refresh_interval,
+            }
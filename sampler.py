@@ -0,0 +1,184 @@
+"""
+Random save sampling without ORDER BY RANDOM().
+
+Unfiltered picks draw an id between MIN(id) and MAX(id) (both O(1) on
+the rowid b-tree) and probe it by primary key; a miss (a deleted row)
+just draws again. Filtered picks draw from precomputed id lists per
+category and per platform, which are extended with new rows by rowid
+and rebuilt now and then to pick up edits and deletes. Only the first
+build happens on a request; rebuilds run on a background thread and are
+swapped in when done. Every probe checks the row still matches, so
+stale lists only cost a retry.
+
+recency=N weights picks toward new saves: half of them come from the
+newest N matching saves (an exponential over position, newest first).
+Unfiltered picks count positions in ids, so after deletes "the newest
+N" means the newest N ids.
+
+After max_tries misses per pick the remaining picks fall back to an
+ORDER BY RANDOM() over the filtered rows, so sparse tables still work.
+"""
+
+import math
+import random
+import sqlite3
+import threading
+import time
+from array import array
+
+import db
+
+
+class RandomSampler:
+    """Uniform (or recency-weighted) random saves, cost independent of table size"""
+
+    def __init__(self, db_path, refresh_interval=5.0, rebuild_interval=600.0, max_tries=8):
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.max_tries = max_tries
+        self._lists = {}  # ('category' | 'platform', value) -> ascending ids
+        self._max_id = 0
+        self._refreshed_at = None
+        self._rebuilt_at = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # One refresh or rebuild at a time
+        self._counters = {'picks': 0, 'probes': 0, 'misses': 0, 'fallbacks': 0}
+        self._pool = db.get_pool(db_path)
+
+    @staticmethod
+    def _scan(conn, after):
+        """({key: ids} for the saves with id > after, highest id seen)"""
+        lists = {}
+        max_id = after
+        rows = conn.execute('SELECT id, category, platform FROM saves WHERE id > ? ORDER BY id', (after,))
+        for save_id, category, platform in rows:
+            for key in (('category', category), ('platform', platform)):
+                ids = lists.get(key)
+                if ids is None:
+                    ids = lists[key] = array('q')
+                ids.append(save_id)
+            max_id = save_id
+        return lists, max_id
+
+    def _refresh_lists(self, conn):
+        """Append saves newer than the last refresh; rebuild from scratch periodically
+
+        Scans run outside self._lock, so picks never wait for one. The
+        first build blocks the picks that need it; later, a pick that
+        finds a refresh already running uses the current lists.
+        """
+        if self._rebuilt_at is None:
+            with self._refresh_lock:
+                if self._rebuilt_at is None:
+                    lists, max_id = self._scan(conn, 0)
+                    with self._lock:
+                        self._lists, self._max_id = lists, max_id
+                    self._rebuilt_at = self._refreshed_at = time.monotonic()
+            return
+        now = time.monotonic()
+        if now - self._refreshed_at < self.refresh_interval or not self._refresh_lock.acquire(blocking=False):
+            return
+        if now - self._rebuilt_at >= self.rebuild_interval:
+            # The thread releases _refresh_lock when the new lists are in
+            threading.Thread(target=self._rebuild, name='random-sampler-rebuild', daemon=True).start()
+            return
+        try:
+            self._refreshed_at = now
+            lists, max_id = self._scan(conn, self._max_id)
+            with self._lock:
+                for key, ids in lists.items():
+                    self._lists.setdefault(key, array('q')).extend(ids)
+                self._max_id = max_id
+        finally:
+            self._refresh_lock.release()
+
+    def _rebuild(self):
+        try:
+            with self._pool.connection() as conn:
+                lists, max_id = self._scan(conn, 0)
+            with self._lock:
+                self._lists, self._max_id = lists, max_id
+            self._rebuilt_at = self._refreshed_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def _offset(self, size, recency):
+        """Position counted from the newest end, or None to draw again"""
+        if not recency:
+            return random.randrange(size)
+        offset = int(random.expovariate(math.log(2) / recency))
+        return offset if offset < size else None
+
+    def sample(self, n=1, category=None, platform=None, recency=None):
+        """Up to n distinct random saves (dicts) matching the filters"""
+        filters = {name: value for name, value in (('category', category), ('platform', platform)) if value}
+        with self._pool.connection() as conn:
+            conn.row_factory = sqlite3.Row
+            if filters:
+                self._refresh_lists(conn)
+                with self._lock:
+                    # Draw from the smaller list; the probe checks the other filter
+                    pools = [self._lists.get(key, array('q')) for key in filters.items()]
+                    pool = min(pools, key=len)
+                if not pool:
+                    return []
+                size = len(pool)
+                draw = lambda offset: pool[size - 1 - offset]
+            else:
+                # Two queries: SQLite only answers a lone MIN()/MAX() from the b-tree edge
+                low = conn.execute('SELECT MIN(id) FROM saves').fetchone()[0]
+                high = conn.execute('SELECT MAX(id) FROM saves').fetchone()[0]
+                if low is None:
+                    return []
+                size = high - low + 1
+                draw = lambda offset: high - offset
+
+            chosen = {}
+            probes = misses = 0
+            budget = self.max_tries * n
+            while len(chosen) < n and probes < budget:
+                candidates = set()
+                for _ in range(n - len(chosen)):
+                    offset = self._offset(size, recency)
+                    if offset is not None:
+                        save_id = draw(offset)
+                        if save_id not in chosen:
+                            candidates.add(save_id)
+                probes += n - len(chosen)
+                if not candidates:
+                    continue
+                placeholders = ', '.join('?' * len(candidates))
+                found = 0
+                for row in conn.execute(f'SELECT * FROM saves WHERE id IN ({placeholders})', list(candidates)):
+                    if all(row[name] == value for name, value in filters.items()):
+                        chosen[row['id']] = dict(row)
+                        found += 1
+                misses += len(candidates) - found
+
+            fallback = len(chosen) < n
+            if fallback:
+                where = [f'{name} = ?' for name in filters]
+                params = list(filters.values())
+                if chosen:
+                    where.append(f"id NOT IN ({', '.join('?' * len(chosen))})")
+                    params += list(chosen)
+                sql = 'SELECT * FROM saves'
+                if where:
+                    sql += ' WHERE ' + ' AND '.join(where)
+                sql += ' ORDER BY RANDOM() LIMIT ?'
+                for row in conn.execute(sql, params + [n - len(chosen)]):
+                    chosen[row['id']] = dict(row)
+
+        with self._lock:
+            self._counters['picks'] += len(chosen)
+            self._counters['probes'] += probes
+            self._counters['misses'] += misses
+            self._counters['fallbacks'] += fallback
+        return list(chosen.values())
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['indexed_ids'] = sum(len(ids) for key, ids in self._lists.items() if key[0] == 'category')
+        return stats
@@ -0,0 +1,117 @@
+"""
+Materialized library statistics.
+
+The save_stats table holds one counter per (dimension, value):
+
+    ('total', '')             every save
+    ('category', 'Fitness')   saves per category
+    ('platform', 'twitter')   saves per platform
+    ('day', '2026-01-31')     saves per day (UTC, from created_at)
+
+Triggers on saves keep the counters current on insert, delete and
+category/platform/created_at updates, so /api/stats reads a few dozen
+primary-key rows however large the library is. rebuild() recomputes
+everything from saves with GROUP BY and reports how many counters had
+drifted (e.g. after rows were edited with triggers disabled).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+TABLE = '''
+    CREATE TABLE IF NOT EXISTS save_stats (
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (dimension, value)
+    ) WITHOUT ROWID
+'''
+
+# Counter keys of one saves row, as a VALUES list over `row` (new or old)
+_KEYS = '''
+    ('total', ''),
+    ('category', COALESCE({row}.category, '')),
+    ('platform', COALESCE({row}.platform, '')),
+    ('day', COALESCE(date({row}.created_at), ''))
+'''
+
+_ADD = '''
+        INSERT INTO save_stats (dimension, value, count)
+        SELECT column1, column2, 1 FROM (VALUES {keys}) WHERE {where}
+        ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1;
+'''
+
+_SUBTRACT = '''
+        UPDATE save_stats SET count = count - 1
+        WHERE (dimension, value) IN (SELECT column1, column2 FROM (VALUES {keys}) WHERE {where});
+'''
+
+TRIGGERS = f'''
+    CREATE TRIGGER IF NOT EXISTS saves_stats_insert AFTER INSERT ON saves BEGIN
+        {_ADD.format(keys=_KEYS.format(row='new'), where='1')}
+    END;
+    CREATE TRIGGER IF NOT EXISTS saves_stats_delete AFTER DELETE ON saves BEGIN
+        {_SUBTRACT.format(keys=_KEYS.format(row='old'), where='1')}
+    END;
+    CREATE TRIGGER IF NOT EXISTS saves_stats_update AFTER UPDATE OF category, platform, created_at ON saves BEGIN
+        {_SUBTRACT.format(keys=_KEYS.format(row='old'), where="column1 != 'total'")}
+        {_ADD.format(keys=_KEYS.format(row='new'), where="column1 != 'total'")}
+    END;
+'''
+
+MAX_DAYS = 366
+
+
+def init_stats(conn):
+    """Create save_stats and its triggers, filling it the first time"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'save_stats'"
+    ).fetchone()
+    conn.execute(TABLE)
+    if not exists:
+        rebuild(conn)
+    conn.executescript(TRIGGERS)
+
+
+def _computed(conn):
+    counts = {('total', ''): conn.execute('SELECT COUNT(*) FROM saves').fetchone()[0]}
+    for dimension, expression in (('category', 'category'), ('platform', 'platform'), ('day', 'date(created_at)')):
+        for value, count in conn.execute(
+                f"SELECT COALESCE({expression}, ''), COUNT(*) FROM saves GROUP BY 1"):
+            counts[(dimension, value)] = count
+    return counts
+
+
+def rebuild(conn):
+    """Recompute every counter from saves. Returns the number of counters that changed."""
+    computed = _computed(conn)
+    stored = {(d, v): c for d, v, c in conn.execute('SELECT dimension, value, count FROM save_stats WHERE count != 0')}
+    drift = sum(1 for key in computed.keys() | stored.keys() if computed.get(key, 0) != stored.get(key, 0))
+    conn.execute('DELETE FROM save_stats')
+    conn.executemany('INSERT INTO save_stats (dimension, value, count) VALUES (?, ?, ?)',
+                     [(d, v, c) for (d, v), c in computed.items()])
+    return drift
+
+
+def summary(conn, days=30):
+    """Totals, per-category and per-platform counts and the last `days` days (oldest first)"""
+    days = max(0, min(days, MAX_DAYS))
+    result = {'total': 0, 'categories': {}, 'platforms': {}, 'daily': []}
+    rows = conn.execute('''
+        SELECT dimension, value, count FROM save_stats
+        WHERE dimension IN ('total', 'category', 'platform') AND count > 0
+    ''')
+    for dimension, value, count in rows:
+        if dimension == 'total':
+            result['total'] = count
+        else:
+            result['categories' if dimension == 'category' else 'platforms'][value or 'unknown'] = count
+    if days:
+        today = datetime.now(timezone.utc).date()
+        first = (today - timedelta(days=days - 1)).isoformat()
+        per_day = dict(conn.execute(
+            "SELECT value, count FROM save_stats WHERE dimension = 'day' AND value >= ?", (first,)))
+        result['daily'] = [
+            {'day': day, 'count': per_day.get(day, 0)}
+            for day in ((today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1))
+        ]
+    return result
@@ -0,0 +1,75 @@
+"""
+The saves.db schema: the saves table, its indexes and migrations, and
+the tag, stats and full-text search tables kept in sync with it.
+
+create_tables() is idempotent, so the app runs it at startup and the
+benchmarks build their databases with it too.
+"""
+
+import canonical
+import save_stats
+import search
+import tags
+
+
+def create_tables(conn):
+    """Create or migrate the schema. Returns True if the FTS5 search index is available."""
+    create_saves_table(conn)
+    tags.init_tags(conn)
+    save_stats.init_stats(conn)
+    return search.init_fts(conn)
+
+
+def create_saves_table(conn):
+    """The saves table with its migrations and indexes, without the tables kept in sync with it"""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS saves (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            platform TEXT,
+            caption TEXT,
+            hashtags TEXT,
+            category TEXT,
+            summary TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    migrate_canonical_urls(conn)
+    migrate_tagged_by(conn)
+    # Keyset pagination for /api/saves: newest first, optionally per category/platform
+    c.execute('CREATE INDEX IF NOT EXISTS idx_saves_created ON saves (created_at, id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_saves_category_created ON saves (category, created_at, id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_saves_platform_created ON saves (platform, created_at, id)')
+
+
+def migrate_canonical_urls(conn):
+    """Add saves.canonical_url with a unique index, backfilling existing rows.
+
+    Older duplicates keep canonical_url NULL (NULLs don't collide in a
+    unique index), so the first copy of each link becomes the canonical row.
+    """
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(saves)')]
+    if 'canonical_url' in columns:
+        return
+    conn.execute('ALTER TABLE saves ADD COLUMN canonical_url TEXT')
+    seen = set()
+    updates = []
+    for row_id, url in conn.execute("SELECT id, url FROM saves WHERE COALESCE(platform, '') != 'unknown' ORDER BY id"):
+        canonical_url = canonical.canonicalize(url)
+        if canonical_url not in seen:
+            seen.add(canonical_url)
+            updates.append((canonical_url, row_id))
+    conn.executemany('UPDATE saves SET canonical_url = ? WHERE id = ?', updates)
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_saves_canonical_url ON saves (canonical_url)')
+
+
+def migrate_tagged_by(conn):
+    """Add saves.tagged_by: the provider, 'local' or 'fallback' that tagged the save.
+
+    Rows saved before it existed stay NULL: where their category came
+    from is unknown, so the local model doesn't train on them.
+    """
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(saves)')]
+    if 'tagged_by' not in columns:
+        conn.execute('ALTER TABLE saves ADD COLUMN tagged_by TEXT')
@@ -0,0 +1,151 @@
+"""
+Full-text search over saves with SQLite FTS5.
+
+saves_fts is an external-content FTS5 table over saves (caption,
+summary, hashtags, category): it stores only the index, reading column
+values from saves by rowid. Triggers keep it in sync on insert, update
+and delete, and init_fts() backfills rows saved before the index
+existed.
+
+search() ranks matches with bm25. To keep latency flat as the library
+grows, only the newest `max_candidates` matches of a very common term
+are ranked (FTS5 walks its rowid index newest-first and stops there),
+and snippets are built in Python for just the page of results returned.
+
+If this SQLite build has no FTS5, init_fts() returns False and callers
+fall back to LIKE scans.
+"""
+
+import html
+import re
+import sqlite3
+import unicodedata
+
+import logs
+import tags
+
+# bm25 column weights: caption, summary, hashtags, category
+BM25_WEIGHTS = (1.0, 1.0, 2.0, 4.0)
+
+MAX_CANDIDATES = 5000
+
+SNIPPET_WORDS = 24
+
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+TRIGGERS = '''
+    CREATE TRIGGER IF NOT EXISTS saves_fts_insert AFTER INSERT ON saves BEGIN
+        INSERT INTO saves_fts (rowid, caption, summary, hashtags, category)
+        VALUES (new.id, new.caption, new.summary, new.hashtags, new.category);
+    END;
+    CREATE TRIGGER IF NOT EXISTS saves_fts_delete AFTER DELETE ON saves BEGIN
+        INSERT INTO saves_fts (saves_fts, rowid, caption, summary, hashtags, category)
+        VALUES ('delete', old.id, old.caption, old.summary, old.hashtags, old.category);
+    END;
+    CREATE TRIGGER IF NOT EXISTS saves_fts_update AFTER UPDATE OF caption, summary, hashtags, category ON saves BEGIN
+        INSERT INTO saves_fts (saves_fts, rowid, caption, summary, hashtags, category)
+        VALUES ('delete', old.id, old.caption, old.summary, old.hashtags, old.category);
+        INSERT INTO saves_fts (rowid, caption, summary, hashtags, category)
+        VALUES (new.id, new.caption, new.summary, new.hashtags, new.category);
+    END;
+'''
+
+
+def init_fts(conn):
+    """Create saves_fts and its triggers, backfilling existing saves. Returns False without FTS5."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'saves_fts'"
+    ).fetchone()
+    if not exists:
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE saves_fts USING fts5(
+                    caption, summary, hashtags, category,
+                    content='saves', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2',
+                    prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logs.warning('fts_unavailable', error=e, fallback='LIKE')
+            return False
+        conn.execute("INSERT INTO saves_fts (saves_fts) VALUES ('rebuild')")
+    conn.executescript(TRIGGERS)
+    return True
+
+
+def fold(text):
+    """Lowercase and strip diacritics, like the unicode61 tokenizer"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def query_terms(text):
+    """Search terms in a search box string"""
+    return TERM_PATTERN.findall(fold(text or ''))
+
+
+def build_query(terms):
+    """FTS5 MATCH expression: every term must match, the last one as a prefix.
+
+    Terms are quoted, so FTS5 operators in user input are plain words.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def snippet_html(text, terms, width=SNIPPET_WORDS):
+    """HTML snippet of text around the first match, matched words in <mark>"""
+    words = (text or '').split()
+    exact = '|'.join(re.escape(term) for term in terms[:-1]) or '(?!)'
+    pattern = re.compile(rf'(?<!\w)(?:(?:{exact})(?!\w)|{re.escape(terms[-1])})', re.IGNORECASE)
+    marked = [pattern.search(word if word.isascii() else fold(word)) is not None for word in words]
+    first = marked.index(True) if True in marked else 0
+    start = max(0, min(first - width // 4, len(words) - width))
+    end = start + width
+    parts = [f"<mark>{html.escape(w)}</mark>" if m else html.escape(w)
+             for w, m in zip(words[start:end], marked[start:end])]
+    return ('… ' if start > 0 else '') + ' '.join(parts) + (' …' if end < len(words) else '')
+
+
+def search(conn, text, limit=100, max_candidates=MAX_CANDIDATES, columns=None, filters=None, tag_names=None):
+    """Saves matching text, best first, each with an HTML 'snippet' of its caption.
+
+    columns limits the saves columns returned (default all); filters is
+    {column: value} applied before ranking. Both must be trusted column
+    names. tag_names (normalized, see tags.normalize) must all be tags
+    of a result.
+    """
+    terms = query_terms(text)
+    if not terms:
+        return []
+    weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+    filters = filters or {}
+    tag_names = tag_names or []
+    join = ' JOIN saves ON saves.id = saves_fts.rowid' if filters else ''
+    where = ''.join(f' AND saves.{name} = ?' for name in filters)
+    where += ''.join(f" AND {tags.filter_sql('saves_fts.rowid')}" for _ in tag_names)
+    ranked = conn.execute(f'''
+        SELECT id FROM (
+            SELECT saves_fts.rowid AS id, bm25(saves_fts, {weights}) AS score
+            FROM saves_fts{join} WHERE saves_fts MATCH ?{where}
+            ORDER BY saves_fts.rowid DESC LIMIT ?
+        )
+        ORDER BY score LIMIT ?
+    ''', [build_query(terms), *filters.values(), *tag_names, max_candidates, limit]).fetchall()
+    ids = [row[0] for row in ranked]
+    if not ids:
+        return []
+    selected = ', '.join(dict.fromkeys(list(columns) + ['id', 'caption'])) if columns else '*'
+    placeholders = ', '.join('?' * len(ids))
+    cursor = conn.execute(f'SELECT {selected} FROM saves WHERE id IN ({placeholders})', ids)
+    names = [d[0] for d in cursor.description]
+    wanted = columns or names
+    by_id = {}
+    for row in cursor:
+        row = dict(zip(names, row))
+        save = {name: row[name] for name in wanted}
+        save['snippet'] = snippet_html(row['caption'], terms)
+        by_id[row['id']] = save
+    return [by_id[i] for i in ids if i in by_id]
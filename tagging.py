@@ -0,0 +1,110 @@
+"""
+Provider-agnostic pieces of AI tagging: the prompt and response parsing.
+
+Shared by the single and batch calls of each provider in app.py.
+"""
+
+import json
+
+VALID_CATEGORIES = ['Fitness', 'Coding', 'Food', 'Travel', 'Design', 'Fashion', 'Music', 'Photography', 'Business', 'Education', 'Other']
+
+SYSTEM_PROMPT = "You are a helpful assistant that categorizes and summarizes social media content. Always respond with valid JSON only, no markdown."
+
+
+def build_prompt(caption, hashtags):
+    """The tagging prompt sent to every LLM provider"""
+    hashtags_str = ', '.join(hashtags) if hashtags else 'none'
+    if not caption or len(caption.strip()) < 5:
+        caption = "Social media content"
+
+    return f"""Analyze this social media content and provide:
+1. A category (choose ONE from: Fitness, Coding, Food, Travel, Design, Fashion, Music, Photography, Business, Education, Other)
+2. A one-sentence summary
+
+Content: {caption}
+Hashtags: {hashtags_str}
+
+Respond in JSON format:
+{{
+    "category": "category_name",
+    "summary": "one sentence summary"
+}}"""
+
+
+def extract_json(text):
+    """Pull the JSON object out of an LLM reply (tolerates ``` fences and chatter)"""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('```')[1]
+        if text.startswith('json'):
+            text = text[4:]
+        text = text.strip()
+
+    if '{' not in text or '}' not in text:
+        raise ValueError("No JSON object in model response")
+    start = text.find('{')
+    end = text.rfind('}') + 1
+    return json.loads(text[start:end])
+
+
+def parse_response(text, validate_category=False):
+    """(category, summary) from an LLM reply"""
+    data = extract_json(text)
+    category = data.get('category', 'Other')
+    summary = data.get('summary', 'Content saved')
+    if validate_category and category not in VALID_CATEGORIES:
+        category = 'Other'
+    return category, summary
+
+
+def build_batch_prompt(items):
+    """One prompt tagging several (caption, hashtags) items; answers are keyed by id"""
+    blocks = []
+    for i, (caption, hashtags) in enumerate(items):
+        hashtags_str = ', '.join(hashtags) if hashtags else 'none'
+        if not caption or len(caption.strip()) < 5:
+            caption = "Social media content"
+        blocks.append(f"[{i}]\nContent: {caption}\nHashtags: {hashtags_str}")
+    joined = '\n\n'.join(blocks)
+
+    return f"""Analyze each of the following {len(items)} social media items and provide, for each one:
+1. A category (choose ONE from: Fitness, Coding, Food, Travel, Design, Fashion, Music, Photography, Business, Education, Other)
+2. A one-sentence summary
+
+Items:
+{joined}
+
+Respond with a JSON array only, one object per item, in the same order:
+[
+    {{"id": 0, "category": "category_name", "summary": "one sentence summary"}}
+]"""
+
+
+def parse_batch_response(text, count):
+    """List of (category, summary) per item from a batch reply.
+
+    Items the model dropped, duplicated or answered with an unknown
+    category come back as None so the caller can retry them one by one.
+    """
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('```')[1]
+        if text.startswith('json'):
+            text = text[4:]
+        text = text.strip()
+    if '[' not in text or ']' not in text:
+        raise ValueError("No JSON array in model response")
+    data = json.loads(text[text.find('['):text.rfind(']') + 1])
+
+    results = [None] * count
+    for position, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get('id', position)
+        if not isinstance(index, int) or not 0 <= index < count or results[index] is not None:
+            continue
+        category = entry.get('category')
+        summary = entry.get('summary')
+        if category in VALID_CATEGORIES and isinstance(summary, str) and summary.strip():
+            results[index] = (category, summary)
+    return results
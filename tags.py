@@ -0,0 +1,115 @@
+"""
+Normalized hashtag storage.
+
+saves.hashtags keeps the display string ('#a, #b'), but filtering on it
+meant LIKE '%tag%' scans that also matched longer tags (#fit matched
+#fitness). Each distinct tag now has a row in `tags` (name lowercased,
+without '#') and `save_tags` links it to saves:
+
+    save_tags (tag_id, save_id)    primary key: the saves with a tag
+    idx_save_tags_save (save_id)   the tags of a save, for deletes
+
+tags.save_count is kept up to date by triggers on save_tags, so tag
+facets (top_tags()) read a handful of rows from idx_tags_count instead of
+counting the join table.
+"""
+
+TABLES = '''
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        save_count INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_tags_count ON tags (save_count DESC, name);
+    CREATE TABLE IF NOT EXISTS save_tags (
+        tag_id INTEGER NOT NULL,
+        save_id INTEGER NOT NULL,
+        PRIMARY KEY (tag_id, save_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_save_tags_save ON save_tags (save_id);
+'''
+
+TRIGGERS = '''
+    CREATE TRIGGER IF NOT EXISTS save_tags_count_insert AFTER INSERT ON save_tags BEGIN
+        UPDATE tags SET save_count = save_count + 1 WHERE id = new.tag_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS save_tags_count_delete AFTER DELETE ON save_tags BEGIN
+        UPDATE tags SET save_count = save_count - 1 WHERE id = old.tag_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS saves_tags_delete AFTER DELETE ON saves BEGIN
+        DELETE FROM save_tags WHERE save_id = old.id;
+    END;
+'''
+
+
+
+def normalize(tag):
+    """'#Fitness ' -> 'fitness'; '' for an empty tag"""
+    return (tag or '').strip().lstrip('#').strip().lower()
+
+
+def filter_sql(column='id'):
+    """WHERE condition: the save id in `column` has the tag named by the parameter"""
+    return f'{column} IN (SELECT save_id FROM save_tags WHERE tag_id = (SELECT id FROM tags WHERE name = ?))'
+
+
+def split_stored(stored):
+    """Normalized tags of a saves.hashtags string ('#a, #b')"""
+    return [name for name in (normalize(tag) for tag in (stored or '').split(',')) if name]
+
+
+def init_tags(conn):
+    """Create the tag tables, backfilling them from saves.hashtags the first time"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'save_tags'"
+    ).fetchone()
+    conn.executescript(TABLES)
+    if not exists:
+        backfill(conn)
+    conn.executescript(TRIGGERS)
+
+
+def backfill(conn):
+    """Tags of every existing save, in bulk; counts are set once at the end"""
+    links = []
+    names = {}
+    for save_id, hashtags in conn.execute("SELECT id, hashtags FROM saves WHERE COALESCE(hashtags, '') != ''"):
+        for name in dict.fromkeys(split_stored(hashtags)):
+            names.setdefault(name, None)
+            links.append((name, save_id))
+    conn.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in names])
+    tag_ids = dict(conn.execute('SELECT name, id FROM tags'))
+    conn.executemany('INSERT OR IGNORE INTO save_tags (tag_id, save_id) VALUES (?, ?)',
+                     sorted((tag_ids[name], save_id) for name, save_id in links))
+    conn.execute('UPDATE tags SET save_count = (SELECT COUNT(*) FROM save_tags WHERE tag_id = tags.id)')
+
+
+def add_save_tags(conn, save_id, hashtags):
+    """Link a save to its tags (raw hashtags), creating tags as needed"""
+    names = list(dict.fromkeys(name for name in (normalize(tag) for tag in hashtags or ()) if name))
+    if not names:
+        return
+    conn.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(name,) for name in names])
+    placeholders = ', '.join('?' * len(names))
+    tag_ids = [row[0] for row in conn.execute(f'SELECT id FROM tags WHERE name IN ({placeholders})', names)]
+    conn.executemany('INSERT OR IGNORE INTO save_tags (tag_id, save_id) VALUES (?, ?)',
+                     [(tag_id, save_id) for tag_id in tag_ids])
+
+
+def top_tags(conn, limit=50, prefix=None):
+    """[{'tag', 'count'}], most used first; prefix narrows to tags starting with it"""
+    if prefix:
+        prefix = normalize(prefix)
+        # Range on the unique name index; the few matches are sorted by count
+        rows = conn.execute('''
+            SELECT name, save_count FROM tags
+            WHERE name >= ? AND name < ? AND save_count > 0
+            ORDER BY save_count DESC, name LIMIT ?
+        ''', (prefix, prefix + '\U0010ffff', limit))
+    else:
+        rows = conn.execute('''
+            SELECT name, save_count FROM tags
+            WHERE save_count > 0
+            ORDER BY save_count DESC, name LIMIT ?
+        ''', (limit,))
+    return [{'tag': name, 'count': count} for name, count in rows]